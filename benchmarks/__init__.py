@@ -0,0 +1,6 @@
+"""Benchmark scripts for ScanITD.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_threads --help``.
+Without ``--bam``/``--ref`` each script generates a synthetic sample with
+:func:`tests.simulate.build_synthetic_sample`.
+"""
@@ -0,0 +1,69 @@
+"""Shared helpers of the benchmark scripts."""
+
+from __future__ import annotations
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    import argparse
+    from collections.abc import Callable
+
+
+def add_sample_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options selecting the benchmarked sample."""
+    parser.add_argument("--bam", type=Path, help="indexed, coordinate-sorted BAM (default: synthetic sample)")
+    parser.add_argument("--ref", type=Path, help="faidx-indexed reference FASTA of --bam")
+    parser.add_argument("--target", default="", help="BED file or samtools region string")
+    parser.add_argument("--contig-length", type=int, default=200_000, help="length of each synthetic contig")
+    parser.add_argument("--depth", type=int, default=60, help="fold coverage of the synthetic sample")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per configuration")
+
+
+def resolve_sample(args: argparse.Namespace, *, vaf: float | None = None) -> tuple[Path, Path]:
+    """Return ``(bam, fasta)`` of the benchmarked sample, generating one if needed.
+
+    ``vaf`` overrides the allele frequency of the planted TDUPs, which are then
+    mostly supported by split reads, like a high-VAF FLT3-ITD sample.
+    """
+    if args.bam is not None:
+        if args.ref is None:
+            sys.exit("--ref is required with --bam")
+        return args.bam, args.ref
+
+    from tests.simulate import PlantedEvent, build_synthetic_sample
+
+    length = args.contig_length
+    contigs = {f"chr{i}": length for i in (1, 2, 3)}
+    events = [PlantedEvent(chrom, start, start + size) for chrom in contigs for start, size in ((length // 3, 30), (2 * length // 3, 60))]
+    if vaf is not None:
+        for event in events:
+            event.vaf = vaf
+            event.split_fraction = 0.8
+    out_dir = Path(tempfile.mkdtemp(prefix="scanitd-bench-"))
+    logger.info(f"Generating a synthetic sample of {len(contigs)} x {length} bp at {args.depth}x in {out_dir}")
+    sample = build_synthetic_sample(out_dir, depth=args.depth, contigs=contigs, events=events)
+    return sample.bam, sample.fasta
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Median wall-clock seconds of ``repeat`` calls of ``func``."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def quiet_logger():
+    """Return the loguru logger with only warnings and errors enabled."""
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    return logger
@@ -0,0 +1,89 @@
+"""Memory and lookup time of the TDUP anchors: AnchorTable against a dict.
+
+Runs the anchor scan once and replicates its anchors under ``--copies`` distinct
+read names, so a small synthetic sample stands in for an SA-dense whole genome.
+Each copy shares the anchor's TDUP, as the reads of one TDUP do.  Reports the
+memory each container holds (traced with ``tracemalloc``; the shared TDUP ids
+and breakpoint regions are excluded from both), the time to build it and the
+time of the two lookups of the counting pass: ``get`` on every anchored name
+and ``in`` on as many names without an anchor, as most soft-clipped reads are::
+
+    python -m benchmarks.bench_anchor_table --vaf 0.5 --copies 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import tracemalloc
+from pathlib import Path
+
+from scanitd.inference.anchors import AnchorTable
+from scanitd.inference.main import BamScanner
+from scanitd.inference.readnames import read_name_hash
+
+from ._common import add_sample_arguments, quiet_logger, resolve_sample, timed
+
+
+def _traced(build):
+    """Return ``(result, bytes allocated by build and still held)``."""
+    tracemalloc.start()
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_sample_arguments(parser)
+    parser.add_argument("--vaf", type=float, default=0.5, help="allele frequency of the synthetic TDUPs")
+    parser.add_argument("--copies", type=int, default=50, help="read names per scanned anchor")
+    args = parser.parse_args()
+
+    logger = quiet_logger()
+    bam, fasta = resolve_sample(args, vaf=args.vaf)
+    regions = [args.target] if args.target else [None]
+    anchors = list(BamScanner(Path(bam), 15, Path(fasta), 10, regions, logger).iter_bam().values())
+    # every read of the scan extracts a tuple of its own
+    stream = [(read_name_hash(f"{copy}:{i}"), anchor) for copy in range(args.copies) for i, anchor in enumerate(anchors)]
+
+    def build_dict():
+        table = {}
+        for name_key, anchor in stream:
+            table[name_key] = anchor._replace()
+        return table
+
+    def build_table():
+        table = AnchorTable()
+        for name_key, anchor in stream:
+            table[name_key] = anchor._replace()
+        return table
+
+    as_dict, dict_bytes = _traced(build_dict)
+    as_table, table_bytes = _traced(build_table)
+    names = [name_key for name_key, _ in stream]
+    missing = [read_name_hash(f"unanchored:{i}") for i in range(len(stream))]
+
+    def hits(container):
+        return lambda: [container.get(name_key) for name_key in names]
+
+    def misses(container):
+        return lambda: [name_key in container for name_key in missing]
+
+    def report(label, dict_func, table_func):
+        dict_time = timed(dict_func, args.repeat)
+        table_time = timed(table_func, args.repeat)
+        print(f"{label + ' (s)':<27}{dict_time:>12.4f}{table_time:>14.4f}{table_time / max(dict_time, 1e-9):>11.1f}x")
+
+    print(f"anchors                    {len(stream):>12}")
+    print(f"dict of tuples (bytes)     {dict_bytes:>12}")
+    print(f"anchor table (bytes)       {table_bytes:>12}")
+    print(f"reduction                  {dict_bytes / max(table_bytes, 1):>11.1f}x")
+    print(f"{'':<27}{'dict':>12}{'anchor table':>14}{'ratio':>11}")
+    report("build", build_dict, build_table)
+    report("get, anchored names", hits(as_dict), hits(as_table))
+    report("in, unanchored names", misses(as_dict), misses(as_table))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Reference lookups and time of TDUP anchor resolution.
+
+Every anchor stores its TDUP id and reference allele, resolved once per TDUP
+when the anchor is extracted.  This script reports the reference lookups this
+takes (two per distinct TDUP) next to the two per counted anchor read that
+resolving the id at count time costs, and the time of the anchor scan and of
+the counting pass.  The default sample is a
+high-VAF, split-read rich synthetic sample in the spirit of FLT3-ITD::
+
+    python -m benchmarks.bench_anchors --depth 400 --vaf 0.9
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+from scanitd.inference.main import BamScanner, ScanEngine, _collect_evidence
+
+from ._common import add_sample_arguments, quiet_logger, resolve_sample, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_sample_arguments(parser)
+    parser.set_defaults(contig_length=20_000, depth=400)
+    parser.add_argument("--vaf", type=float, default=0.9, help="allele frequency of the synthetic TDUPs")
+    parser.add_argument("--engine", default="pileup", choices=["pileup", "read"], help="counting engine")
+    args = parser.parse_args()
+
+    logger = quiet_logger()
+    bam, fasta = resolve_sample(args, vaf=args.vaf)
+    regions = [args.target] if args.target else [None]
+
+    def scanner() -> BamScanner:
+        return BamScanner(Path(bam), 15, Path(fasta), 10, regions, logger)
+
+    def anchor_scan() -> None:
+        scanner().iter_bam()
+
+    def full_scan() -> None:
+        _collect_evidence(scanner(), regions, 10, 2, ScanEngine(args.engine), single_pass=False, logger=logger)
+
+    collector = _collect_evidence(scanner(), regions, 10, 2, ScanEngine(args.engine), single_pass=False, logger=logger)
+    anchors = collector.tdup_anchors
+    distinct_tdups = len({anchor.tdup_id for anchor in anchors.values()})
+    counted_anchor_reads = sum(1 for name_key in collector.counted_names if name_key in anchors)
+
+    anchor_time = timed(anchor_scan, args.repeat)
+    scan_time = timed(full_scan, args.repeat)
+    print(f"anchors                          {len(anchors):>10}")
+    print(f"distinct TDUPs                   {distinct_tdups:>10}")
+    print(f"reference lookups                {2 * distinct_tdups:>10}")
+    print(f"lookups if resolved per read     {2 * counted_anchor_reads:>10}")
+    print(f"anchor scan (s)                  {anchor_time:>10.3f}")
+    print(f"anchor scan + counting pass (s)  {scan_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Micro-benchmark of :func:`calculate_variants` on soft-clip sized alignments.
+
+Aligns random soft-clips of 20-150 bp (with substitutions and small indels)
+against their reference windows once, then times counting their variants with a
+base-by-base Python walk, with :func:`calculate_variants`, and with
+:func:`calculate_variants` stopping at the rescue mismatch cutoff::
+
+    python -m benchmarks.bench_calculate_variants --alignments 5000 --cutoff 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+
+from ssw import AlignmentMgr
+
+from scanitd.inference.sr_resuer import calculate_variants
+
+from ._common import timed
+
+#: Shares of substitutions and deletions among the edits of a soft-clip; the rest are insertions.
+SUBSTITUTION_SHARE = 0.8
+DELETION_SHARE = 0.1
+
+
+def per_base_variants(cigar_pair_list, reference_seq, query_seq, reference_start, reference_end, query_start, query_end):
+    """Base-by-base variant count, the baseline of the benchmark."""
+    variants = {"insertions": 0, "deletions": 0, "snvs": 0, "mismatches": 0}
+    read_pos, ref_pos = query_start, reference_start
+    for length, op in cigar_pair_list:
+        if op == "M":
+            for i in range(length):
+                if read_pos + i < query_end and ref_pos + i < reference_end and query_seq[read_pos + i] != reference_seq[ref_pos + i]:
+                    variants["snvs"] += 1
+                    variants["mismatches"] += 1
+            read_pos += length
+            ref_pos += length
+        elif op == "I":
+            variants["insertions"] += 1
+            variants["mismatches"] += length
+            read_pos += length
+        elif op == "D":
+            variants["deletions"] += 1
+            variants["mismatches"] += length
+            ref_pos += length
+    return variants
+
+
+def make_alignments(count: int, edits: int, seed: int) -> list[tuple]:
+    """Align ``count`` random soft-clips carrying up to ``edits`` edits each."""
+    rng = random.Random(seed)
+    align_mgr = AlignmentMgr(match_score=2, mismatch_penalty=2)
+    alignments = []
+    for _ in range(count):
+        clip_length = rng.randrange(20, 151)
+        reference_seq = "".join(rng.choice("ACGT") for _ in range(2 * clip_length))
+        query = list(reference_seq[-clip_length:])
+        for _ in range(rng.randrange(edits + 1)):
+            position = rng.randrange(len(query))
+            edit = rng.random()
+            if edit < SUBSTITUTION_SHARE:
+                query[position] = rng.choice("ACGT")
+            elif edit < SUBSTITUTION_SHARE + DELETION_SHARE:
+                del query[position]
+            else:
+                query.insert(position, rng.choice("ACGT"))
+        query_seq = "".join(query)
+        align_mgr.set_read(query_seq)
+        align_mgr.set_reference(reference_seq)
+        alignment = align_mgr.align(gap_open=3, gap_extension=1)
+        alignments.append(
+            (
+                alignment.cigar_pair_list,
+                reference_seq,
+                query_seq,
+                alignment.reference_start,
+                alignment.reference_end,
+                alignment.read_start,
+                alignment.read_end,
+            )
+        )
+    return alignments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alignments", type=int, default=5000, help="number of soft-clip alignments")
+    parser.add_argument("--edits", type=int, default=4, help="maximum edits per soft-clip")
+    parser.add_argument("--cutoff", type=int, default=1, help="rescue mismatch cutoff")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per variant")
+    args = parser.parse_args()
+
+    alignments = make_alignments(args.alignments, args.edits, args.seed)
+
+    runs = {
+        "per-base walk": lambda: [per_base_variants(*alignment) for alignment in alignments],
+        "calculate_variants": lambda: [calculate_variants(*alignment) for alignment in alignments],
+        f"... with cutoff {args.cutoff}": lambda: [calculate_variants(*alignment, args.cutoff) for alignment in alignments],
+    }
+    baseline = None
+    print(f"{'implementation':<22}  {'us/alignment':>12}  {'speedup':>7}")
+    for name, run in runs.items():
+        seconds = timed(run, args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:<22}  {1e6 * seconds / len(alignments):>12.2f}  {baseline / seconds:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
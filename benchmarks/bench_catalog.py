@@ -0,0 +1,74 @@
+"""Memory of the soft-clip catalog: packed bins against lists of strings.
+
+Runs the counting pass once, replays its soft-clips into the list-of-``str``
+catalog the scan used to keep and into :class:`SoftclipCatalog`, and reports
+the memory each holds (traced with ``tracemalloc``, keys excluded) and the time
+to build it.  The default sample is a deep, split-read rich synthetic sample in
+the spirit of an amplicon panel::
+
+    python -m benchmarks.bench_catalog --depth 1000 --vaf 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+from scanitd.inference.catalog import SoftclipCatalog
+from scanitd.inference.main import BamScanner, ScanEngine, _collect_evidence
+
+from ._common import add_sample_arguments, quiet_logger, resolve_sample, timed
+
+
+def _traced(build):
+    """Return ``(result, bytes allocated by build and still held)``."""
+    tracemalloc.start()
+    result = build()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, held
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_sample_arguments(parser)
+    parser.set_defaults(contig_length=20_000, depth=1000)
+    parser.add_argument("--vaf", type=float, default=0.5, help="allele frequency of the synthetic TDUPs")
+    args = parser.parse_args()
+
+    logger = quiet_logger()
+    bam, fasta = resolve_sample(args, vaf=args.vaf)
+    regions = [args.target] if args.target else [None]
+    scanner = BamScanner(Path(bam), 15, Path(fasta), 10, regions, logger)
+    catalog = _collect_evidence(scanner, regions, 10, 2, ScanEngine.PILEUP, single_pass=False, logger=logger).to_be_rescued_sequences
+
+    # clips as bytes, so each build allocates its strings like the scan does
+    stream = [(key, clip.encode()) for key in catalog for clip, count in catalog.clips(key) for _ in range(count)]
+
+    def build_lists():
+        sequences = defaultdict(list)
+        for key, clip in stream:
+            sequences[key].append(clip.decode())
+        return sequences
+
+    def build_packed():
+        packed = SoftclipCatalog()
+        for key, clip in stream:
+            packed.add(key, clip.decode())
+        return packed
+
+    _, list_bytes = _traced(build_lists)
+    _, packed_bytes = _traced(build_packed)
+    print(f"soft-clips                 {len(stream):>12}")
+    print(f"positions                  {len(catalog):>12}")
+    print(f"lists of str (bytes)       {list_bytes:>12}")
+    print(f"packed catalog (bytes)     {packed_bytes:>12}")
+    print(f"reduction                  {list_bytes / max(packed_bytes, 1):>11.1f}x")
+    print(f"lists of str build (s)     {timed(build_lists, args.repeat):>12.3f}")
+    print(f"packed catalog build (s)   {timed(build_packed, args.repeat):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Micro-benchmark of CIGAR summaries and :class:`~scanitd.base.Read` construction.
+
+Loads the soft-clipped alignments of a sample (the reads the counting pass turns
+into ``Read`` objects) and times summarizing their CIGARs by parsing the string
+without cache, from pysam's integer ``cigartuples`` (``parse_cigartuples``) and
+through the interning cache of ``parse_cigar``.  It then times building an
+eager ``Read`` (``Read.from_aligned_segment``) against a ``LazyRead`` view, each
+used as the counting pass does: its mapping mode and its soft-clipped sequence::
+
+    python -m benchmarks.bench_read_construction --vaf 0.5
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import pysam
+
+from scanitd.base import LazyRead, MappingMode, Read
+from scanitd.base.cigar import parse_cigar, parse_cigartuples
+
+from ._common import add_sample_arguments, quiet_logger, resolve_sample, timed
+
+
+def _softclip(read_obj) -> str:
+    if read_obj.simple_mode == MappingMode.MS:
+        return read_obj.query_sequence[-read_obj.rt_soft_len :]
+    return read_obj.query_sequence[: read_obj.lt_soft_len]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_sample_arguments(parser)
+    parser.set_defaults(contig_length=20_000, depth=1000)
+    parser.add_argument("--vaf", type=float, default=0.5, help="allele frequency of the synthetic TDUPs")
+    args = parser.parse_args()
+
+    quiet_logger()
+    bam, _ = resolve_sample(args, vaf=args.vaf)
+    with pysam.AlignmentFile(str(bam)) as bam_object:
+        segments = [read for read in bam_object.fetch(region=args.target or None) if read.cigarstring and "S" in read.cigarstring]
+
+    timings = {
+        "CIGAR string, uncached": lambda: [parse_cigar.__wrapped__(read.cigarstring) for read in segments],
+        "parse_cigartuples": lambda: [parse_cigartuples(read.cigartuples) for read in segments],
+        "CIGAR string, cached": lambda: [parse_cigar(read.cigarstring) for read in segments],
+        "Read.from_aligned_segment": lambda: [_softclip(Read.from_aligned_segment(read)) for read in segments],
+        "LazyRead": lambda: [_softclip(LazyRead(read)) for read in segments],
+    }
+    print(f"soft-clipped alignments        {len(segments):>10}")
+    print(f"distinct CIGARs                {len({read.cigarstring for read in segments}):>10}")
+    for label, func in timings.items():
+        print(f"{label + ' (s)':<31}{timed(func, args.repeat):>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
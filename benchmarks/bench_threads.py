@@ -0,0 +1,53 @@
+"""Wall-clock effect of htslib decompression threads (``--threads``).
+
+Times a plain decompression sweep over the BAM (``fetch`` of every record) and
+a complete :func:`scan_itd` run for each thread count, so the share of the run
+spent in BGZF decompression, and what extra threads buy, can be read off the
+table.  Use a real-size BAM to size cluster requests::
+
+    python -m benchmarks.bench_threads --bam sample.bam --ref genome.fa --threads 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+from functools import partial
+
+import pysam
+
+from scanitd.inference import scan_itd
+
+from ._common import add_sample_arguments, quiet_logger, resolve_sample, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_sample_arguments(parser)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4], help="thread counts to compare")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes of the scan")
+    parser.add_argument("--engine", default="pileup", choices=["pileup", "read"], help="counting engine")
+    args = parser.parse_args()
+
+    logger = quiet_logger()
+    bam, fasta = resolve_sample(args)
+
+    def sweep(threads: int) -> None:
+        with pysam.AlignmentFile(bam, "rb", threads=threads) as bam_object:
+            for _ in bam_object.fetch(until_eof=True):
+                pass
+
+    def scan(threads: int) -> None:
+        scan_itd(bam, 15, fasta, args.target, 10, 1, 2, logger, engine=args.engine, workers=args.workers, threads=threads)
+
+    print(f"{'threads':>7}  {'sweep (s)':>10}  {'speedup':>7}  {'scan (s)':>9}  {'speedup':>7}")
+    base_sweep = base_scan = None
+    for threads in args.threads:
+        sweep_time = timed(partial(sweep, threads), args.repeat)
+        scan_time = timed(partial(scan, threads), args.repeat)
+        base_sweep = base_sweep or sweep_time
+        base_scan = base_scan or scan_time
+        print(f"{threads:>7}  {sweep_time:>10.3f}  {base_sweep / sweep_time:>7.2f}  {scan_time:>9.3f}  {base_scan / scan_time:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
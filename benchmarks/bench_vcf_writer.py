@@ -0,0 +1,79 @@
+"""VCF record formatting: ``VCFWriter.write_data`` per event against ``write_events``.
+
+Writes ``--events`` random TDUP and INS candidates, as an unfiltered cohort
+rerun would, once through the per-event ``write_data`` dispatch and once through
+the batch ``write_events`` path in batches of ``--batch`` events, checks that
+both files are byte-identical and reports the time of each::
+
+    python -m benchmarks.bench_vcf_writer --events 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from scanitd.base import Event, MicroRegion
+from scanitd.writer import VCFWriter
+
+from ._common import quiet_logger, timed
+
+_HEADER = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": f"chr{i}", "LN": 250_000_000} for i in range(1, 23)]}
+
+
+def _random_events(count: int, seed: int = 0) -> list[Event]:
+    rng = random.Random(seed)
+    regions = [MicroRegion(""), MicroRegion("+GA"), MicroRegion("-TTG")]
+    events = []
+    for _ in range(count):
+        size = rng.randrange(10, 300)
+        sequence = "".join(rng.choices("ACGT", k=size))
+        event_type = rng.choice(("TDUP", "INS"))
+        ao = rng.randrange(1, 50)
+        event_id = (f"chr{rng.randrange(1, 23)}", rng.randrange(250_000_000), size, sequence, rng.choice(regions))
+        events.append(Event.new(event_type, event_id, ao, ao + rng.randrange(5), ao + rng.randrange(1, 500), "A", f"A{sequence}"))
+    return events
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200_000, help="number of candidate events written")
+    parser.add_argument("--batch", type=int, default=1024, help="events per write_events call")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions per configuration")
+    args = parser.parse_args()
+
+    quiet_logger()
+    events = _random_events(args.events)
+    out_dir = Path(tempfile.mkdtemp(prefix="scanitd-bench-"))
+    (out_dir / "data").mkdir()
+    (out_dir / "events").mkdir()
+
+    def write_data():
+        (out_dir / "data" / "sample.vcf").unlink(missing_ok=True)
+        writer = VCFWriter(str(out_dir / "data" / "sample.vcf"), _HEADER)
+        with writer.open():
+            for idx, event in enumerate(events, 1):
+                writer.write_data(event, f"{idx}")
+
+    def write_events():
+        (out_dir / "events" / "sample.vcf").unlink(missing_ok=True)
+        writer = VCFWriter(str(out_dir / "events" / "sample.vcf"), _HEADER)
+        with writer.open():
+            for start in range(0, len(events), args.batch):
+                writer.write_events(events[start : start + args.batch])
+
+    data_time = timed(write_data, args.repeat)
+    events_time = timed(write_events, args.repeat)
+    identical = (out_dir / "data" / "sample.vcf").read_bytes() == (out_dir / "events" / "sample.vcf").read_bytes()
+
+    print(f"events                     {len(events):>12}")
+    print(f"write_data (s)             {data_time:>12.3f}")
+    print(f"write_events (s)           {events_time:>12.3f}")
+    print(f"speedup                    {data_time / max(events_time, 1e-9):>11.1f}x")
+    print(f"byte-identical             {identical!s:>12}")
+
+
+if __name__ == "__main__":
+    main()
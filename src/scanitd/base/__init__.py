@@ -1,9 +1,9 @@
 """Core data structures and utilities for ScanITD.
 
 Exports genomic interval types (:class:`Interval`, :class:`Intervals`),
-alignment read representation (:class:`Read`), CIGAR code enums (:class:`CigarCode`),
+alignment read representation (:class:`Read`, :class:`LazyRead`), CIGAR code enums (:class:`CigarCode`),
 strand/mode enums (:class:`Strand`, :class:`MappingMode`), and structural variant
-event containers (:class:`Event`, :class:`MicroRegion`).
+event containers (:class:`Event`, :class:`MicroRegion`, :class:`EventTable`).
 """
 
 from .basic import (
@@ -15,13 +15,16 @@ from .basic import (
     MicroRegion,
     Strand,
 )
-from .basic_read import Read, reverse_complement
+from .basic_read import LazyRead, Read, reverse_complement
+from .event_table import EventTable
 
 __all__ = [
     "CigarCode",
     "Event",
+    "EventTable",
     "Interval",
     "Intervals",
+    "LazyRead",
     "MappingMode",
     "MicroRegion",
     "Read",
@@ -61,6 +61,14 @@ class MicroRegion:
         """
         return f"MicroRegion({self.micro_type=}, {self.sequence=} {self.length=})"
 
+    def prefixed(self) -> str:
+        """The prefixed sequence string the region is built from (``+seq``, ``-seq`` or empty)."""
+        if self.micro_type == "microinsertion":
+            return f"+{self.sequence}"
+        if self.micro_type == "microhomology":
+            return f"-{self.sequence}"
+        return ""
+
 
 class Event:
     """Store TDUP or INS event."""
@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from .basic import MappingMode, Strand
-from .cigar import parse_cigar
+from .cigar import parse_cigar, parse_cigartuples
+
+if TYPE_CHECKING:
+    from pysam import AlignedSegment
+
+    from .cigar import CigarResult
 
-__all__ = ["Read", "reverse_complement"]
+__all__ = ["LazyRead", "Read", "reverse_complement"]
 
 
 class Read:
@@ -86,7 +93,7 @@ class Read:
         read_match_size: int,
         reference_match_size: int,
         indel_size: int,
-        cigartuples_without_soft: list[int],
+        cigartuples_without_soft: tuple[tuple[int, int], ...],
         query_length: int,
         query_qualities: list[int] | None = None,
     ) -> None:
@@ -179,6 +186,176 @@ class Read:
             query_qualities,
         )
 
+    @classmethod
+    def from_aligned_segment(cls, segment: AlignedSegment) -> Read:
+        """Initialize the read from a pysam alignment.
+
+        The CIGAR features are summarized from the segment's integer
+        ``cigartuples`` (see :func:`~scanitd.base.cigar.parse_cigartuples`), so
+        the CIGAR string is neither built nor parsed.  The alignment must carry
+        an ``NM`` tag.
+        """
+        parse_cigar_result = parse_cigartuples(segment.cigartuples)
+
+        return cls(
+            segment.query_name,  # type: ignore
+            segment.reference_name,  # type: ignore
+            segment.reference_start,
+            "-" if segment.is_reverse else "+",
+            segment.cigarstring,  # type: ignore
+            segment.mapping_quality,
+            segment.get_tag("NM"),  # type: ignore
+            segment.query_sequence,  # type: ignore
+            parse_cigar_result.lt_soft_len,
+            parse_cigar_result.rt_soft_len,
+            parse_cigar_result.read_match,
+            parse_cigar_result.ref_match,
+            parse_cigar_result.indel_len,
+            parse_cigar_result.cigartuples_without_soft,
+            parse_cigar_result.query_len,
+            segment.query_qualities,  # type: ignore
+        )
+
+
+class LazyRead:
+    """Read view over a pysam alignment, computing its fields on access.
+
+    Offers the attribute API of :class:`Read` (``chrom``, ``ref_start``,
+    ``ref_end``, ``sms``, ``query_sequence``, ...), but nothing is copied out of
+    the alignment until it is read.  Most reads of a scan are dropped after
+    :attr:`simple_mode` and one soft-clip slice, so their qualities, ``NM`` tag
+    and strand are never converted.  CIGAR-derived sizes are summarized from
+    the alignment's integer ``cigartuples``
+    (:func:`~scanitd.base.cigar.parse_cigartuples`); only the CIGAR of an SA
+    tag is parsed as text, through the cache of
+    :func:`~scanitd.base.cigar.parse_cigar`.
+
+    A view built with :meth:`from_sa` describes the supplementary alignment of an
+    SA tag instead: coordinates, MAPQ, NM and the CIGAR come from the tag, and the
+    sequence and qualities of the alignment are reverse-complemented (reversed)
+    only when accessed.
+    """
+
+    __slots__ = ("_cigar", "_sa", "_segment", "mode")
+
+    def __init__(self, segment: AlignedSegment) -> None:
+        """Wrap the alignment ``segment``."""
+        self._segment = segment
+        # (chrom, ref_start, strand, cigarstring, mapq, nm) of an SA alignment
+        self._sa: tuple[str, int, str, str, int, int] | None = None
+        self._cigar: CigarResult | None = None
+        self.mode: MappingMode | None = None
+
+    @classmethod
+    def from_sa(cls, segment: AlignedSegment, chrom: str, ref_start: int, strand: str, cigarstring: str, mapq: int, nm: int) -> LazyRead:
+        """View the SA-tag alignment of ``segment`` (fields as from ``format_sa_tag``)."""
+        view = cls(segment)
+        view._sa = (chrom, ref_start, strand, cigarstring, mapq, nm)
+        return view
+
+    __hash__ = Read.__hash__
+
+    @property
+    def simple_mode(self) -> MappingMode:
+        """Simplified mode determination."""
+        parsed = self._parsed
+        return MappingMode.SM if parsed.lt_soft_len >= parsed.rt_soft_len else MappingMode.MS
+
+    def __repr__(self) -> str:
+        """Get the representation of the read."""
+        return (
+            f"LazyRead({self.query_name=}, {self.chrom=}, {self.ref_start=}, {self.ref_end=}, {self.sms=} "
+            f"{self.mode=}, {self.strand=}, {self.mapq=}, {self.nm=})"
+        )
+
+    @property
+    def _parsed(self) -> CigarResult:
+        if self._cigar is None:
+            self._cigar = parse_cigartuples(self._segment.cigartuples) if self._sa is None else parse_cigar(self._sa[3])
+        return self._cigar
+
+    @property
+    def _flipped(self) -> bool:
+        """Whether the SA alignment lies on the other strand than the segment."""
+        return self._sa is not None and (self._sa[2] == "-") != self._segment.is_reverse
+
+    @property
+    def query_name(self) -> str:
+        return self._segment.query_name  # type: ignore
+
+    @property
+    def chrom(self) -> str:
+        return self._segment.reference_name if self._sa is None else self._sa[0]  # type: ignore
+
+    @property
+    def ref_start(self) -> int:
+        return self._segment.reference_start if self._sa is None else self._sa[1]
+
+    @property
+    def ref_end(self) -> int:
+        return self.ref_start + self._parsed.ref_match
+
+    @property
+    def strand(self) -> Strand:
+        if self._sa is None:
+            return Strand.Reverse if self._segment.is_reverse else Strand.Forward
+        return Strand.from_str(self._sa[2])
+
+    @property
+    def cigarstring(self) -> str:
+        return self._segment.cigarstring if self._sa is None else self._sa[3]  # type: ignore
+
+    @property
+    def mapq(self) -> int:
+        return self._segment.mapping_quality if self._sa is None else self._sa[4]
+
+    @property
+    def nm(self) -> int:
+        return self._segment.get_tag("NM") if self._sa is None else self._sa[5]  # type: ignore
+
+    @property
+    def query_sequence(self) -> str:
+        sequence = self._segment.query_sequence
+        return reverse_complement(sequence) if self._flipped else sequence  # type: ignore
+
+    @property
+    def query_qualities(self):
+        qualities = self._segment.query_qualities
+        return qualities[::-1] if qualities is not None and self._flipped else qualities
+
+    @property
+    def lt_soft_len(self) -> int:
+        return self._parsed.lt_soft_len
+
+    @property
+    def rt_soft_len(self) -> int:
+        return self._parsed.rt_soft_len
+
+    @property
+    def read_match_size(self) -> int:
+        return self._parsed.read_match
+
+    @property
+    def reference_match_size(self) -> int:
+        return self._parsed.ref_match
+
+    @property
+    def indel_size(self) -> int:
+        return self._parsed.indel_len
+
+    @property
+    def cigartuples_without_soft(self) -> tuple[tuple[int, int], ...]:
+        return self._parsed.cigartuples_without_soft
+
+    @property
+    def query_length(self) -> int:
+        return self._parsed.query_len
+
+    @property
+    def sms(self) -> tuple[int, int, int]:
+        parsed = self._parsed
+        return parsed.lt_soft_len, parsed.read_match, parsed.rt_soft_len
+
 
 def reverse_complement(seq: str) -> str:
     """Obtain reverse complement sequence.
@@ -1,19 +1,32 @@
-"""CIGAR string parsing utilities for BAM alignment records."""
+"""CIGAR parsing utilities for BAM alignment records and SA-tag CIGAR strings.
+
+SA-tag CIGARs repeat heavily: every split read of an ITD carries much the same
+``85S66M``-style string.  :func:`parse_cigar` therefore interns its results in a
+bounded LRU cache, so its cost follows the number of distinct CIGARs rather than
+the number of reads.  Results are immutable and shared between callers.
+"""
 
 from __future__ import annotations
 
 import re
-from dataclasses import dataclass, field
-from typing import List, Tuple
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+#: Maximum number of distinct CIGAR strings kept by :func:`parse_cigar`.
+CIGAR_CACHE_SIZE = 1 << 16
 
 
-@dataclass
+@dataclass(frozen=True)
 class CigarResult:
     """Parsed result of a CIGAR string, holding per-operation statistics."""
 
-    cigartuples: List[Tuple[int, int]] = field(default_factory=list)
+    cigartuples: tuple[tuple[int, int], ...] = ()
     #: All (op_code, length) CIGAR operation pairs.
-    cigartuples_without_soft: List[Tuple[int, int]] = field(default_factory=list)
+    cigartuples_without_soft: tuple[tuple[int, int], ...] = ()
     #: CIGAR pairs excluding soft-clip operations.
     lt_soft_len: int = 0
     #: Length of left soft-clipped bases.
@@ -29,44 +42,76 @@ class CigarResult:
     #: Total query length including soft-clips (M+I+S).
 
 
+_CIGAR_PATTERN = re.compile(r"(\d+)([MIDNSHP=XB])")
+_CIGAR_OPS = "MIDNSHP=XB"
+_MATCH, _INS, _DEL, _REF_SKIP, _SOFT_CLIP = range(5)
+
+
+@lru_cache(maxsize=CIGAR_CACHE_SIZE)
 def parse_cigar(cigar: str) -> CigarResult:
     """Parse a SAM CIGAR string into a CigarResult.
 
+    Used for CIGARs only available as text (SA tags); alignments read from a BAM
+    already carry their operations, see :func:`parse_cigartuples`.  Results are
+    cached per string (see :func:`cigar_cache_stats`).
+
     Args:
         cigar: CIGAR string (e.g. ``5S10M2I5M``).
 
     Returns:
         A CigarResult populated with per-operation counts and soft-clip lengths.
     """
-    result = CigarResult()
-    cigar_pattern = re.compile(r"(\d+)([MIDNSHP=XB])")
-    cigar_tuples = cigar_pattern.findall(cigar)
-
-    for op_len, op in cigar_tuples:
-        op_len = int(op_len)
-        op_code = "MIDNSHP=XB".index(op)
-        result.cigartuples.append((op_code, op_len))
-
-        if op_code == 0:  # MATCH
-            result.ref_match += op_len
-            result.read_match += op_len
-            result.query_len += op_len
-            result.cigartuples_without_soft.append((op_code, op_len))
-        elif op_code == 1:  # INS
-            result.indel_len -= op_len
-            result.read_match += op_len
-            result.query_len += op_len
-            result.cigartuples_without_soft.append((op_code, op_len))
-        elif op_code in (2, 3):  # DEL or REF_SKIP
-            result.indel_len += op_len
-            result.ref_match += op_len
-            result.cigartuples_without_soft.append((op_code, op_len))
-        elif op_code == 4:  # SOFT_CLIP
-            result.query_len += op_len
-
-    if result.cigartuples and result.cigartuples[0][0] == 4:  # Left SOFT_CLIP
-        result.lt_soft_len = result.cigartuples[0][1]
-    if result.cigartuples and result.cigartuples[-1][0] == 4:  # Right SOFT_CLIP
-        result.rt_soft_len = result.cigartuples[-1][1]
-
-    return result
+    return parse_cigartuples([(_CIGAR_OPS.index(op), int(op_len)) for op_len, op in _CIGAR_PATTERN.findall(cigar)])
+
+
+def parse_cigartuples(cigartuples: Sequence[tuple[int, int]] | None) -> CigarResult:
+    """Summarize integer CIGAR operations, as pysam's ``cigartuples``, into a CigarResult.
+
+    Args:
+        cigartuples: ``(op_code, length)`` pairs (``M`` = 0 ... ``B`` = 9), or
+            None for an alignment without CIGAR.
+
+    Returns:
+        A CigarResult populated with per-operation counts and soft-clip lengths.
+    """
+    if not cigartuples:
+        return CigarResult()
+    without_soft = []
+    read_match = ref_match = indel_len = query_len = 0
+
+    for op_code, op_len in cigartuples:
+        if op_code == _MATCH:
+            ref_match += op_len
+            read_match += op_len
+            query_len += op_len
+            without_soft.append((op_code, op_len))
+        elif op_code == _INS:
+            indel_len -= op_len
+            read_match += op_len
+            query_len += op_len
+            without_soft.append((op_code, op_len))
+        elif op_code in (_DEL, _REF_SKIP):
+            indel_len += op_len
+            ref_match += op_len
+            without_soft.append((op_code, op_len))
+        elif op_code == _SOFT_CLIP:
+            query_len += op_len
+
+    return CigarResult(
+        tuple(cigartuples),
+        tuple(without_soft),
+        cigartuples[0][1] if cigartuples[0][0] == _SOFT_CLIP else 0,
+        cigartuples[-1][1] if cigartuples[-1][0] == _SOFT_CLIP else 0,
+        read_match,
+        ref_match,
+        indel_len,
+        query_len,
+    )
+
+
+def cigar_cache_stats() -> str:
+    """One-line summary of the :func:`parse_cigar` cache counters of this process."""
+    info = parse_cigar.cache_info()
+    lookups = info.hits + info.misses
+    hit_rate = info.hits / lookups if lookups else 0.0
+    return f"{info.hits} hits, {info.misses} misses ({hit_rate:.1%} hit rate), {info.currsize} of {info.maxsize} CIGARs cached"
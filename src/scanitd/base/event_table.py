@@ -0,0 +1,179 @@
+"""Column-oriented store of :class:`~scanitd.base.Event` objects.
+
+An :class:`EventTable` keeps the numeric fields of its events in NumPy arrays,
+one per field, and their strings (event sequence, alleles, breakpoint region) in
+one shared text buffer addressed by per-event offsets.  Filters are boolean
+masks over the arrays and sorting is an index permutation: both only gather
+the columns and the offsets, never the strings.  :meth:`EventTable.to_events`
+turns rows back into Events for the VCF writer.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from .basic import Event, MicroRegion
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+__all__ = ["EventTable"]
+
+_EVENT_TYPES = ("TDUP", "INS")
+# string columns: event sequence, reference allele, alternate allele, breakpoint region
+_STRING_FIELDS = 4
+
+
+class EventTable:
+    """Events stored column-wise, filtered with masks and sorted with ``lexsort``.
+
+    Attributes:
+        contigs: Contig names; ``contig`` holds indices into this list.
+        contig: Contig index of each event (int32).
+        ref_start: 0-based start (int64).
+        end: 0-based end (int64).
+        event_size: Event size in base pairs (int64).
+        event_type: Index into ``("TDUP", "INS")`` (int8).
+        oao: Original alternate allele observations (int64).
+        ao: Rescued alternate allele observations (int64).
+        dp: Depth (int64).
+        af: Allele frequency, as :attr:`Event.af` (float64).
+    """
+
+    __slots__ = ("_bounds", "_text", "af", "ao", "contig", "contigs", "dp", "end", "event_size", "event_type", "oao", "ref_start")
+
+    def __init__(
+        self,
+        contigs: list[str],
+        columns: dict[str, np.ndarray],
+        text: str,
+        bounds: np.ndarray,
+    ) -> None:
+        """Wrap prepared columns; see :meth:`from_events` to build a table.
+
+        Args:
+            contigs: Contig names indexed by the ``contig`` column.
+            columns: Arrays of equal length keyed by attribute name.
+            text: Shared buffer of the string fields.
+            bounds: ``(n, 4, 2)`` int64 start/stop offsets of the event
+                sequence, reference allele, alternate allele and prefixed
+                breakpoint region of every event in ``text``; a start of -1
+                stands for None.
+        """
+        self.contigs = contigs
+        self.contig = columns["contig"]
+        self.ref_start = columns["ref_start"]
+        self.end = columns["end"]
+        self.event_size = columns["event_size"]
+        self.event_type = columns["event_type"]
+        self.oao = columns["oao"]
+        self.ao = columns["ao"]
+        self.dp = columns["dp"]
+        self.af = columns["af"]
+        self._text = text
+        self._bounds = bounds
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event], contigs: Sequence[str] | None = None) -> EventTable:
+        """Build a table from Events.
+
+        Args:
+            events: Events to store, in row order.
+            contigs: Contig order, e.g. the references of the BAM header.
+                Contigs of events missing from it are appended in order of
+                first appearance.
+
+        Returns:
+            EventTable: The events, one row each.
+
+        Raises:
+            ValueError: If an event is neither a TDUP nor an INS.
+        """
+        contig_names = list(contigs or ())
+        contig_ids = {contig: tid for tid, contig in enumerate(contig_names)}
+        numbers: list[tuple] = []
+        pieces: list[str] = []
+        bounds: list[int] = []
+        offset = 0
+        for event in events:
+            if event.event_type not in _EVENT_TYPES:
+                msg = f"Unknown event_type: {event.event_type!r}"
+                raise ValueError(msg)
+            tid = contig_ids.get(event.chrom)
+            if tid is None:
+                tid = contig_ids[event.chrom] = len(contig_names)
+                contig_names.append(event.chrom)
+            numbers.append(
+                (tid, event.ref_start, event.end, event.event_size, _EVENT_TYPES.index(event.event_type), event.oao, event.ao, event.dp, event.af),
+            )
+            region = event.break_point_region
+            for value in (event.event_sequence, event.ref_allele, event.alt_allele, None if region is None else region.prefixed()):
+                if value is None:
+                    bounds.extend((-1, -1))
+                    continue
+                pieces.append(value)
+                bounds.extend((offset, offset + len(value)))
+                offset += len(value)
+
+        names = ("contig", "ref_start", "end", "event_size", "event_type", "oao", "ao", "dp", "af")
+        dtypes = (np.int32, np.int64, np.int64, np.int64, np.int8, np.int64, np.int64, np.int64, np.float64)
+        rows = list(zip(*numbers, strict=True)) if numbers else [()] * len(names)
+        columns = {name: np.array(values, dtype=dtype) for name, values, dtype in zip(names, rows, dtypes, strict=True)}
+        return cls(contig_names, columns, "".join(pieces), np.array(bounds, dtype=np.int64).reshape(-1, _STRING_FIELDS, 2))
+
+    def __len__(self) -> int:
+        """Number of events."""
+        return len(self.ref_start)
+
+    def __iter__(self) -> Iterator[Event]:
+        """Iterate over the rows as Events."""
+        return iter(self.to_events())
+
+    def take(self, rows: np.ndarray) -> EventTable:
+        """Table of the selected rows, sharing the text buffer.
+
+        Args:
+            rows: Boolean mask or integer row indices.
+        """
+        columns = {name: getattr(self, name)[rows] for name in ("contig", "ref_start", "end", "event_size", "event_type", "oao", "ao", "dp", "af")}
+        return EventTable(self.contigs, columns, self._text, self._bounds[rows])
+
+    def mask(self, min_ao: int = 0, min_depth: int = 0, min_vaf: float = 0.0) -> np.ndarray:
+        """Boolean mask of the events passing the ``AO``/``DP``/``VAF`` thresholds."""
+        return (self.ao >= min_ao) & (self.dp >= min_depth) & (self.af >= min_vaf)
+
+    def filter(self, min_ao: int = 0, min_depth: int = 0, min_vaf: float = 0.0) -> EventTable:
+        """Table of the events passing the thresholds, as ``write_events_to_vcf`` applies them."""
+        return self.take(self.mask(min_ao, min_depth, min_vaf))
+
+    def sort(self) -> EventTable:
+        """Table sorted by contig order, then ``ref_start``; ties keep their row order."""
+        return self.take(np.lexsort((self.ref_start, self.contig)))
+
+    def to_events(self) -> list[Event]:
+        """The rows as Events, identical to those the table was built from."""
+        text = self._text
+        regions: dict[str, MicroRegion] = {}
+        events = []
+        columns = zip(
+            self.contig.tolist(),
+            self.ref_start.tolist(),
+            self.event_size.tolist(),
+            self.event_type.tolist(),
+            self.oao.tolist(),
+            self.ao.tolist(),
+            self.dp.tolist(),
+            self.end.tolist(),
+            self._bounds.tolist(),
+            strict=True,
+        )
+        for tid, ref_start, event_size, event_type, oao, ao, dp, end, bounds in columns:
+            sequence, ref_allele, alt_allele, region = (None if start < 0 else text[start:stop] for start, stop in bounds)
+            if region is not None:
+                if region not in regions:
+                    regions[region] = MicroRegion(region)
+                region = regions[region]
+            events.append(Event(self.contigs[tid], ref_start, event_size, sequence, _EVENT_TYPES[event_type], oao, ao, dp, end, ref_allele, alt_allele, region))
+        return events
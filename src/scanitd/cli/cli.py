@@ -6,9 +6,11 @@ from pathlib import Path
 
 import typer
 from loguru import logger
+from typer.core import TyperGroup
 
 from scanitd import __version__
-from scanitd.inference import scan_itd, write_events_to_vcf
+from scanitd.inference import ScanEngine, iter_events, read_bam_header, write_events_to_vcf
+from scanitd.inference.state import checkpoint_events, load_scan_state
 
 
 def itd_len_type(value: int) -> int:
@@ -41,15 +43,48 @@ class LogLevel(str, Enum):
     TRACE = "TRACE"
 
 
+class DefaultCommandGroup(TyperGroup):
+    """Command group running ``call`` when no subcommand is named.
+
+    Keeps ``scanitd -i in.bam -r ref.fa -o out.vcf`` working next to
+    ``scanitd refilter ...``.
+    """
+
+    default_command = "call"
+
+    def parse_args(self, ctx, args):
+        """Prepend the default command to arguments that do not start with a subcommand."""
+        if args and args[0] not in self.commands:
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
 app = typer.Typer(
+    cls=DefaultCommandGroup,
     context_settings={"help_option_names": ["-h", "--help"]},
     help="ScanITD: detecting internal tandem duplication with robust variant allele frequency estimation",
     add_completion=False,
+    no_args_is_help=True,
 )
 
 
+def configure_logger(log_level: str) -> None:
+    """Send log records of ``log_level`` and above to stdout."""
+    logger.remove()
+
+    logger.add(
+        sys.stdout,
+        level=log_level.upper(),
+        enqueue=True,
+        colorize=True,
+        backtrace=False,
+        diagnose=True,
+    )
+
+
 @app.command(
-    help="Detect internal tandem duplications (ITDs) with robust variant allele frequency estimation."
+    "call",
+    help="Detect internal tandem duplications (ITDs) with robust variant allele frequency estimation.",
 )
 def main(
     input_bam: Path = typer.Option(
@@ -119,6 +154,60 @@ def main(
         "--target",
         help="Limit analysis to targets listed in the BED-format file or a samtools region string",
     ),
+    *,
+    single_pass: bool = typer.Option(
+        False,
+        "--single-pass",
+        help="classify chimeric anchors during the pileup pass instead of scanning the BAM twice",
+    ),
+    engine: ScanEngine = typer.Option(
+        ScanEngine.PILEUP,
+        "--engine",
+        help="counting engine: per-column pileup or per-read replay of the pileup",
+    ),
+    workers: int = typer.Option(
+        1,
+        "--workers",
+        min=1,
+        help="number of worker processes scanning genome shards in parallel",
+    ),
+    threads: int = typer.Option(
+        1,
+        "--threads",
+        min=1,
+        help="number of htslib threads decompressing each opened BAM file, and of threads compressing a .vcf.gz output",
+    ),
+    reference_cache: int = typer.Option(
+        512,
+        "--reference-cache",
+        min=1,
+        help="memory budget in MiB of the in-memory reference sequence, split between the scan's processes",
+    ),
+    catalog_horizon: int | None = typer.Option(
+        None,
+        "--catalog-horizon",
+        min=1,
+        help="bound the soft-clip catalog: drop soft-clips off TDUP breakpoints this many bases behind the scan "
+        "(must exceed the longest insertion-inferred ITD, e.g. 1000; two-pass serial scan only)",
+    ),
+    chimeric_index: bool = typer.Option(
+        False,
+        "--chimeric-index",
+        help="keep the SA-tagged alignments in a sidecar BAM next to the input and read anchors from it on reruns "
+        "(two-pass serial scan only)",
+    ),
+    chimeric_index_dir: Path | None = typer.Option(
+        None,
+        "--chimeric-index-dir",
+        file_okay=False,
+        help="directory of the chimeric index instead of the BAM's directory (implies --chimeric-index)",
+    ),
+    state_dir: Path | None = typer.Option(
+        None,
+        "--state-dir",
+        file_okay=False,
+        help="save the unfiltered events to this directory, so 'scanitd refilter' can apply other thresholds without rescanning",
+    ),
     log_level: LogLevel = typer.Option(LogLevel.INFO, "-l", "--log-level", help="set the logging level."),
     version: bool | None = typer.Option(
         None,
@@ -134,7 +223,8 @@ def main(
     Args:
         input_bam: Path to the aligned BAM file (must be indexed).
         ref: Path to the reference FASTA file (must have .fai index).
-        output: Output VCF file path (stem used as sample name).
+        output: Output VCF file path (stem used as sample name); ``.vcf.gz`` is
+            written as BGZF with a tabix index.
         mapq: Minimum MAPQ score for a read to be included (default: 15).
         ao: Minimum alternate allele observation count to report an event (default: 4).
         dp: Minimum read depth at the locus to report an event (default: 10).
@@ -143,20 +233,22 @@ def main(
         mismatch_sr: Maximum mismatches for soft-read rescue alignment (default: 1).
         mismatch_insertion: Maximum mismatches for insertion-inferred duplication (default: 2).
         target: BED file path or samtools region string to restrict analysis.
+        single_pass: Read the BAM once, resolving TDUP anchors during the pileup pass.
+        engine: Counting engine, ``pileup`` or ``read`` (default: pileup).
+        workers: Number of worker processes (default: 1).
+        threads: Number of htslib decompression threads per BAM handle, and of
+            threads compressing a ``.vcf.gz`` output (default: 1).
+        reference_cache: Reference cache budget in MiB, split between the processes (default: 512).
+        catalog_horizon: Horizon in bases of a bounded soft-clip catalog (default: unbounded).
+        chimeric_index: Read anchor candidates from the BAM's chimeric index (default: off).
+        chimeric_index_dir: Directory of the chimeric index (default: next to the BAM).
+        state_dir: Directory receiving the unfiltered scan state (default: not saved).
         log_level: Logging verbosity level (default: INFO).
         version: When provided, prints version and exits.
     """
-    logger.remove()
-
-    logger.add(
-        sys.stdout,
-        level=log_level.upper(),
-        enqueue=True,
-        colorize=True,
-        backtrace=False,
-        diagnose=True,
-    )
-    event_list, bam_header = scan_itd(
+    configure_logger(log_level)
+    bam_header = read_bam_header(input_bam)
+    events = iter_events(
         in_bam_path=input_bam,
         mapq_cutoff=mapq,
         ref_genome=ref,
@@ -165,9 +257,94 @@ def main(
         allowed_mismatches_for_sr_rescue=mismatch_sr,
         allowed_mismatches_for_insertion=mismatch_insertion,
         logger=logger,
+        single_pass=single_pass,
+        engine=engine,
+        workers=workers,
+        threads=threads,
+        reference_cache_bytes=reference_cache * 1024 * 1024,
+        catalog_horizon=catalog_horizon,
+        chimeric_index=chimeric_index,
+        chimeric_index_dir=chimeric_index_dir,
     )
 
-    write_events_to_vcf(output, bam_header, event_list, logger, min_ao=ao, min_depth=dp, min_vaf=vaf)
+    if state_dir is not None:
+        parameters = {
+            "input": str(input_bam),
+            "ref": str(ref),
+            "target": target,
+            "mapq": mapq,
+            "itd_len": itd_len,
+            "mismatch_sr": mismatch_sr,
+            "mismatch_insertion": mismatch_insertion,
+        }
+        events = checkpoint_events(state_dir, bam_header, events, parameters, logger)
+
+    write_events_to_vcf(output, bam_header, events, logger, min_ao=ao, min_depth=dp, min_vaf=vaf, threads=threads)
+
+
+@app.command(help="Rebuild the VCF of a scan saved with --state-dir, applying new thresholds.")
+def refilter(
+    state_dir: Path = typer.Option(
+        ...,
+        "-s",
+        "--state-dir",
+        help="state directory written by 'scanitd --state-dir'",
+        exists=True,
+        file_okay=False,
+    ),
+    output: str = typer.Option(
+        ...,
+        "-o",
+        "--output",
+        help="output VCF file",
+    ),
+    ao: int = typer.Option(
+        4,
+        "-c",
+        "--ao",
+        help="minimum observation count for ITD",
+    ),
+    dp: int = typer.Option(
+        10,
+        "-d",
+        "--depth",
+        help="minimum depth to call ITD",
+    ),
+    vaf: float = typer.Option(
+        0.1,
+        "-f",
+        "--vaf",
+        help="minimum variant allele frequency",
+    ),
+    threads: int = typer.Option(
+        1,
+        "--threads",
+        min=1,
+        help="number of threads compressing a .vcf.gz output",
+    ),
+    log_level: LogLevel = typer.Option(LogLevel.INFO, "-l", "--log-level", help="set the logging level."),
+):
+    """Write the VCF of a saved scan state with new AO, depth and VAF thresholds.
+
+    Args:
+        state_dir: State directory written by ``--state-dir``.
+        output: Output VCF file path (stem used as sample name); ``.vcf.gz`` is
+            written as BGZF with a tabix index.
+        ao: Minimum alternate allele observation count to report an event (default: 4).
+        dp: Minimum read depth at the locus to report an event (default: 10).
+        vaf: Minimum variant allele frequency to report an event (default: 0.1).
+        threads: Number of threads compressing a ``.vcf.gz`` output (default: 1).
+        log_level: Logging verbosity level (default: INFO).
+    """
+    configure_logger(log_level)
+    try:
+        state = load_scan_state(state_dir)
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--state-dir") from e
+    parameters = ", ".join(f"{key}={value}" for key, value in state.parameters.items())
+    logger.info(f"Loaded {len(state.events)} events scanned with {parameters}")
+
+    write_events_to_vcf(output, state.bam_header, state.events, logger, min_ao=ao, min_depth=dp, min_vaf=vaf, threads=threads)
 
 
 if __name__ == "__main__":
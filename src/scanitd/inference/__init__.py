@@ -1,10 +1,11 @@
 """Variant calling pipeline for ScanITD.
 
-Provides the main :func:`scan_itd` entry point for scanning BAM files
-and the :func:`write_events_to_vcf` function for VCF output.
+Provides the main :func:`scan_itd` entry point for scanning BAM files, its
+streaming counterpart :func:`iter_events`, and the :func:`write_events_to_vcf`
+function for VCF output.
 """
 
-from .main import scan_itd
 from .helper import write_events_to_vcf
+from .main import ScanEngine, iter_events, read_bam_header, scan_itd
 
-__all__ = ["scan_itd", "write_events_to_vcf"]
+__all__ = ["ScanEngine", "iter_events", "read_bam_header", "scan_itd", "write_events_to_vcf"]
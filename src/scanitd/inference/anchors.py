@@ -0,0 +1,195 @@
+"""Array-backed table of the TDUP anchors of a scan.
+
+The anchor scan finds one :class:`~scanitd.inference.evidence.TdupAnchor` per
+chimeric read, so a sample dense in SA-tagged reads holds millions of them.
+As a dict of NamedTuples every anchor costs a tuple, a dict slot and two boxed
+ints.  The reads of one TDUP extract equal anchors but for their strand, so
+:class:`AnchorTable` keeps each distinct anchor once, in a pool, and stores
+per read only the pool id and strand of its anchor in an ``array("i")``.
+
+Read name hashes (:func:`~scanitd.inference.readnames.read_name_hash`) are
+found through a sorted ``array("Q")`` of hashes with their row numbers: about
+18 bytes per anchor in all, with the prefix directory and the bit filter below,
+instead of about 100 in the dict.  Names added since the index was last merged
+wait in a small dict, merged once it holds an eighth as many names as the
+index.  A one-hash bit filter over the indexed hashes answers most misses, and
+a directory of the hash prefixes narrows each binary search to a few rows.
+
+The trade-off is lookup time: a dict probe is a single hash lookup, while the
+table checks the pending names, the filter and then searches the index.  With
+56 000 anchors ``benchmarks/bench_anchor_table.py`` measures ``get`` of an
+anchored name about 5x and ``in`` of an unanchored one about 3x slower than in
+a dict of anchors, for 7x less memory; on small tables the ratios are larger,
+as the dict stays in the CPU caches.  The anchors themselves are not rebuilt:
+``table[name_key]`` returns the pooled TdupAnchor, shared, like its ``tdup_id``
+and ``break_point_region``, by the reads of a TDUP.
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+    from .evidence import TdupAnchor
+
+__all__ = ["AnchorTable"]
+
+# the pending names are merged into the index once there are this many of them
+# and at least an eighth as many as indexed names, so merging stays linear overall
+_MIN_PENDING = 1024
+_PENDING_SHARE = 8
+# bits of the name filter per indexed name, rounded up to a power of two
+_FILTER_BITS_PER_NAME = 8
+# indexed names per prefix of the directory, at most
+_NAMES_PER_PREFIX = 4
+
+
+class AnchorTable:
+    """TDUP anchors keyed by read name hash, stored in typed arrays.
+
+    Supports the read side of the dict protocol (``in``, ``[]``, ``get``,
+    ``len``, ``keys``, ``values``, ``items``), item assignment, which replaces
+    the anchor of a name already present, and :meth:`update`.
+    """
+
+    def __init__(self) -> None:
+        # anchor pool: each distinct anchor under both strands, at 2 * id (+)
+        # and 2 * id + 1 (-), keyed by the anchor without its strand
+        self._anchors: list[TdupAnchor] = []
+        self._anchor_ids: dict[tuple, int] = {}
+
+        # rows are numbered in insertion order; the index holds the sorted name
+        # hashes of all rows but the pending ones, the directory the index
+        # position of each hash prefix and the filter a bit per hash
+        self._anchor = array("i")
+        self._index = array("Q")
+        self._index_rows = array("I")
+        self._pending: dict[int, int] = {}
+        self._directory = array("I", [0, 0, 0])
+        self._prefix_shift = 63
+        self._filter = bytearray(1)
+        self._filter_mask = 0
+
+    def __len__(self) -> int:
+        return len(self._anchor)
+
+    def __contains__(self, name_key: int) -> bool:
+        return self._row(name_key) is not None
+
+    def __getitem__(self, name_key: int) -> TdupAnchor:
+        row = self._row(name_key)
+        if row is None:
+            raise KeyError(name_key)
+        return self._anchors[self._anchor[row]]
+
+    def __setitem__(self, name_key: int, anchor: TdupAnchor) -> None:
+        pooled = self._pool(anchor)
+        row = self._row(name_key)
+        if row is not None:
+            self._anchor[row] = pooled
+            return
+        self._pending[name_key] = len(self._anchor)
+        self._anchor.append(pooled)
+        if len(self._pending) >= max(_MIN_PENDING, len(self._index) // _PENDING_SHARE):
+            self._merge()
+
+    def __iter__(self) -> Iterator[int]:
+        return self.keys()
+
+    def __getstate__(self) -> tuple:
+        self._merge()
+        return tuple(getattr(self, name) for name in _STATE)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(_STATE, state, strict=True):
+            setattr(self, name, value)
+
+    def get(self, name_key: int, default: TdupAnchor | None = None) -> TdupAnchor | None:
+        """Return the anchor of ``name_key``, or ``default``."""
+        row = self._row(name_key)
+        return default if row is None else self._anchors[self._anchor[row]]
+
+    def keys(self) -> Iterator[int]:
+        """Read name hashes, in insertion order."""
+        names = np.empty(len(self), dtype=np.uint64)
+        names[np.frombuffer(self._index_rows, dtype=np.uint32)] = np.frombuffer(self._index, dtype=np.uint64)
+        for name_key, row in self._pending.items():
+            names[row] = name_key
+        return iter(names.tolist())
+
+    def values(self) -> Iterator[TdupAnchor]:
+        """Anchors, in insertion order."""
+        anchors = self._anchors
+        return (anchors[pooled] for pooled in self._anchor)
+
+    def items(self) -> Iterator[tuple[int, TdupAnchor]]:
+        """``(name hash, anchor)`` pairs, in insertion order."""
+        return zip(self.keys(), self.values(), strict=True)
+
+    def update(self, other: AnchorTable | Mapping[int, TdupAnchor]) -> None:
+        """Add or replace the anchors of ``other``, like ``dict.update``."""
+        for name_key, anchor in other.items():
+            self[name_key] = anchor
+
+    def nbytes(self) -> int:
+        """Size of the rows and the merged name index, excluding the pending names and the anchor pool."""
+        columns = (self._anchor, self._index, self._index_rows, self._directory)
+        return sum(column.itemsize * len(column) for column in columns) + len(self._filter)
+
+    def _pool(self, anchor: TdupAnchor) -> int:
+        """Pool entry of ``anchor``, adding it under both strands if new."""
+        key = anchor[:3] + anchor[4:]
+        anchor_id = self._anchor_ids.get(key)
+        if anchor_id is None:
+            anchor_id = self._anchor_ids[key] = len(self._anchors) // 2
+            self._anchors += (anchor._replace(strand="+"), anchor._replace(strand="-"))
+        return 2 * anchor_id + (anchor.strand == "-")
+
+    def _row(self, name_key: int) -> int | None:
+        row = self._pending.get(name_key)
+        if row is not None:
+            return row
+        bit = name_key & self._filter_mask
+        if not self._filter[bit >> 3] >> (bit & 7) & 1:
+            return None
+        prefix = name_key >> self._prefix_shift
+        index = self._index
+        position = bisect_left(index, name_key, self._directory[prefix], self._directory[prefix + 1])
+        if position < len(index) and index[position] == name_key:
+            return self._index_rows[position]
+        return None
+
+    def _merge(self) -> None:
+        """Move the pending names into the sorted index and rebuild the directory and filter."""
+        if not self._pending:
+            return
+        pending = np.fromiter(self._pending, dtype=np.uint64, count=len(self._pending))
+        pending_rows = np.fromiter(self._pending.values(), dtype=np.uint32, count=len(self._pending))
+        order = np.argsort(pending)
+        pending, pending_rows = pending[order], pending_rows[order]
+        index = np.frombuffer(self._index, dtype=np.uint64)
+        positions = np.searchsorted(index, pending)
+        index = np.insert(index, positions, pending)
+        self._index_rows = array("I", np.insert(np.frombuffer(self._index_rows, dtype=np.uint32), positions, pending_rows).tobytes())
+        self._index = array("Q", index.tobytes())
+        self._pending = {}
+
+        prefix_bits = max(1, (len(index) // _NAMES_PER_PREFIX).bit_length())
+        self._prefix_shift = 64 - prefix_bits
+        prefixes = np.arange((1 << prefix_bits) + 1, dtype=np.uint64)
+        self._directory = array("I", np.searchsorted(index >> np.uint64(self._prefix_shift), prefixes).astype(np.uint32).tobytes())
+
+        filter_bits = 1 << max(3, (_FILTER_BITS_PER_NAME * len(index) - 1).bit_length())
+        bits = np.zeros(filter_bits, dtype=bool)
+        bits[index & np.uint64(filter_bits - 1)] = True
+        self._filter = bytearray(np.packbits(bits, bitorder="little").tobytes())
+        self._filter_mask = filter_bits - 1
+
+
+_STATE = tuple(name for name in vars(AnchorTable()) if name.startswith("_"))
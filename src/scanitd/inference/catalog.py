@@ -0,0 +1,214 @@
+"""Compact storage of the soft-clipped sequences kept for split-read rescue.
+
+The catalog maps a rescue key ``(chrom, position, MappingMode)`` to the
+soft-clips collected there.  Storing every clip as its own ``str`` in a list
+costs some 80 bytes of object overhead per read, which dominates the memory of a
+deep scan.  :class:`SoftclipCatalog` keeps all clips of a key in one ``bytes``
+bin instead: every distinct clip is a record of its multiplicity, its length and
+its bases packed two bits each (A, C, G, T), with an escape to plain bytes for
+clips containing any other symbol (``N``, IUPAC codes).
+
+A bin is ``varint(len(compacted)) + compacted + pending``.  New clips are
+appended in place to the pending records of a ``bytearray`` bin; once those
+outgrow the compacted ones, both are merged so that each distinct clip is stored
+once with its count, and the bin is frozen back to ``bytes``.  The pending
+records at least double the bin between merges, so appending and merging cost
+amortized constant time per clip, and readers always see the merged view.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Mapping
+
+__all__ = ["SoftclipCatalog"]
+
+_PACK = str.maketrans("ACGT", "0123")
+# every byte value as the four bases it packs
+_UNPACK = ["".join("ACGT"[(byte >> shift) & 3] for shift in (6, 4, 2, 0)) for byte in range(256)]
+_MIN_COMPACTION = 32
+# continuation bit of a LEB128 varint byte
+_VARINT_MORE = 0x80
+
+
+class SoftclipCatalog:
+    """Soft-clip multiset per rescue key, packed two bits per base.
+
+    Supports the mapping protocol on keys (``in``, ``len``, iteration, ``del``);
+    the clips of a key are read back with :meth:`clips`.
+    """
+
+    __slots__ = ("_bins",)
+
+    def __init__(self) -> None:
+        self._bins: dict[tuple, bytes | bytearray] = {}
+
+    @classmethod
+    def from_mapping(cls, sequences: Mapping[tuple, Iterable[str]]) -> SoftclipCatalog:
+        """Build a catalog from a mapping of keys to sequences (lists or Counters)."""
+        catalog = cls()
+        for key, clips in sequences.items():
+            counts: dict[str, int] = {}
+            items = clips.items() if hasattr(clips, "items") else ((clip, 1) for clip in clips)
+            for clip, count in items:
+                counts[clip] = counts.get(clip, 0) + count
+            if counts:
+                catalog._bins[key] = _bin(b"".join(_record(clip, count) for clip, count in counts.items() if count > 0))
+        return catalog
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._bins
+
+    def __len__(self) -> int:
+        return len(self._bins)
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self._bins)
+
+    def __delitem__(self, key: tuple) -> None:
+        del self._bins[key]
+
+    def __getstate__(self) -> tuple[dict[tuple, bytes | bytearray]]:
+        return (self._bins,)
+
+    def __setstate__(self, state: tuple[dict[tuple, bytes | bytearray]]) -> None:
+        (self._bins,) = state
+
+    def add(self, key: tuple, sequence: str) -> None:
+        """Add one soft-clip at ``key``."""
+        record = _record(sequence, 1)
+        old = self._bins.get(key)
+        if old is None:
+            self._bins[key] = _bin(record)
+            return
+        if type(old) is bytes:
+            # first pending record since the last merge: thaw the bin once
+            old = self._bins[key] = bytearray(old)
+        old += record
+        compacted_len, offset = _varint(old, 0)
+        if len(old) - offset - compacted_len >= max(compacted_len, _MIN_COMPACTION):
+            self._bins[key] = _bin(_encode(_merge(old, offset)))
+
+    def remove(self, key: tuple, sequence: str) -> None:
+        """Remove one occurrence of ``sequence`` at ``key``; drop the key once empty.
+
+        Raises:
+            KeyError: When the key or the sequence is not in the catalog.
+        """
+        packed = self._bins[key]
+        counts = _merge(packed, _varint(packed, 0)[1])
+        body = _record(sequence, 1)[1:]
+        if body not in counts:
+            msg = f"{sequence!r} is not catalogued at {key}"
+            raise KeyError(msg)
+        counts[body] -= 1
+        if not counts[body]:
+            del counts[body]
+        if counts:
+            self._bins[key] = _bin(_encode(counts))
+        else:
+            del self._bins[key]
+
+    def clips(self, key: tuple) -> Iterator[tuple[str, int]]:
+        """Yield the distinct soft-clips at ``key`` with their multiplicities.
+
+        Clips come in order of first appearance; sequences are decoded one at a
+        time.  A missing key yields nothing.
+        """
+        packed = self._bins.get(key)
+        if packed is None:
+            return
+        for body, count in _merge(packed, _varint(packed, 0)[1]).items():
+            yield _decode(body), count
+
+    def counts(self, key: tuple) -> dict[str, int]:
+        """Return the soft-clips at ``key`` as a ``{sequence: multiplicity}`` dict."""
+        return dict(self.clips(key))
+
+    def subset(self, keys: Iterable[tuple]) -> SoftclipCatalog:
+        """Return a catalog of the given keys, sharing their packed bins.
+
+        Bins still taking clips are copied, so later adds to either catalog
+        leave the other unchanged.
+        """
+        catalog = SoftclipCatalog()
+        catalog._bins = {key: bytes(self._bins[key]) for key in keys if key in self._bins}
+        return catalog
+
+    def nbytes(self) -> int:
+        """Size of the packed bins, excluding keys and the dict holding them."""
+        return sum(len(packed) for packed in self._bins.values())
+
+
+def _varint(buffer: bytes | bytearray, offset: int) -> tuple[int, int]:
+    """Decode the LEB128 varint at ``offset``; return ``(value, next offset)``."""
+    value = shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < _VARINT_MORE:
+            return value, offset
+        shift += 7
+
+
+def _to_varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= _VARINT_MORE:
+        out.append((value & 0x7F) | _VARINT_MORE)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _record(sequence: str, count: int) -> bytes:
+    """Encode ``count`` copies of ``sequence``: count, header, payload.
+
+    The header is ``length << 1 | escaped``; the payload is the bases packed four
+    per byte (first base in the high bits of the zero-padded leading byte), or the
+    ASCII sequence when it holds anything but A, C, G and T.
+    """
+    length = len(sequence)
+    digits = sequence.translate(_PACK)
+    if length and digits.isdigit() and digits.isascii() and max(digits) < "4":
+        payload = int(digits, 4).to_bytes((length + 3) // 4, "big")
+        header = length << 1
+    else:
+        payload = sequence.encode("ascii")
+        header = length << 1 | 1
+    return _to_varint(count) + _to_varint(header) + payload
+
+
+def _decode(body: bytes) -> str:
+    """Decode the header and payload of a record to its sequence."""
+    header, offset = _varint(body, 0)
+    length = header >> 1
+    if header & 1:
+        return body[offset:].decode("ascii")
+    payload = body[offset:]
+    return "".join(map(_UNPACK.__getitem__, payload))[4 * len(payload) - length :]
+
+
+def _merge(packed: bytes | bytearray, offset: int) -> dict[bytes, int]:
+    """Sum the counts of identical records from ``offset`` to the end of a bin."""
+    counts: dict[bytes, int] = {}
+    end = len(packed)
+    while offset < end:
+        count, offset = _varint(packed, offset)
+        header, payload_start = _varint(packed, offset)
+        length = header >> 1
+        stop = payload_start + (length if header & 1 else (length + 3) // 4)
+        body = bytes(packed[offset:stop])
+        counts[body] = counts.get(body, 0) + count
+        offset = stop
+    return counts
+
+
+def _encode(counts: dict[bytes, int]) -> bytes:
+    return b"".join(_to_varint(count) + body for body, count in counts.items())
+
+
+def _bin(compacted: bytes) -> bytes:
+    return _to_varint(len(compacted)) + compacted
@@ -0,0 +1,124 @@
+"""Sidecar index of the chimeric alignments of a BAM, reused across runs.
+
+The anchor scan of :func:`scan_itd` reads every alignment of the BAM, yet only
+the small fraction carrying a single ``SA`` tag can be a TDUP anchor.  The
+chimeric index is a BAM of just those alignments (primary, one SA segment, no
+``XA`` tag), written next to the input BAM or into a cache directory and indexed
+like it.  A later run over the same BAM, e.g. with another MAPQ, length or
+microinsertion cutoff, fetches its anchor candidates from the index instead.
+None of the filters applied when writing depends on a cutoff, and the index
+keeps the order and the header of the BAM, so anchors are identical.
+
+The index is tied to its BAM by a fingerprint recorded in an ``@CO`` header line:
+the BAM's size, modification time and the SHA-256 of its header text.  An index
+whose fingerprint does not match is rebuilt.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pysam
+
+if TYPE_CHECKING:
+    from pysam import AlignedSegment, AlignmentFile
+
+    from scanitd.mtype import LoggerType
+
+__all__ = ["INDEX_SUFFIX", "bam_fingerprint", "chimeric_index_path", "is_chimeric_candidate", "open_chimeric_index", "write_chimeric_index"]
+
+INDEX_SUFFIX = ".scanitd-sa.bam"
+_COMMENT_PREFIX = "scanitd-chimeric-index v1 "
+
+
+def chimeric_index_path(bam_path: Path, index_dir: Path | None = None) -> Path:
+    """Path of the chimeric index of ``bam_path``, in ``index_dir`` or next to the BAM."""
+    bam_path = Path(bam_path)
+    return Path(index_dir or bam_path.parent) / f"{bam_path.name}{INDEX_SUFFIX}"
+
+
+def bam_fingerprint(bam_path: Path, bam_object: AlignmentFile) -> str:
+    """Fingerprint of a BAM: size, modification time and header checksum."""
+    stat = Path(bam_path).stat()
+    header_sha256 = hashlib.sha256(str(bam_object.header).encode()).hexdigest()
+    return f"size={stat.st_size} mtime_ns={stat.st_mtime_ns} header_sha256={header_sha256}"
+
+
+def is_chimeric_candidate(read: AlignedSegment) -> bool:
+    """Whether an alignment can be a TDUP anchor, whatever the scan cutoffs.
+
+    These are the cutoff-independent conditions of
+    :meth:`~scanitd.inference.main.BamScanner.extract_anchor`.
+    """
+    return (
+        read.has_tag("SA")
+        and not read.is_supplementary
+        and not read.is_secondary
+        and not read.has_tag("XA")
+        and len(read.get_tag("SA")[:-1].split(";")) == 1  # type: ignore
+    )
+
+
+def write_chimeric_index(bam_path: Path, bam_object: AlignmentFile, index_path: Path) -> int:
+    """Write the chimeric index of a BAM and its ``.bai``; return the number of records.
+
+    Both files are written under temporary names and moved into place, so a
+    concurrent or interrupted run never sees a partial index.
+    """
+    header = bam_object.header.to_dict()
+    header["CO"] = [*header.get("CO", []), _COMMENT_PREFIX + bam_fingerprint(bam_path, bam_object)]
+
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{index_path.name}.", suffix=".bam", dir=index_path.parent)
+    os.close(fd)
+    tmp_path = Path(tmp_name)
+    records = 0
+    try:
+        with pysam.AlignmentFile(str(tmp_path), "wb", header=header) as out:
+            for read in bam_object.fetch():
+                if is_chimeric_candidate(read):
+                    out.write(read)
+                    records += 1
+        pysam.index(str(tmp_path))
+        Path(f"{tmp_path}.bai").replace(f"{index_path}.bai")
+        tmp_path.replace(index_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        Path(f"{tmp_path}.bai").unlink(missing_ok=True)
+    return records
+
+
+def open_chimeric_index(bam_path: Path, bam_object: AlignmentFile, logger: LoggerType, index_dir: Path | None = None) -> AlignmentFile | None:
+    """Open the chimeric index of a BAM, (re)building it if missing or stale.
+
+    Args:
+        bam_path: Path to the input BAM file.
+        bam_object: Open pysam AlignmentFile of the BAM.
+        logger: Logger instance implementing LoggerType.
+        index_dir: Directory of the index; None places it next to the BAM.
+
+    Returns:
+        AlignmentFile | None: The open index, or None if it could not be
+            written (the anchor scan then reads the BAM).
+    """
+    index_path = chimeric_index_path(bam_path, index_dir)
+    expected = _COMMENT_PREFIX + bam_fingerprint(bam_path, bam_object)
+    if index_path.exists() and Path(f"{index_path}.bai").exists():
+        index = pysam.AlignmentFile(str(index_path), "rb")
+        if expected in index.header.to_dict().get("CO", []):
+            logger.info(f"Reading chimeric alignments from {index_path}")
+            return index
+        index.close()
+        logger.info(f"Chimeric index {index_path} does not match {bam_path}, rebuilding it")
+
+    try:
+        records = write_chimeric_index(bam_path, bam_object, index_path)
+    except OSError as e:
+        logger.warning(f"Cannot write the chimeric index {index_path} ({e}); scanning the BAM instead")
+        return None
+    logger.info(f"Wrote {records} chimeric alignments to {index_path}")
+    return pysam.AlignmentFile(str(index_path), "rb")
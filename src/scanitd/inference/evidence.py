@@ -0,0 +1,482 @@
+"""Evidence bookkeeping shared by the BAM scanning engines.
+
+:class:`EvidenceCollector` owns everything the pileup stage of :func:`scan_itd`
+accumulates: TDUP and INS allele observations, their allele dictionaries, the
+soft-clipped sequences kept for split-read rescue, and the set of read names that
+have already been counted (as hashes, see :mod:`scanitd.inference.readnames`).  Every engine feeds it one pileup read at a time, so
+the counting rules live in exactly one place.
+
+Only the soft-clips at TDUP breakpoints are ever consulted by the split-read
+rescue.  With a ``catalog_horizon`` the collector keeps the catalog bounded: the
+breakpoints of all anchors are known before the counting pass, and a breakpoint
+of an insertion-inferred TDUP lies at most ``catalog_horizon`` bases behind the
+column the insertion is seen at, so every other soft-clip is dropped once the
+pileup sweep is that far past it.  Peak memory then follows the local read
+density rather than the genome size.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from scanitd.base import LazyRead, MappingMode, MicroRegion
+
+from .catalog import SoftclipCatalog
+from .finalize import rescue_keys
+from .helper import get_insertion_reference_pos, self_loop_checker
+from .readnames import ReadNameSet, last_observable_position, read_name_hash
+
+if TYPE_CHECKING:
+    from pyfaidx import Fasta
+    from pysam import AlignedSegment
+
+    from .anchors import AnchorTable
+
+__all__ = ["EvidenceCollector", "TdupAnchor", "resolve_tdup_id"]
+
+
+class TdupAnchor(NamedTuple):
+    """TDUP described by an SA-tagged primary alignment.
+
+    ``tdup_id`` and ``ref_allele`` depend only on the coordinates and the
+    breakpoint region, so they are resolved once, when the anchor is extracted,
+    rather than each time one of the anchor's reads is counted.
+    """
+
+    chrom: str
+    tdup_ref_start: int
+    tdup_ref_end: int
+    strand: str
+    break_point_region: MicroRegion
+    tdup_id: tuple
+    ref_allele: str
+
+
+def resolve_tdup_id(
+    genome_fasta: Fasta,
+    chrom: str,
+    tdup_ref_start: int,
+    tdup_ref_end: int,
+    break_point_region: MicroRegion,
+) -> tuple[tuple, str]:
+    """Build the TDUP id and reference allele of a TDUP.
+
+    Args:
+        genome_fasta: Reference genome Fasta object.
+        chrom: Chromosome name.
+        tdup_ref_start: 0-based start of the duplicated sequence.
+        tdup_ref_end: 0-based exclusive end of the duplicated sequence.
+        break_point_region: MicroRegion at the breakpoint.
+
+    Returns:
+        tuple: ``(tdup_id, ref_allele)``.
+    """
+    tdup_seq = genome_fasta[chrom][tdup_ref_start:tdup_ref_end].seq
+    tdup_id = (
+        chrom,
+        tdup_ref_start,
+        tdup_ref_end - tdup_ref_start,
+        tdup_seq,
+        break_point_region,
+    )
+    ref_allele = genome_fasta[chrom][tdup_ref_start : tdup_ref_start + 1].seq
+    return tdup_id, ref_allele
+
+
+class EvidenceCollector:
+    """Accumulate TDUP/INS support and rescue candidates for one scan.
+
+    In the default two-pass mode every TDUP anchor is known before the first
+    pileup read is observed.  With ``deferred_anchors=True`` anchors may be
+    registered while the scan is running (single-pass mode); the collector then
+    journals how each counted read name was spent so that a late anchor can move
+    an already collected soft-clip, or an earlier anchor count, to the anchor's
+    TDUP.  The final counts are identical to those of the two-pass scan.
+
+    Args:
+        genome_fasta: Reference genome Fasta object.
+        tdup_anchors: Mapping of query name hash (:func:`read_name_hash`) to
+            :class:`TdupAnchor`, a dict or an
+            :class:`~scanitd.inference.anchors.AnchorTable`.
+        mapq_cutoff: Minimum mapping quality for a read to be counted.
+        itd_length_cutoff: Minimum insertion length inspected for ITDs.
+        allowed_mismatches_for_insertion: Max mismatches allowed when classifying
+            a large insertion as a TDUP via self-loop checking.
+        deferred_anchors: Allow :meth:`register_anchor` after observation started.
+        catalog_horizon: Bound the soft-clip catalog, evicting soft-clips that are
+            not TDUP breakpoints once the sweep is this many bases past them.  Must
+            exceed the longest insertion-inferred TDUP; requires every anchor up
+            front and columns observed in coordinate order.  None keeps the whole
+            catalog.
+        name_window: Forget counted read names once the sweep has passed every
+            alignment that can carry them.  Requires every anchor up front and
+            regions scanned in coordinate order, without overlaps.
+
+    Attributes:
+        counted_names: :class:`~scanitd.inference.readnames.ReadNameSet` of the
+            read names counted so far.
+        catalog_evictions: Number of soft-clip catalog keys evicted.
+        late_breakpoints: Number of insertion-inferred TDUP breakpoints found
+            behind already evicted soft-clips (their rescue may be incomplete).
+    """
+
+    def __init__(
+        self,
+        genome_fasta: Fasta,
+        tdup_anchors: dict[int, TdupAnchor] | AnchorTable,
+        mapq_cutoff: int,
+        itd_length_cutoff: int,
+        allowed_mismatches_for_insertion: int,
+        *,
+        deferred_anchors: bool = False,
+        catalog_horizon: int | None = None,
+        name_window: bool = False,
+    ) -> None:
+        """Initialize an empty collector."""
+        if catalog_horizon is not None and (deferred_anchors or catalog_horizon < 1):
+            msg = f"a bounded soft-clip catalog needs all anchors up front and a positive horizon, got {catalog_horizon=}, {deferred_anchors=}"
+            raise ValueError(msg)
+        if name_window and deferred_anchors:
+            msg = "a read name window needs all anchors up front"
+            raise ValueError(msg)
+        self.genome_fasta = genome_fasta
+        self.tdup_anchors = tdup_anchors
+        self.mapq_cutoff = mapq_cutoff
+        self.itd_length_cutoff = itd_length_cutoff
+        self.allowed_mismatches_for_insertion = allowed_mismatches_for_insertion
+        self.deferred_anchors = deferred_anchors
+        self.catalog_horizon = catalog_horizon
+
+        self.to_be_rescued_sequences = SoftclipCatalog()
+        self.counted_names = ReadNameSet(windowed=name_window)
+        self._names_swept_to = -1
+
+        self.tdup_ao: defaultdict[tuple, int] = defaultdict(int)
+        self.tdup_allele_dict: dict[tuple, tuple[str, str]] = {}
+
+        self.ins_ao: defaultdict[tuple, int] = defaultdict(int)
+        self.ins_allele_dict: dict[tuple, tuple[str, str]] = {}
+
+        # (chrom, reference_pos, insertion_size, insertion_seq) -> self_loop_checker result
+        self._self_loop_verdicts: dict[tuple, tuple[bool, int, str]] = {}
+
+        # single-pass bookkeeping: read name hash -> (tick, kind, payload)
+        self._journal: dict[int, tuple[int, str, Any]] = {}
+        self._tick = 0
+
+        # bounded catalog: keys never evicted, (position, key) heap of the others,
+        # chromosome of the sweep and per chromosome the end of the evicted stretch
+        self._breakpoints: set[tuple] = set()
+        if catalog_horizon is not None:
+            for anchor in tdup_anchors.values():
+                self._breakpoints.update(rescue_keys(*anchor.tdup_id[:3]))
+        self._evictable: list[tuple[int, tuple]] = []
+        self._sweep_chrom: str | None = None
+        self._evicted_below: dict[str, int] = {}
+        self.catalog_evictions = 0
+        self.late_breakpoints = 0
+
+    def observe(
+        self,
+        read: AlignedSegment,
+        position_of_pileup_site: int | None,
+        indel: int,
+        reference_pos: int,
+    ) -> None:
+        """Observe one read at one pileup column.
+
+        Args:
+            read: The aligned segment covering the column.
+            position_of_pileup_site: Query position of the read base at the column
+                (``None`` for deletions and reference skips).
+            indel: Indel length following this base (``PileupRead.indel``).
+            reference_pos: 0-based reference position of the pileup column.
+        """
+        if not position_of_pileup_site or read.mapping_quality < self.mapq_cutoff:
+            return
+        self._tick += 1
+
+        read_name = read.query_name
+        chrm_ra = read.reference_name
+        cigar_ra = read.cigarstring
+
+        if self.catalog_horizon is not None and (
+            chrm_ra != self._sweep_chrom or (self._evictable and self._evictable[0][0] < reference_pos - self.catalog_horizon)
+        ):
+            self._advance_sweep(chrm_ra, reference_pos)
+        counted_names = self.counted_names
+        if counted_names.windowed and reference_pos != self._names_swept_to:
+            self._names_swept_to = reference_pos
+            counted_names.advance(read.reference_id, reference_pos)
+
+        # in BWA-MEM data, supplmentary alignments will always have H in cigar
+        if "S" in cigar_ra and "H" not in cigar_ra:
+            name_key = read_name_hash(read_name)
+            if name_key in counted_names:
+                # a later alignment of the name, e.g. a mate with supplementary alignments
+                if counted_names.windowed:
+                    counted_names.extend(name_key, last_observable_position(read))
+            elif (anchor := self.tdup_anchors.get(name_key)) is None:
+                # Collect reads with softclipping without TDUP anchors
+                read_obj = LazyRead(read)
+                read_mode = read_obj.simple_mode
+                if read_mode == MappingMode.MS:
+                    softclipped_sequence = read_obj.query_sequence[-read_obj.rt_soft_len :]
+                    softclipped_position = read_obj.ref_end
+                else:
+                    softclipped_sequence = read_obj.query_sequence[: read_obj.lt_soft_len]
+                    softclipped_position = read_obj.ref_start
+                self.add_softclip(name_key, (chrm_ra, softclipped_position, read_mode), softclipped_sequence, self._last_position(read))
+            # deal with TDUP anchors
+            else:
+                self.add_tdup(name_key, anchor.tdup_id, anchor.ref_allele, last=self._last_position(read))
+
+        # I in the CIGAR ####
+        if indel >= self.itd_length_cutoff:
+            self.observe_insertion(read, position_of_pileup_site, indel, reference_pos)
+
+    def observe_alignment(self, read: AlignedSegment) -> None:
+        """Note an alignment entering the sweep, before the MAPQ and column filters.
+
+        With a read name window, the name of an alignment with supplementary
+        alignments (``SA``) is pinned: its other alignments, e.g. a supplementary
+        alignment of the mate of a counted read, can lie anywhere downstream.
+        """
+        if self.counted_names.windowed and read.has_tag("SA"):
+            self.counted_names.pin(read_name_hash(read.query_name))
+
+    def observe_insertion(
+        self,
+        read: AlignedSegment,
+        position_of_pileup_site: int,
+        insertion_size: int,
+        reference_pos: int,
+    ) -> None:
+        """Classify a large CIGAR insertion as insertion-inferred TDUP or novel INS.
+
+        Args:
+            read: The aligned segment carrying the insertion.
+            position_of_pileup_site: Query position of the base preceding the insertion.
+            insertion_size: Length of the inserted sequence.
+            reference_pos: Reference position of the base preceding the insertion.
+        """
+        cigar_ra = read.cigarstring
+        if not re.search(rf"\d+M{insertion_size}I\d+M", cigar_ra):
+            return
+
+        genome_fasta = self.genome_fasta
+        name_key = read_name_hash(read.query_name)
+        chrm_ra = read.reference_name
+        seq_ra = read.query_sequence
+
+        insertion_seq_in_read = seq_ra[position_of_pileup_site + 1 : (position_of_pileup_site + insertion_size + 1)]
+
+        # reads carrying the same insertion at the same column share the verdict
+        verdict_key = (chrm_ra, reference_pos, insertion_size, insertion_seq_in_read)
+        verdict = self._self_loop_verdicts.get(verdict_key)
+        if verdict is None:
+            left_seq_from_genome = genome_fasta[chrm_ra][(reference_pos - insertion_size + 2) : reference_pos + 1].seq
+            right_seq_from_genome = genome_fasta[chrm_ra][reference_pos + 1 : (reference_pos + insertion_size)].seq
+            verdict = self._self_loop_verdicts[verdict_key] = self_loop_checker(
+                insertion_seq_in_read,
+                left_seq_from_genome,
+                right_seq_from_genome,
+                self.allowed_mismatches_for_insertion,
+            )
+        is_dup, left_shift, tdup_seq = verdict
+
+        if is_dup and get_insertion_reference_pos(cigar_ra, read.reference_start, insertion_size) == reference_pos:
+            tdup_ref_start = reference_pos - left_shift
+            tdup_id = (
+                chrm_ra,
+                tdup_ref_start,
+                insertion_size,
+                tdup_seq,
+                MicroRegion(""),
+            )
+            ref_allele = genome_fasta[chrm_ra][tdup_ref_start : tdup_ref_start + 1].seq
+            if self.catalog_horizon is not None:
+                self._protect_breakpoints(rescue_keys(chrm_ra, tdup_ref_start, insertion_size))
+            self.add_tdup(name_key, tdup_id, ref_allele, kind="insertion", last=self._last_position(read))
+        # Novel sequence insertion
+        else:
+            ins_id = (
+                chrm_ra,
+                reference_pos,
+                insertion_size,
+                insertion_seq_in_read,
+                MicroRegion(""),
+            )
+            ref_allele = genome_fasta[chrm_ra][reference_pos : reference_pos + 1].seq
+            alt_allele = seq_ra[position_of_pileup_site : position_of_pileup_site + insertion_size]
+            self.ins_allele_dict[ins_id] = (ref_allele, alt_allele)
+            self.add_ins(name_key, ins_id, self._last_position(read))
+
+    def add_softclip(self, name_key: int, rescue_key: tuple, softclipped_sequence: str, last: tuple[int, int] | None = None) -> None:
+        """Keep the soft-clip of a not-yet-counted read for split-read rescue.
+
+        ``name_key`` is the :func:`read_name_hash` of the read; ``last`` the
+        position the name is held to (see :meth:`ReadNameSet.add`).
+        """
+        if name_key in self.counted_names:
+            return
+        catalog = self.to_be_rescued_sequences
+        if self.catalog_horizon is not None and rescue_key not in catalog and rescue_key not in self._breakpoints:
+            heapq.heappush(self._evictable, (rescue_key[1], rescue_key))
+        catalog.add(rescue_key, softclipped_sequence)
+        self._spend(name_key, "softclip", (rescue_key, softclipped_sequence), last)
+
+    def _advance_sweep(self, chrom: str, reference_pos: int) -> None:
+        """Evict the catalog keys that can no longer become TDUP breakpoints."""
+        evictable = self._evictable
+        if chrom != self._sweep_chrom:
+            # no breakpoint of a TDUP found from here on lies on the previous chromosome
+            frontier = None
+            self._sweep_chrom = chrom
+        else:
+            frontier = reference_pos - self.catalog_horizon
+        while evictable and (frontier is None or evictable[0][0] < frontier):
+            position, key = heapq.heappop(evictable)
+            if key in self._breakpoints:
+                continue
+            del self.to_be_rescued_sequences[key]
+            self.catalog_evictions += 1
+            self._evicted_below[key[0]] = max(self._evicted_below.get(key[0], 0), position + 1)
+
+    def _protect_breakpoints(self, keys: tuple[tuple, ...]) -> None:
+        """Exempt the breakpoints of an insertion-inferred TDUP from eviction."""
+        for key in keys:
+            if key in self._breakpoints:
+                continue
+            self._breakpoints.add(key)
+            if key[1] < self._evicted_below.get(key[0], 0):
+                self.late_breakpoints += 1
+
+    def add_tdup(
+        self,
+        name_key: int,
+        tdup_id: tuple,
+        ref_allele: str,
+        kind: str = "anchor",
+        last: tuple[int, int] | None = None,
+    ) -> None:
+        """Count a not-yet-counted read as support of ``tdup_id``."""
+        self.tdup_allele_dict[tdup_id] = (ref_allele, "TDUP")
+        if name_key in self.counted_names:
+            return
+        self.tdup_ao[tdup_id] += 1
+        self._spend(name_key, kind, tdup_id, last)
+
+    def add_ins(self, name_key: int, ins_id: tuple, last: tuple[int, int] | None = None) -> None:
+        """Count a not-yet-counted read as support of the novel insertion ``ins_id``."""
+        if name_key in self.counted_names:
+            return
+        self.ins_ao[ins_id] += 1
+        self._spend(name_key, "ins", ins_id, last)
+
+    def _spend(self, name_key: int, kind: str, payload: Any, last: tuple[int, int] | None) -> None:
+        self.counted_names.add(name_key, last)
+        if self.deferred_anchors:
+            self._journal[name_key] = (self._tick, kind, payload)
+
+    def _last_position(self, read: AlignedSegment) -> tuple[int, int] | None:
+        return last_observable_position(read) if self.counted_names.windowed else None
+
+    def register_anchor(self, read_name: str, anchor: TdupAnchor) -> None:
+        """Register a TDUP anchor discovered during a single-pass scan.
+
+        A read name counts exactly once.  If the name was already spent on a
+        soft-clip (collected before its SA-tagged record was reached) or on a
+        previous anchor of the same name, that observation is moved to the new
+        anchor, which is what the two-pass scan would have counted.
+
+        Args:
+            read_name: Query name of the SA-tagged primary alignment.
+            anchor: TdupAnchor of the alignment.
+        """
+        name_key = read_name_hash(read_name)
+        self.tdup_anchors[name_key] = anchor
+        entry = self._journal.get(name_key)
+        if entry is None:
+            return
+        tick, kind, payload = entry
+        if kind == "softclip":
+            self.to_be_rescued_sequences.remove(*payload)
+        elif kind == "anchor":
+            self.tdup_ao[payload] -= 1
+            if self.tdup_ao[payload] == 0:
+                del self.tdup_ao[payload]
+        else:
+            return
+
+        self.tdup_allele_dict[anchor.tdup_id] = (anchor.ref_allele, "TDUP")
+        self.tdup_ao[anchor.tdup_id] += 1
+        self._journal[name_key] = (tick, "anchor", anchor.tdup_id)
+
+    def ordered_tdup_ao(self) -> dict[tuple, int]:
+        """Return TDUP support in the order the two-pass scan first counted each TDUP.
+
+        Event order breaks ties of the final ``(chrom, ref_start)`` sort, so a
+        single-pass scan must reproduce it even when anchor counts were moved.
+        """
+        if not self.deferred_anchors:
+            return self.tdup_ao
+        first_tick: dict[tuple, int] = {}
+        for tick, kind, payload in self._journal.values():
+            if kind in {"anchor", "insertion"} and (payload not in first_tick or tick < first_tick[payload]):
+                first_tick[payload] = tick
+        return {tdup_id: self.tdup_ao[tdup_id] for tdup_id in sorted(self.tdup_ao, key=first_tick.__getitem__)}
+
+    def attempts(self) -> list[tuple[int, str, Any]]:
+        """Return the observation that counted each read name, in observation order.
+
+        Only available with ``deferred_anchors=True``.  For a collector created
+        without anchors this is the complete input :meth:`replay` needs to
+        reproduce its counts under any set of anchors.
+
+        Returns:
+            list: ``(name_key, kind, payload)`` tuples of the read name hash;
+                ``kind`` is ``softclip``
+                (payload ``(rescue_key, softclipped_sequence)``), ``anchor`` or
+                ``insertion`` (payload ``tdup_id``) or ``ins`` (payload ``ins_id``).
+        """
+        entries = sorted(self._journal.items(), key=lambda item: item[1][0])
+        return [(name_key, kind, payload) for name_key, (_, kind, payload) in entries]
+
+    def replay(
+        self,
+        attempts: list[tuple[int, str, Any]],
+        tdup_allele_dict: dict[tuple, tuple[str, str]],
+        ins_allele_dict: dict[tuple, tuple[str, str]],
+    ) -> None:
+        """Apply the evidence of a collector that observed a later part of the scan.
+
+        The other collector must have been created without TDUP anchors: its
+        soft-clips are re-classified here against this collector's anchors, and
+        read names already counted here are skipped.  Replaying shards in scan
+        order therefore reproduces the counts of one collector observing all of
+        them.
+
+        Args:
+            attempts: Output of :meth:`attempts` of the other collector.
+            tdup_allele_dict: Its ``tdup_allele_dict``.
+            ins_allele_dict: Its ``ins_allele_dict``.
+        """
+        for name_key, kind, payload in attempts:
+            if name_key in self.counted_names:
+                continue
+            if kind == "softclip":
+                anchor = self.tdup_anchors.get(name_key)
+                if anchor is None:
+                    self.add_softclip(name_key, *payload)
+                else:
+                    self.add_tdup(name_key, anchor.tdup_id, anchor.ref_allele)
+            elif kind == "ins":
+                self.add_ins(name_key, payload)
+            else:
+                self.add_tdup(name_key, payload, tdup_allele_dict[payload][0], kind=kind)
+        self.tdup_allele_dict.update(tdup_allele_dict)
+        self.ins_allele_dict.update(ins_allele_dict)
@@ -0,0 +1,174 @@
+"""Finalization stage of :func:`scan_itd`: rescue, depth and events.
+
+Once the counting pass is done, every TDUP needs its split-read rescue and every
+event its read depth before it becomes an :class:`~scanitd.base.Event`.  The
+events are cut into :class:`FinalizationUnit` batches of one chromosome each,
+sorted by position, so a unit reads one stretch of reference and BAM.  Units are
+independent: the serial scan runs them in turn, the parallel scan on its pool
+(see :meth:`~scanitd.inference.parallel.ShardedScan.iter_finalize`).  Every
+event keeps the index it had in the serial event list, so the merged output
+(:func:`iter_contig_events`) does not depend on how the units were scheduled.
+"""
+
+from __future__ import annotations
+
+from itertools import groupby
+from operator import itemgetter
+from typing import TYPE_CHECKING, NamedTuple
+
+from scanitd.base import Event, MappingMode
+
+from .helper import obtain_depths_given_genomic_positions
+from .sr_resuer import update_tdup_ao
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator, Sequence
+
+    from pyfaidx import Fasta
+    from pysam import AlignmentFile
+
+    from scanitd.mtype import LoggerType
+
+    from .catalog import SoftclipCatalog
+    from .evidence import EvidenceCollector
+    from .sr_resuer import RescueAligner
+
+__all__ = ["DEFAULT_UNIT_SIZE", "FinalizationUnit", "finalize_unit", "iter_contig_events", "plan_finalization", "rescue_keys"]
+
+DEFAULT_UNIT_SIZE = 256
+
+
+class FinalizationUnit(NamedTuple):
+    """Events of one chromosome finalized together.
+
+    Attributes:
+        chrom: Chromosome of all events of the unit.
+        tdups: ``(index, tdup_id, original_ao, ref_allele, alt_allele)`` tuples.
+        insertions: ``(index, ins_id, ao, ref_allele, alt_allele)`` tuples.
+        rescue_candidates: The soft-clip catalog entries consulted by the TDUPs,
+            still packed.
+    """
+
+    chrom: str
+    tdups: list[tuple]
+    insertions: list[tuple]
+    rescue_candidates: SoftclipCatalog
+
+
+def rescue_keys(chrom: str, ref_start: int, size: int) -> tuple[tuple, tuple]:
+    """Soft-clip catalog keys consulted by :func:`update_tdup_ao` for one TDUP."""
+    return (chrom, ref_start, MappingMode.SM), (chrom, ref_start + size, MappingMode.MS)
+
+
+def plan_finalization(
+    collector: EvidenceCollector,
+    tdup_ao: dict[tuple, int],
+    unit_size: int = DEFAULT_UNIT_SIZE,
+    contig_order: Sequence[str] | None = None,
+) -> list[FinalizationUnit]:
+    """Cut the events of a scan into per-chromosome units.
+
+    Events are indexed in serial order, TDUPs in ``tdup_ao`` order followed by
+    insertions, and sorted by position within their chromosome.
+
+    Args:
+        collector: EvidenceCollector holding the counts of the scan.
+        tdup_ao: TDUP support in event order (see
+            :meth:`~scanitd.inference.evidence.EvidenceCollector.ordered_tdup_ao`).
+        unit_size: Maximum number of events per unit.
+        contig_order: Chromosome order of the units, e.g. the BAM header's
+            references; None keeps the order of first appearance.
+
+    Returns:
+        list: FinalizationUnits, the units of a chromosome consecutive.
+    """
+    if unit_size < 1:
+        msg = f"unit_size must be positive, got {unit_size}"
+        raise ValueError(msg)
+
+    catalog = collector.to_be_rescued_sequences
+    by_chrom: dict[str, list[tuple[int, str, tuple]]] = {}
+    for index, tdup_id in enumerate(tdup_ao):
+        by_chrom.setdefault(tdup_id[0], []).append((tdup_id[1], "TDUP", (index, tdup_id, tdup_ao[tdup_id], *collector.tdup_allele_dict[tdup_id])))
+    for index, ins_id in enumerate(collector.ins_ao, start=len(tdup_ao)):
+        by_chrom.setdefault(ins_id[0], []).append((ins_id[1], "INS", (index, ins_id, collector.ins_ao[ins_id], *collector.ins_allele_dict[ins_id])))
+
+    chroms = list(by_chrom)
+    if contig_order is not None:
+        rank = {contig: tid for tid, contig in enumerate(contig_order)}
+        chroms.sort(key=rank.__getitem__)
+
+    units = []
+    for chrom in chroms:
+        events = by_chrom[chrom]
+        events.sort(key=lambda event: (event[0], event[2][0]))
+        for unit_start in range(0, len(events), unit_size):
+            tdups, insertions, keys = [], [], []
+            for _, event_type, item in events[unit_start : unit_start + unit_size]:
+                if event_type == "INS":
+                    insertions.append(item)
+                    continue
+                tdups.append(item)
+                _, ref_start, size, _, _ = item[1]
+                keys.extend(rescue_keys(chrom, ref_start, size))
+            units.append(FinalizationUnit(chrom, tdups, insertions, catalog.subset(keys)))
+    return units
+
+
+def finalize_unit(
+    unit: FinalizationUnit,
+    bam_object: AlignmentFile,
+    genome_fasta: Fasta,
+    mismatches_cutoff: int,
+    rescue_aligner: RescueAligner,
+    logger: LoggerType,
+) -> list[tuple[int, Event]]:
+    """Rescue, measure depth and build the events of one unit.
+
+    Args:
+        unit: The FinalizationUnit.
+        bam_object: Open pysam AlignmentFile of the scanned BAM.
+        genome_fasta: Reference genome Fasta object.
+        mismatches_cutoff: Max mismatches of a rescue alignment.
+        rescue_aligner: RescueAligner sharing verdicts across units of a process.
+        logger: Logger instance implementing LoggerType.
+
+    Returns:
+        list: ``(index, Event)`` pairs.
+    """
+    # TDUP breakpoint is always the ITD start (SM-side) and INS reference_pos is
+    # the pileup column position — both use SM mode (no offset)
+    depths = obtain_depths_given_genomic_positions(
+        bam_object,
+        [(unit.chrom, item[1][1]) for item in (*unit.tdups, *unit.insertions)],
+        MappingMode.SM,
+    )
+
+    events = []
+    for index, tdup_id, original_ao, ref_allele, alt_allele in unit.tdups:
+        new_ao = update_tdup_ao(tdup_id, original_ao, genome_fasta, unit.rescue_candidates, mismatches_cutoff, rescue_aligner)
+        logger.trace(f"{tdup_id=}, {original_ao=}, {new_ao=}")
+        depth = depths[(unit.chrom, tdup_id[1])]
+        events.append((index, Event.new("TDUP", tdup_id, original_ao, new_ao, depth, ref_allele, alt_allele)))
+
+    for index, ins_id, ao, ref_allele, alt_allele in unit.insertions:
+        depth = depths[(unit.chrom, ins_id[1])]
+        events.append((index, Event.new("INS", ins_id, ao, ao, depth, ref_allele, alt_allele)))
+    return events
+
+
+def iter_contig_events(results: Iterable[tuple[str, list[tuple[int, Event]]]]) -> Iterator[tuple[str, list[Event]]]:
+    """Merge the results of consecutive units of a chromosome as they arrive.
+
+    Args:
+        results: ``(chrom, unit result)`` pairs, the units of a chromosome
+            consecutive (see ``contig_order`` of :func:`plan_finalization`).
+
+    Yields:
+        tuple: ``(chrom, events)``, events sorted by ``ref_start`` with ties in
+            serial order, whatever the order of the unit results.
+    """
+    for chrom, chrom_results in groupby(results, key=itemgetter(0)):
+        indexed = [event for _, result in chrom_results for event in result]
+        indexed.sort(key=lambda item: (item[1].ref_start, item[0]))
+        yield chrom, [event for _, event in indexed]
@@ -3,25 +3,32 @@
 from __future__ import annotations
 
 import locale
+import queue
+import threading
+from bisect import bisect_left
+from collections import defaultdict
 from typing import TYPE_CHECKING, Any
 
 import numpy as np
 
-from scanitd.base import MappingMode, reverse_complement
+from scanitd.base import EventTable, MappingMode, reverse_complement
 from scanitd.writer import VCFWriter
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from pathlib import Path
 
     from pyfaidx import Fasta
     from pysam import AlignmentFile
 
+    from scanitd.base import Event
     from scanitd.mtype import LoggerType
 
 __all__ = [
     "format_sa_tag",
     "get_insertion_reference_pos",
     "obtain_depth_given_genomic_position",
+    "obtain_depths_given_genomic_positions",
     "obtain_sa_query_seq_from_ra",
     "parse_target_genomic_coordinates",
     "same_chrom_same_strand_handler",
@@ -29,6 +36,11 @@ __all__ = [
     "write_events_to_vcf",
 ]
 
+#: Events per batch handed to the VCF writer thread.
+WRITE_BATCH_SIZE = 1024
+#: Batches waiting for the VCF writer thread before the producer blocks.
+WRITE_QUEUE_BATCHES = 8
+
 
 def same_chrom_same_strand_handler(
     read_lt,
@@ -367,7 +379,7 @@ def parse_target_genomic_coordinates(input_data):
     if isinstance(input_data, str):
         # Try to open as file first
         try:
-            with open(input_data, encoding=locale.getpreferredencoding(False)) as f:
+            with open(input_data, encoding=locale.getpreferredencoding(do_setlocale=False)) as f:
                 lines = f.readlines()
             # Process as BED file
             for line in lines:
@@ -420,7 +432,9 @@ def self_loop_checker(insertion_seq: str, left_seq: str, right_seq: str, allowed
     """Determine whether an inserted sequence is a tandem duplication via rolling comparison.
 
     Rolls the insertion sequence left and right, comparing against the flanking
-    reference sequence (left_seq + right_seq) with a mismatch tolerance.
+    reference sequence (left_seq + right_seq) with a mismatch tolerance.  All
+    rotations are scored in one batched comparison of two ``uint8`` matrices; the
+    first rotation within the tolerance, left rolls before right rolls, wins.
 
     Args:
         insertion_seq: The sequence of the insertion observed in the read.
@@ -434,45 +448,48 @@ def self_loop_checker(insertion_seq: str, left_seq: str, right_seq: str, allowed
             - left_shift (int): Number of bases the TDUP start is shifted left.
             - tdup_seq (str): The matching reference sequence that represents the duplication.
     """
-
-    def count_mismatches_vectorized(str1, str2):
-        # Convert strings to numpy arrays of characters
-        arr1 = np.array(list(str1))
-        arr2 = np.array(list(str2))
-
-        # Get the minimum length to handle strings of different lengths
-        min_length = min(len(arr1), len(arr2))
-
-        # Count mismatches in the overlapping part
-        mismatches = np.sum(arr1[:min_length] != arr2[:min_length])
-
-        # Add the difference in length as additional mismatches if strings differ in length
-        mismatches += abs(len(arr1) - len(arr2))
-
-        return mismatches
-
-    ins_seq = insertion_seq
     ins_len = len(insertion_seq)
-    steps = int(ins_len / 2) if ins_len % 2 == 0 else int(ins_len / 2) + 1
-    # left rolling
-    count = 1
-    for _i in range(steps):
-        ins_seq = ins_seq[-1:] + ins_seq[0 : len(ins_seq) - 1]
-        combo_seq = left_seq[-count:] + right_seq[: ins_len - count]
-        if count_mismatches_vectorized(ins_seq, combo_seq) <= allowed_mismatched:
-            return True, count, combo_seq
-        count += 1
-    # right rolling
-    ins_seq = insertion_seq
-    count = 1
-    for _i in range(steps):
-        ins_seq = ins_seq[1:] + ins_seq[:1]
-        combo_seq = left_seq[-(ins_len - count) :] + right_seq[:count]
-        count += 1
-        if count_mismatches_vectorized(ins_seq, combo_seq) <= allowed_mismatched:
-            return True, len(insertion_seq) - count, combo_seq
-    # is a insertion of novel sequence
-    return False, 0, ""
+    steps = (ins_len + 1) // 2
+    if steps == 0:
+        return False, 0, ""
+
+    # left roll by k pairs the insertion rotated right by k with the last k
+    # bases of left_seq and the first ins_len - k of right_seq; right roll by k
+    # the insertion rotated left by k with the last ins_len - k bases of
+    # left_seq and the first k of right_seq
+    shifts = np.arange(1, steps + 1)
+    rotation_starts = np.concatenate((ins_len - shifts, shifts))
+    doubled = np.frombuffer((insertion_seq * 2).encode(), dtype=np.uint8)
+    rotations = doubled[rotation_starts[:, None] + np.arange(ins_len)]
+
+    flank = left_seq + right_seq
+    left_len = len(left_seq)
+    if ins_len > 1 and left_len >= ins_len - 1 and len(right_seq) >= ins_len - 1:
+        # every combination is a window of the flank
+        windows = np.lib.stride_tricks.sliding_window_view(np.frombuffer(flank.encode(), dtype=np.uint8), ins_len)
+        window_starts = np.concatenate((left_len - shifts, left_len - ins_len + shifts))
+        mismatches = np.count_nonzero(rotations != windows[window_starts], axis=1)
+        combo_seqs = None
+    else:
+        combo_seqs = [left_seq[-k:] + right_seq[: ins_len - k] for k in range(1, steps + 1)]
+        combo_seqs += [left_seq[-(ins_len - k) :] + right_seq[:k] for k in range(1, steps + 1)]
+        width = max(ins_len, *map(len, combo_seqs))
+        # zero padding never equals a base: every length difference is a mismatch
+        combos = np.frombuffer(b"".join(combo.encode().ljust(width, b"\0") for combo in combo_seqs), dtype=np.uint8)
+        padded = np.zeros((len(combo_seqs), width), dtype=np.uint8)
+        padded[:, :ins_len] = rotations
+        mismatches = np.count_nonzero(padded != combos.reshape(len(combo_seqs), width), axis=1)
+
+    hits = np.flatnonzero(mismatches <= allowed_mismatched)
+    if len(hits) == 0:
+        # is a insertion of novel sequence
+        return False, 0, ""
+
+    index = int(hits[0])
+    combo_seq = combo_seqs[index] if combo_seqs is not None else flank[int(window_starts[index]) : int(window_starts[index]) + ins_len]
+    if index < steps:
+        return True, index + 1, combo_seq
+    return True, ins_len - (index - steps + 2), combo_seq
 
 
 def get_insertion_reference_pos(cigar_string, read_pos, insertion_size):
@@ -540,35 +557,143 @@ def obtain_depth_given_genomic_position(
     return bam_object.count(contig=chrom, start=_position, end=_position + 1)
 
 
+# positions closer than this share one fetch instead of seeking the index again
+DEPTH_CLUSTER_GAP = 1_000
+
+
+def obtain_depths_given_genomic_positions(
+    bam_object: AlignmentFile,
+    positions: Iterable[tuple[str, int]],
+    read_mode: MappingMode = MappingMode.SM,
+    max_gap: int = DEPTH_CLUSTER_GAP,
+) -> dict[tuple[str, int], int]:
+    """Batched :func:`obtain_depth_given_genomic_position` over many positions.
+
+    The queried positions of each chromosome are sorted and grouped into
+    clusters whose neighbours are at most ``max_gap`` bases apart.  Every
+    cluster is resolved with a single ``fetch``: each read adds one to the
+    positions within its ``[reference_start, reference_end)`` span, which are
+    the semantics of ``AlignmentFile.count`` (no read filter, and a read
+    without a reference span covers its start position only).
+
+    Args:
+        bam_object: Open pysam AlignmentFile.
+        positions: ``(chrom, position)`` pairs; duplicates are resolved once.
+        read_mode: MappingMode determining the position offset, applied as in
+            :func:`obtain_depth_given_genomic_position`.
+        max_gap: Largest distance between two positions resolved by one fetch.
+
+    Returns:
+        dict: Mapping of every queried ``(chrom, position)`` to its read count.
+    """
+
+    offset = 1 if read_mode == MappingMode.MS else 0
+    by_chrom = defaultdict(set)
+    for chrom, position in positions:
+        by_chrom[chrom].add(position - offset)
+
+    depths = {}
+    for chrom, chrom_positions in by_chrom.items():
+        sorted_positions = sorted(chrom_positions)
+        cluster_start = 0
+        for index in range(1, len(sorted_positions) + 1):
+            if index < len(sorted_positions) and sorted_positions[index] - sorted_positions[index - 1] <= max_gap:
+                continue
+            cluster = sorted_positions[cluster_start:index]
+            for position, depth in zip(cluster, _sweep_depths(bam_object, chrom, cluster), strict=True):
+                depths[(chrom, position + offset)] = depth
+            cluster_start = index
+    return depths
+
+
+def _sweep_depths(bam_object: AlignmentFile, chrom: str, cluster: list[int]) -> list[int]:
+    """Read counts at the sorted positions of ``cluster`` from one fetch."""
+    steps = [0] * (len(cluster) + 1)
+    for read in bam_object.fetch(contig=chrom, start=cluster[0], end=cluster[-1] + 1):
+        start = read.reference_start
+        # htslib's bam_endpos: one base for reads without a reference span
+        end = read.reference_end or start + 1
+        steps[bisect_left(cluster, start)] += 1
+        steps[bisect_left(cluster, end)] -= 1
+
+    depths = []
+    depth = 0
+    for step in steps[:-1]:
+        depth += step
+        depths.append(depth)
+    return depths
+
+
 def write_events_to_vcf(
     output_vcf: Path,
     bam_header: Any,
-    events: list,
+    events: Iterable[Event] | EventTable,
     logger: LoggerType,
     min_ao: int = 0,
     min_depth: int = 0,
     min_vaf: float = 0.0,
+    threads: int = 1,
 ) -> None:
-    """Parse splice graph for cliques and write filtered events to VCF.
+    """Filter events and write them to VCF as they arrive.
+
+    ``events`` may be a list or a stream such as :func:`~scanitd.inference.main.iter_events`:
+    it is consumed in the calling thread while a writer thread formats and
+    writes the events passing the filters, in batches of ``WRITE_BATCH_SIZE``.
+    An :class:`~scanitd.base.EventTable` is filtered with one vectorized mask.
+    At most ``WRITE_QUEUE_BATCHES`` batches wait for the writer, so output I/O
+    overlaps the scan without holding its events.  If ``events`` raises, no
+    output is left behind rather than a truncated VCF.  An ``output_vcf`` ending in
+    ``.gz`` is written as BGZF with a tabix index (see
+    :class:`~scanitd.writer.VCFWriter`).
 
     Args:
         output_vcf: Path to output VCF file
         bam_header: BAM file header
-        events: List of Event objects
+        events: Iterable of Event objects, or an EventTable
         logger: Logger instance
         min_ao: Minimum alternate allele observation count (default: 0)
         min_depth: Minimum read depth (default: 0)
         min_vaf: Minimum variant allele frequency (default: 0.0)
+        threads: Number of threads compressing a ``.gz`` output (default: 1)
     """
-    # Filter events based on thresholds
-    filtered_events = [
-        event for event in events
-        if event.ao >= min_ao and event.dp >= min_depth and event.af >= min_vaf
-    ]
+    batches: queue.Queue[list[Event] | None] = queue.Queue(maxsize=WRITE_QUEUE_BATCHES)
+    errors: list[BaseException] = []
+    aborted = threading.Event()
+    writer = threading.Thread(target=_write_vcf_batches, args=(f"{output_vcf}", bam_header, threads, batches, errors, aborted), name="vcf-writer", daemon=True)
+    writer.start()
+
+    total_events = filtered_count = 0
+    batch: list[Event] = []
+    table = events if isinstance(events, EventTable) else None
+    if table is not None:
+        events = table.filter(min_ao, min_depth, min_vaf)
+    try:
+        for event in events:
+            total_events += 1
+            # Filter events based on thresholds
+            if table is not None or (event.ao >= min_ao and event.dp >= min_depth and event.af >= min_vaf):
+                batch.append(event)
+                if len(batch) == WRITE_BATCH_SIZE:
+                    if errors:
+                        break
+                    filtered_count += len(batch)
+                    batches.put(batch)
+                    batch = []
+        else:
+            filtered_count += len(batch)
+            batches.put(batch)
+    except BaseException:
+        aborted.set()
+        raise
+    finally:
+        batches.put(None)
+        writer.join()
+    if errors:
+        raise errors[0]
+    if table is not None:
+        total_events = len(table)
 
     # Log filtering statistics
-    total_events = len(events)
-    filtered_count = len(filtered_events)
     removed_count = total_events - filtered_count
 
     logger.info(f"Total events detected: {total_events}")
@@ -576,10 +701,30 @@ def write_events_to_vcf(
     if removed_count > 0:
         logger.info(f"Events filtered out: {removed_count}")
 
-    vcf_writer = VCFWriter(
-        f"{output_vcf}",
-        bam_header,
-    )
-    with vcf_writer.open():
-        for idx, event in enumerate(filtered_events, 1):
-            vcf_writer.write_data(event, f"{idx}")
+
+def _write_vcf_batches(output_vcf: str, bam_header: Any, threads: int, batches: queue.Queue, errors: list[BaseException], aborted: threading.Event) -> None:
+    """Writer thread of :func:`write_events_to_vcf`: write batches until None.
+
+    After a failure the remaining batches are drained, so the producer never
+    blocks on a full queue; the error is left in ``errors``.  The output is
+    completed only when the producer finished without ``aborted`` set;
+    otherwise, as after a failure, it is removed.
+    """
+    vcf_writer = None
+    drained = False
+    try:
+        vcf_writer = VCFWriter(output_vcf, bam_header, threads)
+        vcf_writer.open()
+        while (batch := batches.get()) is not None:
+            vcf_writer.write_events(batch)
+        drained = True
+        if not aborted.is_set():
+            vcf_writer.close()
+            return
+    except BaseException as e:  # noqa: BLE001 - re-raised by the producer
+        errors.append(e)
+        if not drained:
+            while batches.get() is not None:
+                pass
+    if vcf_writer is not None:
+        vcf_writer.discard()
@@ -1,25 +1,49 @@
 #!/usr/bin/env python
 """Main BAM scanning and ITD calling pipeline for ScanITD."""
 
-import re
-from collections import defaultdict
+from __future__ import annotations
+
+from enum import Enum
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import pysam
 from pyfaidx import Fasta, FastaNotFoundError
 
-from scanitd.base import Event, MappingMode, MicroRegion, Read
+from scanitd.base import LazyRead, MicroRegion
+from scanitd.base.cigar import cigar_cache_stats
 
+from .anchors import AnchorTable
+from .chimeric_index import open_chimeric_index
+from .evidence import EvidenceCollector, TdupAnchor, resolve_tdup_id
+from .finalize import finalize_unit, iter_contig_events, plan_finalization
 from .helper import (
     format_sa_tag,
-    get_insertion_reference_pos,
-    obtain_depth_given_genomic_position,
-    obtain_sa_query_seq_from_ra,
     parse_target_genomic_coordinates,
     same_chrom_same_strand_handler,
-    self_loop_checker,
 )
-from .sr_resuer import update_tdup_ao
+from .parallel import DEFAULT_SHARD_SIZE, ShardedScan
+from .read_engine import PILEUP_FLAG_FILTER, PILEUP_MAX_DEPTH, PILEUP_MIN_BASE_QUALITY, READ_ENGINE_PYSAM_VERSIONS, read_engine_verified, read_level_pass
+from .readnames import read_name_hash
+from .reference import DEFAULT_REFERENCE_CACHE_BYTES, ReferenceCache
+from .sr_resuer import RescueAligner
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from scanitd.base import Event
+
+
+class ScanEngine(str, Enum):
+    """How the counting pass walks the BAM.
+
+    - ``pileup``: visit every read at every pileup column it covers.
+    - ``read``: visit every alignment once via ``fetch`` and replay only the
+      columns that can change the evidence (see :mod:`scanitd.inference.read_engine`).
+    """
+
+    PILEUP = "pileup"
+    READ = "read"
 
 
 class BamScanner:
@@ -36,6 +60,9 @@ class BamScanner:
         microinsertion_cutoff: Maximum allowed microinsertion length at a breakpoint.
         regions: List of samtools region strings; None entries mean whole-genome.
         logger: Logger instance implementing LoggerType.
+        threads: Number of htslib threads decompressing the BAM (default: 1).
+        reference_cache_bytes: Memory budget of the in-memory reference
+            (see :class:`~scanitd.inference.reference.ReferenceCache`).
     """
 
     def __init__(
@@ -46,6 +73,8 @@ class BamScanner:
         microinsertion_cutoff,
         regions,
         logger,
+        threads=1,
+        reference_cache_bytes=DEFAULT_REFERENCE_CACHE_BYTES,
     ) -> None:
         """Initialize the BamScanner.
 
@@ -56,9 +85,14 @@ class BamScanner:
             microinsertion_cutoff: Maximum allowed microinsertion length at a breakpoint.
             regions: List of samtools region strings; None entries mean whole-genome.
             logger: Logger instance implementing LoggerType.
+            threads: Number of htslib threads decompressing the BAM (default: 1).
+            reference_cache_bytes: Memory budget of the in-memory reference
+                (see :class:`~scanitd.inference.reference.ReferenceCache`).
         """
         self.in_bam_path = input_bam
-        self.in_bam_object = pysam.AlignmentFile(input_bam, "rb")
+        self.threads = threads
+        self.reference_cache_bytes = reference_cache_bytes
+        self.in_bam_object = pysam.AlignmentFile(input_bam, "rb", threads=threads)
 
         self.bam_chrom_info = {}
         self.mapq_cutoff = mapq_cutoff
@@ -70,7 +104,9 @@ class BamScanner:
         self.header = self._get_bam_header()
         self.total_length = 0
 
-        self.tdup_anchors = {}
+        self.tdup_anchors = AnchorTable()
+        # (chrom, tdup_ref_start, tdup_ref_end, MicroRegion) -> (tdup_id, ref_allele)
+        self._tdup_ids = {}
 
         self.genome_fasta = self._get_genome_fasta(self.ref_genome)
 
@@ -82,10 +118,20 @@ class BamScanner:
             msg = f"Bam file {self.in_bam_object} is not sorted"
             raise RuntimeError(msg) from e
 
-    def _get_genome_fasta(self, ref_genome) -> Fasta:
-        """Get the genome fasta file."""
+    def _target_spans(self) -> list[tuple[str, int, int]] | None:
+        """``(chrom, start, end)`` of the target regions, or None for a whole-genome scan."""
+        if None in self.regions:
+            return None
+        spans = []
+        for _region in self.regions:
+            _, tid, start, stop = self.in_bam_object.parse_region(region=_region)
+            spans.append((self.in_bam_object.get_reference_name(tid), start, stop))
+        return spans
+
+    def _get_genome_fasta(self, ref_genome) -> ReferenceCache:
+        """Get the genome fasta file behind an in-memory reference cache."""
         try:
-            return Fasta(str(ref_genome), sequence_always_upper=True)
+            return ReferenceCache(Fasta(str(ref_genome), sequence_always_upper=True), self.reference_cache_bytes, regions=self._target_spans())
         except FastaNotFoundError:
             msg = f"Reference File {ref_genome} is Not Found!"
             raise SystemExit(
@@ -108,126 +154,117 @@ class BamScanner:
         self._check_bam_sort(header)
         return header
 
-    def iter_bam(self):
+    def iter_bam(self, source=None):
         """Iterate over BAM reads and collect TDUP anchor information from SA-tagged reads.
 
         For each primary alignment carrying a single SA tag on the same chromosome and
         strand, determines the SM/MS mode of both alignments and invokes the
         appropriate handler to extract the TDUP coordinates.
 
+        Args:
+            source: AlignmentFile to read the alignments from instead of the
+                BAM, e.g. its chimeric index (see
+                :func:`~scanitd.inference.chimeric_index.open_chimeric_index`).
+
         Returns:
-            dict: Mapping of query_name -> (chrom, tdup_ref_start, tdup_ref_end, strand, MicroRegion).
+            AnchorTable: Mapping of query name hash (see
+                :func:`~scanitd.inference.readnames.read_name_hash`) to
+                :class:`~scanitd.inference.evidence.TdupAnchor`.
         """
         # supplementary alignment cigarstring extraction
         # key: read.query_name + left S + right S
         self.logger.info("Iter bam file and Extracting primary alignments with SA tags")
 
+        bam_object = self.in_bam_object if source is None else source
         for _region in self.regions:
-            for read in self.in_bam_object.fetch(region=_region):
-                # XA: Alternative hits https://gist.github.com/crazyhottommy/ed73c7e2daee8383dccb35f224f99714
-                if read.has_tag("SA") and read.mapping_quality >= self.mapq_cutoff and not read.is_supplementary and not read.is_secondary and not read.has_tag("XA"):
-                    chimeric_aln = read.get_tag("SA")[:-1].split(";")  # type: ignore
-                    # skip multi-hop DNA segment
-                    if len(chimeric_aln) > 1:
-                        continue
-
-                    chrm_ra = read.reference_name
-                    pos_ra = read.reference_start
-                    strand_ra = "-" if read.is_reverse else "+"
-
-                    cigar_ra = read.cigarstring
-                    mapq_ra = read.mapping_quality
-                    nm_ra = read.get_tag("NM")
-                    seq_ra = read.query_sequence
-                    query_qualities_ra = read.query_qualities
-
-                    # only consider the first segment
-                    sa_string = chimeric_aln[0]
-
-                    chrm_sa, pos_sa, strand_sa, cigar_sa, mapq_sa, nm_sa = format_sa_tag(sa_string)
-                    seq_sa = obtain_sa_query_seq_from_ra(seq_ra, strand_ra, strand_sa)
-
-                    if strand_sa == strand_ra:
-                        query_qualities_sa = query_qualities_ra
-                    elif query_qualities_ra is None:
-                        query_qualities_sa = None
-                    else:
-                        query_qualities_sa = query_qualities_ra[::-1]
-
-                    if chrm_ra == chrm_sa and strand_ra == strand_sa:
-                        read_uno, read_dos = (
-                            Read.new(
-                                read.query_name,
-                                chrm_ra,
-                                pos_ra,
-                                strand_ra,
-                                cigar_ra,
-                                mapq_ra,
-                                nm_ra,  # type: ignore
-                                seq_ra,
-                                query_qualities_ra,
-                            ),
-                            Read.new(
-                                read.query_name,
-                                chrm_sa,
-                                pos_sa,
-                                strand_sa,
-                                cigar_sa,
-                                mapq_sa,
-                                nm_sa,  # type: ignore
-                                seq_sa,
-                                query_qualities_sa,
-                            ),
-                        )
-
-                        uno_mode = read_uno.simple_mode
-                        dos_mode = read_dos.simple_mode
-
-                        event_info = same_chrom_same_strand_handler(
-                            read_uno,
-                            read_dos,
-                            uno_mode,
-                            dos_mode,
-                            self.genome_fasta,
-                            self.logger,
-                            self.microinsertion_cutoff,
-                        )
-
-                        if event_info is not None:
-                            (
-                                _event_type,
-                                _positions,
-                                _read1_info,
-                                _read2_info,
-                                _insertion_info,
-                                _strands,
-                            ) = event_info
-
-                            break_point_region = MicroRegion(_insertion_info[0])
-                            self.logger.trace(f"{break_point_region=} {read.query_name=}")
-
-                            (
-                                tdup_start,
-                                tdup_end,
-                                _,
-                                _,
-                            ) = _positions
-
-                            tdup_ref_start = int(tdup_start.split(":")[1])
-                            tdup_ref_end = int(tdup_end.split(":")[1])
-
-                            self.tdup_anchors[read.query_name] = (
-                                chrm_ra,
-                                tdup_ref_start,
-                                tdup_ref_end,
-                                strand_ra,
-                                break_point_region,
-                            )
+            for read in bam_object.fetch(region=_region):
+                anchor = self.extract_anchor(read)
+                if anchor is not None:
+                    self.tdup_anchors[read_name_hash(read.query_name)] = anchor
 
         return self.tdup_anchors
 
+    def extract_anchor(self, read):
+        """Derive the TDUP anchor carried by a single alignment, if any.
 
-def scan_itd(
+        Only primary alignments with a single SA tag on the same chromosome and
+        strand, passing the MAPQ cutoff and without an XA tag, can be anchors.
+        The TDUP id and reference allele are resolved once per TDUP and shared by
+        all of its anchors.
+
+        Args:
+            read: A pysam AlignedSegment.
+
+        Returns:
+            TdupAnchor | None: The anchor, or None if the alignment does not
+                describe a TDUP.
+        """
+        # XA: Alternative hits https://gist.github.com/crazyhottommy/ed73c7e2daee8383dccb35f224f99714
+        if not (read.has_tag("SA") and read.mapping_quality >= self.mapq_cutoff and not read.is_supplementary and not read.is_secondary and not read.has_tag("XA")):
+            return None
+
+        chimeric_aln = read.get_tag("SA")[:-1].split(";")  # type: ignore
+        # skip multi-hop DNA segment
+        if len(chimeric_aln) > 1:
+            return None
+
+        chrm_ra = read.reference_name
+        strand_ra = "-" if read.is_reverse else "+"
+
+        # only consider the first segment
+        sa_string = chimeric_aln[0]
+
+        chrm_sa, pos_sa, strand_sa, cigar_sa, mapq_sa, nm_sa = format_sa_tag(sa_string)
+
+        if chrm_ra == chrm_sa and strand_ra == strand_sa:
+            read_uno = LazyRead(read)
+            read_dos = LazyRead.from_sa(read, chrm_sa, pos_sa, strand_sa, cigar_sa, mapq_sa, nm_sa)  # type: ignore
+
+            uno_mode = read_uno.simple_mode
+            dos_mode = read_dos.simple_mode
+
+            event_info = same_chrom_same_strand_handler(
+                read_uno,
+                read_dos,
+                uno_mode,
+                dos_mode,
+                self.genome_fasta,
+                self.logger,
+                self.microinsertion_cutoff,
+            )
+
+            if event_info is not None:
+                (
+                    _event_type,
+                    _positions,
+                    _read1_info,
+                    _read2_info,
+                    _insertion_info,
+                    _strands,
+                ) = event_info
+
+                break_point_region = MicroRegion(_insertion_info[0])
+                self.logger.trace(f"{break_point_region=} {read.query_name=}")
+
+                (
+                    tdup_start,
+                    tdup_end,
+                    _,
+                    _,
+                ) = _positions
+
+                tdup_ref_start = int(tdup_start.split(":")[1])
+                tdup_ref_end = int(tdup_end.split(":")[1])
+
+                tdup_key = (chrm_ra, tdup_ref_start, tdup_ref_end, break_point_region)
+                resolved = self._tdup_ids.get(tdup_key)
+                if resolved is None:
+                    resolved = self._tdup_ids[tdup_key] = resolve_tdup_id(self.genome_fasta, *tdup_key)
+                return TdupAnchor(chrm_ra, tdup_ref_start, tdup_ref_end, strand_ra, break_point_region, *resolved)
+        return None
+
+
+def iter_events(
     in_bam_path,
     mapq_cutoff,
     ref_genome,
@@ -237,12 +274,28 @@ def scan_itd(
     allowed_mismatches_for_insertion,
     logger,
     microinsertion_cutoff: int = 10,
-):
-    """Run the full ScanITD detection pipeline on a BAM file.
+    *,
+    single_pass: bool = False,
+    engine: ScanEngine | str = ScanEngine.PILEUP,
+    workers: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    threads: int = 1,
+    reference_cache_bytes: int = DEFAULT_REFERENCE_CACHE_BYTES,
+    catalog_horizon: int | None = None,
+    chimeric_index: bool = False,
+    chimeric_index_dir: Path | None = None,
+) -> Iterator[Event]:
+    """Run the full ScanITD detection pipeline on a BAM file, streaming the events.
 
     Scans the BAM file for chimeric reads (SA-tagged), identifies TDUP anchor
     positions, then performs a pileup pass to count supporting reads, rescue
-    soft-clipped reads, and collect large insertions. Outputs sorted Event objects.
+    soft-clipped reads, and collect large insertions.  The split-read rescue and
+    depth lookup run contig by contig after the counting pass, and the events of
+    a contig are yielded as soon as it is finalized, so only one contig's events
+    are held at a time.
+
+    Options are checked and the BAM and reference opened when called; the scan
+    runs as the returned iterator is consumed.
 
     Args:
         in_bam_path: Path to the input BAM file.
@@ -258,16 +311,55 @@ def scan_itd(
         logger: Logger instance implementing LoggerType.
         microinsertion_cutoff: Maximum microinsertion length at a breakpoint
             (default: 10).
+        single_pass: Classify TDUP anchors inside the pileup pass instead of
+            scanning the BAM twice (default: False). Produces the same events.
+            Serial scans only; several workers always collect the anchors of
+            all shards before counting.
+        engine: Counting engine, ``pileup`` (default) or ``read``; ``read`` falls
+            back to ``pileup`` on a pysam release it is not verified on.
+        workers: Number of worker processes. Above 1, the genome or target
+            regions are split into shards that are scanned and rescued in
+            parallel (see :mod:`scanitd.inference.parallel`); events are identical
+            to the serial scan.
+        shard_size: Maximum number of reference bases per shard (default: 5 Mb).
+        threads: Number of htslib threads decompressing the BAM, per open BAM
+            handle, i.e. per worker process (default: 1).
+        reference_cache_bytes: Memory budget, in bases, of the in-memory
+            reference, split evenly between the parent and the worker
+            processes (default: 512 MiB).
+        catalog_horizon: Bound the soft-clip catalog of the two-pass serial scan
+            to the TDUP breakpoints and the last ``catalog_horizon`` bases of the
+            sweep (see :class:`~scanitd.inference.evidence.EvidenceCollector`);
+            None keeps every soft-clip (default).
+        chimeric_index: Read the anchor candidates of the two-pass serial scan
+            from the BAM's chimeric index, building it on first use (see
+            :mod:`scanitd.inference.chimeric_index`; default: False).
+        chimeric_index_dir: Directory of the chimeric index; None places it
+            next to the BAM.  Setting it implies ``chimeric_index``.
 
     Returns:
-        tuple: A 2-tuple of (sorted_event_list, bam_header) where sorted_event_list
-            is a list of :class:`~scanitd.base.Event` objects sorted by (chrom, ref_start)
-            and bam_header is the raw BAM header dict.
+        Iterator: :class:`~scanitd.base.Event` objects, contigs in BAM header
+            order and events of a contig sorted by ``ref_start``.
+
+    Raises:
+        ValueError: If ``catalog_horizon`` or ``chimeric_index`` is combined with
+            ``single_pass`` or several workers.
     """
+    if catalog_horizon is not None and (single_pass or workers > 1):
+        msg = "a bounded soft-clip catalog needs the two-pass serial scan (no single_pass, workers=1)"
+        raise ValueError(msg)
+    chimeric_index = chimeric_index or chimeric_index_dir is not None
+    if chimeric_index and (single_pass or workers > 1):
+        msg = "the chimeric index serves the anchor scan of the two-pass serial scan (no single_pass, workers=1)"
+        raise ValueError(msg)
+
     regions = parse_target_genomic_coordinates(target_file)
 
     if len(regions) == 0:
         regions = [None]
+    if workers > 1:
+        # the parent and every worker hold a reference cache
+        reference_cache_bytes = max(1, reference_cache_bytes // (workers + 1))
 
     bam_scanner = BamScanner(
         input_bam=Path(in_bam_path),
@@ -276,185 +368,344 @@ def scan_itd(
         microinsertion_cutoff=microinsertion_cutoff,
         regions=regions,
         logger=logger,
+        threads=threads,
+        reference_cache_bytes=reference_cache_bytes,
+    )
+    return _iter_scan_events(
+        bam_scanner,
+        regions,
+        itd_length_cutoff,
+        allowed_mismatches_for_sr_rescue,
+        allowed_mismatches_for_insertion,
+        _resolve_engine(engine, logger),
+        single_pass,
+        workers,
+        shard_size,
+        catalog_horizon,
+        chimeric_index_dir if chimeric_index else None,
+        chimeric_index,
+        logger,
     )
-    # iterate over all read of the bam file
-    tdup_anchors = bam_scanner.iter_bam()
 
+
+def _resolve_engine(engine, logger) -> ScanEngine:
+    """The counting engine to run: ``engine``, or the pileup engine if the read
+    engine is not verified on the installed pysam (see :func:`read_engine_verified`).
+    """
+    engine = ScanEngine(engine)
+    if engine == ScanEngine.READ and not read_engine_verified():
+        (lowest, beyond) = (".".join(map(str, version)) for version in READ_ENGINE_PYSAM_VERSIONS)
+        logger.warning(
+            f"The read engine replays htslib internals verified on pysam {lowest} to below {beyond}; "
+            f"pysam {pysam.__version__} is installed, falling back to the pileup engine",
+        )
+        return ScanEngine.PILEUP
+    return engine
+
+
+def _iter_scan_events(
+    bam_scanner,
+    regions,
+    itd_length_cutoff,
+    allowed_mismatches_for_sr_rescue,
+    allowed_mismatches_for_insertion,
+    engine,
+    single_pass,
+    workers,
+    shard_size,
+    catalog_horizon,
+    chimeric_index_dir,
+    chimeric_index,
+    logger,
+) -> Iterator[Event]:
+    """The scan of :func:`iter_events`, run as the events are consumed."""
     bam_object = bam_scanner.in_bam_object
     genome_fasta = bam_scanner.genome_fasta
+    contig_order = bam_object.references
+
+    try:
+        if workers > 1:
+            with ShardedScan(
+                workers,
+                bam_scanner.in_bam_path,
+                bam_scanner.ref_genome,
+                bam_scanner.mapq_cutoff,
+                bam_scanner.microinsertion_cutoff,
+                itd_length_cutoff,
+                allowed_mismatches_for_sr_rescue,
+                allowed_mismatches_for_insertion,
+                engine,
+                logger,
+                threads=bam_scanner.threads,
+                reference_cache_bytes=bam_scanner.reference_cache_bytes,
+            ) as sharded_scan:
+                collector = sharded_scan.collect(bam_object, genome_fasta, regions, shard_size)
+                units = plan_finalization(collector, collector.ordered_tdup_ao(), contig_order=contig_order)
+                del collector
+                for _, events in sharded_scan.iter_finalize(units):
+                    yield from events
+        else:
+            index_object = open_chimeric_index(bam_scanner.in_bam_path, bam_object, logger, chimeric_index_dir) if chimeric_index else None
+            collector = _collect_evidence(
+                bam_scanner,
+                regions,
+                itd_length_cutoff,
+                allowed_mismatches_for_insertion,
+                engine,
+                single_pass,
+                logger,
+                catalog_horizon,
+                name_window=_sweeps_forward(bam_object, regions),
+                chimeric_index=index_object,
+            )
+            if index_object is not None:
+                index_object.close()
+            units = plan_finalization(collector, collector.ordered_tdup_ao(), contig_order=contig_order)
+            del collector
+            rescue_aligner = RescueAligner()
+            unit_results = ((unit.chrom, finalize_unit(unit, bam_object, genome_fasta, allowed_mismatches_for_sr_rescue, rescue_aligner, logger)) for unit in units)
+            for _, events in iter_contig_events(unit_results):
+                yield from events
+            logger.debug(f"Split-read rescue: {rescue_aligner.stats()}")
+            logger.debug(f"SA-tag CIGAR cache: {cigar_cache_stats()}")
+
+        logger.debug(f"Reference cache: {genome_fasta.stats()}")
+    finally:
+        bam_object.close()
+
+
+def read_bam_header(in_bam_path) -> dict:
+    """The header of a BAM file as a dict, as ``scan_itd`` returns it."""
+    with pysam.AlignmentFile(str(in_bam_path), "rb") as bam_object:
+        return bam_object.header.as_dict()
 
-    to_be_rescued_sequences = defaultdict(list)
 
-    query_reads_total_set = set()
+def scan_itd(
+    in_bam_path,
+    mapq_cutoff,
+    ref_genome,
+    target_file,
+    itd_length_cutoff,
+    allowed_mismatches_for_sr_rescue,
+    allowed_mismatches_for_insertion,
+    logger,
+    microinsertion_cutoff: int = 10,
+    **options,
+):
+    """Run the full ScanITD detection pipeline on a BAM file.
 
-    tdup_ao = defaultdict(int)
-    tdup_allele_dict = {}
+    Collects the events of :func:`iter_events` into one list, which therefore
+    follows the contig order of the BAM header (``chr2`` before ``chr10``).
 
-    ins_ao = defaultdict(int)
-    ins_allele_dict = {}
+    Args:
+        in_bam_path: Path to the input BAM file.
+        mapq_cutoff: Minimum MAPQ score for read inclusion.
+        ref_genome: Path to the reference FASTA file.
+        target_file: BED file path or samtools region string to restrict analysis;
+            empty string means whole genome.
+        itd_length_cutoff: Minimum ITD length to report (in base pairs).
+        allowed_mismatches_for_sr_rescue: Max mismatches allowed when rescuing
+            soft-clipped reads via Smith-Waterman alignment.
+        allowed_mismatches_for_insertion: Max mismatches allowed when classifying
+            a large insertion as a TDUP via self-loop checking.
+        logger: Logger instance implementing LoggerType.
+        microinsertion_cutoff: Maximum microinsertion length at a breakpoint
+            (default: 10).
+        **options: Keyword-only options of :func:`iter_events` (``single_pass``,
+            ``engine``, ``workers``, ``shard_size``, ``threads``,
+            ``reference_cache_bytes``, ``catalog_horizon``, ``chimeric_index``,
+            ``chimeric_index_dir``).
+
+    Returns:
+        tuple: A 2-tuple of (sorted_event_list, bam_header) where sorted_event_list
+            is a list of :class:`~scanitd.base.Event` objects sorted by contig in
+            BAM header order, then ref_start, and bam_header is the raw BAM header dict.
+    """
+    events = iter_events(
+        in_bam_path,
+        mapq_cutoff,
+        ref_genome,
+        target_file,
+        itd_length_cutoff,
+        allowed_mismatches_for_sr_rescue,
+        allowed_mismatches_for_insertion,
+        logger,
+        microinsertion_cutoff,
+        **options,
+    )
+    return list(events), read_bam_header(in_bam_path)
+
+
+def _collect_evidence(
+    bam_scanner,
+    regions,
+    itd_length_cutoff,
+    allowed_mismatches_for_insertion,
+    engine,
+    single_pass,
+    logger,
+    catalog_horizon=None,
+    *,
+    name_window: bool = False,
+    chimeric_index=None,
+) -> EvidenceCollector:
+    """Run the anchor and counting passes of a serial scan.
+
+    Args:
+        bam_scanner: BamScanner of the scan.
+        regions: List of samtools region strings; None means whole genome.
+        itd_length_cutoff: Minimum ITD length to report (in base pairs).
+        allowed_mismatches_for_insertion: Max mismatches allowed when classifying
+            a large insertion as a TDUP via self-loop checking.
+        engine: Counting engine, ScanEngine.PILEUP or ScanEngine.READ.
+        single_pass: Classify TDUP anchors inside the counting pass.
+        logger: Logger instance implementing LoggerType.
+        catalog_horizon: Horizon of a bounded soft-clip catalog, or None.
+        name_window: Forget counted read names behind the sweep (two-pass scan
+            only; see :class:`~scanitd.inference.evidence.EvidenceCollector`).
+        chimeric_index: Open chimeric index the anchor scan reads instead of
+            the BAM (two-pass scan only), or None.
+
+    Returns:
+        EvidenceCollector: Collector holding the counts of the scan.
+    """
+    if single_pass:
+        collector = EvidenceCollector(
+            bam_scanner.genome_fasta,
+            bam_scanner.tdup_anchors,
+            bam_scanner.mapq_cutoff,
+            itd_length_cutoff,
+            allowed_mismatches_for_insertion,
+            deferred_anchors=True,
+        )
+        if engine == ScanEngine.READ:
+            read_level_pass(bam_scanner, regions, collector, logger, classify_anchors=True)
+        else:
+            _single_pass_pileup(bam_scanner, regions, collector, logger)
+        return collector
 
-    event_list = []
+    # iterate over all read of the bam file
+    tdup_anchors = bam_scanner.iter_bam(chimeric_index)
+    collector = EvidenceCollector(
+        bam_scanner.genome_fasta,
+        tdup_anchors,
+        bam_scanner.mapq_cutoff,
+        itd_length_cutoff,
+        allowed_mismatches_for_insertion,
+        catalog_horizon=catalog_horizon,
+        name_window=name_window,
+    )
+    if engine == ScanEngine.READ:
+        read_level_pass(bam_scanner, regions, collector, logger)
+    else:
+        _pileup_pass(bam_scanner.in_bam_object, regions, collector, logger)
+    if catalog_horizon is not None:
+        logger.debug(f"Soft-clip catalog: {len(collector.to_be_rescued_sequences)} positions kept, {collector.catalog_evictions} evicted")
+        if collector.late_breakpoints:
+            logger.warning(
+                f"{collector.late_breakpoints} insertion-inferred TDUP breakpoints lie behind evicted soft-clips; "
+                "their split-read rescue may be incomplete, raise the catalog horizon",
+            )
+    return collector
+
+
+def _sweeps_forward(bam_object, regions) -> bool:
+    """Whether scanning ``regions`` in turn visits the genome in coordinate order.
+
+    True for a whole-genome scan and for sorted, non-overlapping regions; a read
+    name window is only safe when the sweep never moves backwards.
+    """
+    if regions == [None]:
+        return True
+    previous_end = (-1, -1)
+    for _region in regions:
+        if _region is None:
+            return False
+        try:
+            _, tid, start, stop = bam_object.parse_region(region=_region)
+        except ValueError:
+            return False
+        if (tid, start) < previous_end:
+            return False
+        previous_end = (tid, stop)
+    return True
 
+
+def _pileup_pass(bam_object, regions, collector, logger) -> None:
+    """Feed every pileup read of every region to the evidence collector.
+
+    Args:
+        bam_object: Open pysam AlignmentFile.
+        regions: List of samtools region strings; None means whole genome.
+        collector: EvidenceCollector with all TDUP anchors already known.
+        logger: Logger instance implementing LoggerType.
+    """
+    windowed = collector.counted_names.windowed
     for _region in regions:
         try:
-            for pileup_column in bam_object.pileup(region=_region, stepper="all", truncate=True):
+            _, _, region_start, _ = bam_object.parse_region(region=_region)
+            for pileup_column in bam_object.pileup(region=_region, stepper="all", truncate=True, max_depth=PILEUP_MAX_DEPTH):
+                reference_pos = pileup_column.reference_pos
                 # a list of pysam.PileupRead
                 for pileup_read in pileup_column.pileups:
-                    position_of_pileup_site = pileup_read.query_position
                     read = pileup_read.alignment
-
-                    read_name = read.query_name
-                    chrm_ra = read.reference_name
-                    pos_ra = read.reference_start
-                    strand_ra = "-" if read.is_reverse else "+"
-
-                    cigar_ra = read.cigarstring
-                    mapq_ra = read.mapping_quality
-                    nm_ra = read.get_tag("NM")
-                    seq_ra = read.query_sequence
-                    query_qualities_ra = read.query_qualities
-
-                    if position_of_pileup_site and read.mapping_quality >= mapq_cutoff:
-                        # in BWA-MEM data, supplmentary alignments will always have H in cigar
-                        if "S" in cigar_ra and "H" not in cigar_ra:
-                            read_obj = Read.new(
-                                read_name,
-                                chrm_ra,
-                                pos_ra,
-                                strand_ra,
-                                cigar_ra,
-                                mapq_ra,
-                                nm_ra,  # type: ignore
-                                seq_ra,
-                                query_qualities_ra,
-                            )
-                            # Collect reads with softclipping without TDUP anchors
-                            if read_name not in tdup_anchors:
-                                read_mode = read_obj.simple_mode
-                                if read_mode == MappingMode.MS:
-                                    softclipped_sequence = read_obj.query_sequence[-read_obj.rt_soft_len :]
-                                    softclipped_position = read_obj.ref_end
-                                else:
-                                    softclipped_sequence = read_obj.query_sequence[: read_obj.lt_soft_len]
-                                    softclipped_position = read_obj.ref_start
-
-                                if read_name not in query_reads_total_set:
-                                    to_be_rescued_sequences[(chrm_ra, softclipped_position, read_mode)].append(softclipped_sequence)
-                                    query_reads_total_set.add(read_name)
-
-                            # deal with TDUP anchors
-                            else:
-                                (
-                                    _,
-                                    tdup_ref_start,
-                                    tdup_ref_end,
-                                    _,
-                                    break_point_region,
-                                ) = tdup_anchors[read_name]
-                                tdup_size = tdup_ref_end - tdup_ref_start
-
-                                tdup_seq = genome_fasta[chrm_ra][tdup_ref_start:tdup_ref_end].seq
-
-                                tdup_id = (
-                                    chrm_ra,
-                                    tdup_ref_start,
-                                    tdup_size,
-                                    tdup_seq,
-                                    break_point_region,
-                                )
-
-                                ref_allele = genome_fasta[chrm_ra][tdup_ref_start : tdup_ref_start + 1].seq
-
-                                tdup_allele_dict[tdup_id] = (ref_allele, "TDUP")
-
-                                if read_name not in query_reads_total_set:
-                                    tdup_ao[tdup_id] += 1
-                                    query_reads_total_set.add(read_name)
-
-                        # I in the CIGAR ####
-                        if pileup_read.indel >= itd_length_cutoff:
-                            insertion_size = pileup_read.indel
-                            if re.search(rf"\d+M{insertion_size}I\d+M", cigar_ra):
-                                left_seq_from_genome = genome_fasta[chrm_ra][(pileup_column.reference_pos - insertion_size + 2) : pileup_column.reference_pos + 1].seq
-
-                                right_seq_from_genome = genome_fasta[chrm_ra][pileup_column.reference_pos + 1 : (pileup_column.reference_pos + insertion_size)].seq
-
-                                insertion_seq_in_read = seq_ra[position_of_pileup_site + 1 : (position_of_pileup_site + insertion_size + 1)]
-
-                                is_dup, left_shift, tdup_seq = self_loop_checker(
-                                    insertion_seq_in_read,
-                                    left_seq_from_genome,
-                                    right_seq_from_genome,
-                                    allowed_mismatches_for_insertion,
-                                )
-
-                                if is_dup and get_insertion_reference_pos(cigar_ra, pos_ra, insertion_size) == pileup_column.reference_pos:
-                                    tdup_ref_start = pileup_column.reference_pos - left_shift
-                                    tdup_id = (
-                                        chrm_ra,
-                                        tdup_ref_start,
-                                        insertion_size,
-                                        tdup_seq,
-                                        MicroRegion(""),
-                                    )
-
-                                    if read_name not in query_reads_total_set:
-                                        tdup_ao[tdup_id] += 1
-                                        query_reads_total_set.add(read_name)
-
-                                    ref_allele = genome_fasta[chrm_ra][tdup_ref_start : tdup_ref_start + 1].seq
-                                    tdup_allele_dict[tdup_id] = (
-                                        ref_allele,
-                                        "TDUP",
-                                    )
-                                # Novel sequence insertion
-                                else:
-                                    ins_id = (
-                                        chrm_ra,
-                                        pileup_column.reference_pos,
-                                        insertion_size,
-                                        insertion_seq_in_read,
-                                        MicroRegion(""),
-                                    )
-                                    ref_allele = genome_fasta[chrm_ra][pileup_column.reference_pos : pileup_column.reference_pos + 1].seq
-                                    alt_allele = seq_ra[position_of_pileup_site : position_of_pileup_site + insertion_size]
-                                    ins_allele_dict[ins_id] = (ref_allele, alt_allele)
-                                    if read_name not in query_reads_total_set:
-                                        ins_ao[ins_id] += 1
-                                        query_reads_total_set.add(read_name)
+                    if windowed and reference_pos == max(read.reference_start, region_start):
+                        collector.observe_alignment(read)
+                    collector.observe(read, pileup_read.query_position, pileup_read.indel, reference_pos)
 
         except ValueError as e:
             _col = pileup_column if "pileup_column" in dir() else "<not yet assigned>"
             logger.warning(f"pileup_column={_col}, {e=}")
             continue
-    for tdup_id in tdup_ao:
-        original_ao = tdup_ao[tdup_id]
-        new_ao = update_tdup_ao(
-            tdup_id,
-            original_ao,
-            genome_fasta,
-            to_be_rescued_sequences,
-            allowed_mismatches_for_sr_rescue,
-        )
 
-        logger.trace(f"{tdup_id=}, {original_ao=}, {new_ao=}")
 
-        _chrom, _ref_start, _event_size, _event_seq, break_point_region = tdup_id
-        # TDUP breakpoint is always the ITD start (SM-side) — use SM mode
-        depth = obtain_depth_given_genomic_position(bam_object, _chrom, _ref_start, MappingMode.SM)
-        ref_allele, alt_allele = tdup_allele_dict[tdup_id]
-        event_list.append(Event.new("TDUP", tdup_id, original_ao, new_ao, depth, ref_allele, alt_allele))
+def _single_pass_pileup(bam_scanner, regions, collector, logger) -> None:
+    """Classify TDUP anchors and count support in one pileup pass.
 
-    for ins_id in ins_ao:
-        _chrom, _ref_start, _event_size, _event_seq, break_point_region = ins_id
-        ao = ins_ao[ins_id]
-        # INS reference_pos is the pileup column position — use SM mode (no offset)
-        depth = obtain_depth_given_genomic_position(bam_object, _chrom, _ref_start, MappingMode.SM)
-        ref_allele, alt_allele = ins_allele_dict[ins_id]
-        event_list.append(Event.new("INS", ins_id, ao, ao, depth, ref_allele, alt_allele))
+    The pileup is opened without flag or base-quality filtering so that every
+    alignment fetched by the two-pass anchor scan is seen; each alignment is
+    classified as a potential anchor the first time it appears (at its start, or
+    at the region start for reads entering from the left), while the default
+    pileup filters are re-applied in Python before a read is counted.  Neither
+    pass caps the pileup depth (``PILEUP_MAX_DEPTH``), so the reads filtered
+    here cannot crowd counted reads out of a deep column.  Anchors that show up
+    after their mate was already counted are resolved by
+    :meth:`EvidenceCollector.register_anchor`.
 
-    # Sort by chrom, then by reference position
-    sorted_event_list = sorted(event_list, key=lambda event: (event.chrom, event.ref_start))
-    bam_object.close()
+    Args:
+        bam_scanner: BamScanner supplying the BAM handle and anchor extraction.
+        regions: List of samtools region strings; None means whole genome.
+        collector: EvidenceCollector created with ``deferred_anchors=True``.
+        logger: Logger instance implementing LoggerType.
+    """
+    logger.info("Scanning bam file in a single pass")
+    bam_object = bam_scanner.in_bam_object
+
+    for _region in regions:
+        try:
+            _, _, region_start, _ = bam_object.parse_region(region=_region)
+            for pileup_column in bam_object.pileup(
+                region=_region,
+                stepper="all",
+                truncate=True,
+                flag_filter=0,
+                min_base_quality=0,
+                max_depth=PILEUP_MAX_DEPTH,
+            ):
+                reference_pos = pileup_column.reference_pos
+                base_qualities = pileup_column.get_query_qualities()
+                for base_quality, pileup_read in zip(base_qualities, pileup_column.pileups, strict=True):
+                    read = pileup_read.alignment
+                    if reference_pos == max(read.reference_start, region_start):
+                        anchor = bam_scanner.extract_anchor(read)
+                        if anchor is not None:
+                            collector.register_anchor(read.query_name, anchor)
+
+                    if read.flag & PILEUP_FLAG_FILTER or base_quality < PILEUP_MIN_BASE_QUALITY:
+                        continue
+                    collector.observe(read, pileup_read.query_position, pileup_read.indel, reference_pos)
 
-    return sorted_event_list, bam_scanner.header
+        except ValueError as e:
+            _col = pileup_column if "pileup_column" in dir() else "<not yet assigned>"
+            logger.warning(f"pileup_column={_col}, {e=}")
+            continue
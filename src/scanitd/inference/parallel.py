@@ -0,0 +1,363 @@
+"""Process-pool parallel scan over genomic shards.
+
+The regions of a scan (whole contigs, or the ``--target`` regions) are cut into
+shards of at most ``shard_size`` bases.  Every worker process opens its own BAM
+and FASTA handles.  The scan runs in two rounds over the shards, each streamed
+back to the parent in scan order with at most ``2 * workers`` shards in flight:
+
+* the anchor round collects the TDUP anchors of the reads starting in each
+  shard, and the parent merges them (later shards overwrite earlier ones, as in
+  the serial scan);
+* the counting round runs the counting pass of each shard with an anchor-less
+  :class:`~scanitd.inference.evidence.EvidenceCollector`, and the parent
+  replays its attempts as they arrive: they are de-duplicated by read name and
+  re-classified against the merged anchors, then dropped.
+
+The parent thus holds the anchors of the whole scan but the soft-clip evidence
+of a bounded window of shards only.  Reads crossing a shard boundary are seen by
+both shards but counted once, so the merged counts equal those of the serial
+scan.  The finalization stage (split-read rescue, depth and event construction,
+see :mod:`scanitd.inference.finalize`) runs on the same pool.
+
+Worker processes only forward warnings and errors to the parent's logger.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from multiprocessing import Pool
+from typing import TYPE_CHECKING, Any
+
+from .anchors import AnchorTable
+from .evidence import EvidenceCollector
+from .finalize import FinalizationUnit, finalize_unit, iter_contig_events
+from .read_engine import read_level_pass
+from .readnames import read_name_hash
+from .reference import DEFAULT_REFERENCE_CACHE_BYTES
+from .sr_resuer import RescueAligner
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    from pyfaidx import Fasta
+    from pysam import AlignmentFile
+    from typing_extensions import Self
+
+    from scanitd.base import Event
+    from scanitd.mtype import LoggerType
+
+__all__ = ["DEFAULT_SHARD_SIZE", "ShardedScan", "plan_shards"]
+
+DEFAULT_SHARD_SIZE = 5_000_000
+
+# per-process state of a pool worker, set by _init_worker
+_WORKER: dict[str, Any] = {}
+
+
+def plan_shards(bam_object: AlignmentFile, regions: list, shard_size: int = DEFAULT_SHARD_SIZE) -> list[tuple[str, int | None]]:
+    """Cut the scan regions into shards, keeping the scan order.
+
+    Args:
+        bam_object: Open pysam AlignmentFile supplying contig names and lengths.
+        regions: List of samtools region strings; None means whole genome.
+        shard_size: Maximum number of reference bases per shard.
+
+    Returns:
+        list: ``(region, home_start)`` tuples.  ``home_start`` is the 0-based
+            start of the shard, or None for the first shard of a region; a read
+            belongs to the shard it starts in (or to the first one if it starts
+            before the region).
+    """
+    if shard_size < 1:
+        msg = f"shard_size must be positive, got {shard_size}"
+        raise ValueError(msg)
+
+    spans = []
+    for _region in regions:
+        if _region is None:
+            spans.extend((contig, 0, length) for contig, length in zip(bam_object.references, bam_object.lengths, strict=True))
+            continue
+        _, tid, start, stop = bam_object.parse_region(region=_region)
+        spans.append((bam_object.get_reference_name(tid), start, min(stop, bam_object.lengths[tid])))
+
+    shards = []
+    for contig, start, stop in spans:
+        for shard_start in range(start, stop, shard_size):
+            shard_stop = min(shard_start + shard_size, stop)
+            home_start = None if shard_start == start else shard_start
+            shards.append((f"{contig}:{shard_start + 1}-{shard_stop}", home_start))
+    return shards
+
+
+class ShardedScan:
+    """Run the counting and finalization stages of :func:`scan_itd` on a process pool.
+
+    Use as a context manager; the pool is shut down on exit.
+
+    Args:
+        workers: Number of worker processes.
+        in_bam_path: Path to the input BAM file.
+        ref_genome: Path to the reference FASTA file.
+        mapq_cutoff: Minimum MAPQ score for read inclusion.
+        microinsertion_cutoff: Maximum microinsertion length at a breakpoint.
+        itd_length_cutoff: Minimum ITD length to report (in base pairs).
+        allowed_mismatches_for_sr_rescue: Max mismatches of a rescue alignment.
+        allowed_mismatches_for_insertion: Max mismatches when classifying a large
+            insertion as a TDUP.
+        engine: Counting engine name, ``pileup`` or ``read``.
+        logger: Logger instance implementing LoggerType.
+        threads: Number of htslib threads of each worker's BAM handle.
+        reference_cache_bytes: Memory budget of each worker's reference cache.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        in_bam_path,
+        ref_genome,
+        mapq_cutoff: int,
+        microinsertion_cutoff: int,
+        itd_length_cutoff: int,
+        allowed_mismatches_for_sr_rescue: int,
+        allowed_mismatches_for_insertion: int,
+        engine: str,
+        logger: LoggerType,
+        *,
+        threads: int = 1,
+        reference_cache_bytes: int = DEFAULT_REFERENCE_CACHE_BYTES,
+    ) -> None:
+        """Start the worker pool."""
+        self.workers = workers
+        self.mapq_cutoff = mapq_cutoff
+        self.itd_length_cutoff = itd_length_cutoff
+        self.allowed_mismatches_for_sr_rescue = allowed_mismatches_for_sr_rescue
+        self.allowed_mismatches_for_insertion = allowed_mismatches_for_insertion
+        self.logger = logger
+        self.pool = Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(
+                str(in_bam_path),
+                str(ref_genome),
+                mapq_cutoff,
+                microinsertion_cutoff,
+                itd_length_cutoff,
+                allowed_mismatches_for_sr_rescue,
+                allowed_mismatches_for_insertion,
+                engine,
+                threads,
+                reference_cache_bytes,
+            ),
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.pool.close()
+        else:
+            self.pool.terminate()
+        self.pool.join()
+
+    def collect(
+        self,
+        bam_object: AlignmentFile,
+        genome_fasta: Fasta,
+        regions: list,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+    ) -> EvidenceCollector:
+        """Scan all shards and merge their evidence in scan order.
+
+        The anchors of all shards are merged before the first counting attempt
+        is replayed, since a soft-clip is classified against the anchors of
+        its read name wherever they were found.
+
+        Args:
+            bam_object: Open pysam AlignmentFile used to plan the shards.
+            genome_fasta: Reference genome Fasta object of the merged collector.
+            regions: List of samtools region strings; None means whole genome.
+            shard_size: Maximum number of reference bases per shard.
+
+        Returns:
+            EvidenceCollector: Collector holding the merged counts.
+        """
+        shards = plan_shards(bam_object, regions, shard_size)
+        self.logger.info(f"Scanning {len(shards)} shards with {self.workers} workers")
+
+        tdup_anchors = AnchorTable()
+        for anchors, records in self._imap_window(_anchor_shard, shards):
+            self._forward(records)
+            tdup_anchors.update(anchors)
+
+        collector = EvidenceCollector(
+            genome_fasta,
+            tdup_anchors,
+            self.mapq_cutoff,
+            self.itd_length_cutoff,
+            self.allowed_mismatches_for_insertion,
+        )
+        for attempts, tdup_allele_dict, ins_allele_dict, records in self._imap_window(_scan_shard, shards):
+            self._forward(records)
+            collector.replay(attempts, tdup_allele_dict, ins_allele_dict)
+        return collector
+
+    def iter_finalize(self, units: list[FinalizationUnit]) -> Iterator[tuple[str, list[Event]]]:
+        """Run :func:`finalize_unit` for every unit on the pool, yielding chromosomes as they complete.
+
+        Args:
+            units: Output of :func:`~scanitd.inference.finalize.plan_finalization`.
+
+        Yields:
+            tuple: ``(chrom, events)`` in unit order, events sorted as in the
+                serial scan (see :func:`~scanitd.inference.finalize.iter_contig_events`).
+        """
+        self.logger.info(f"Finalizing {len(units)} event batches with {self.workers} workers")
+        results = self.pool.imap(_finalize_unit, units, chunksize=1)
+
+        def unit_results():
+            for unit, (events, records) in zip(units, results, strict=True):
+                self._forward(records)
+                yield unit.chrom, events
+
+        yield from iter_contig_events(unit_results())
+
+    def _imap_window(self, func: Callable, items: Iterable) -> Iterator:
+        """Results of ``func`` over ``items`` in order, with at most ``2 * workers`` tasks in flight.
+
+        Unlike ``Pool.imap``, which lets workers run ahead and queues their
+        results in the parent, a task is only submitted once the result of the
+        task ``2 * workers`` places before it has been consumed.
+        """
+        pending: deque = deque()
+        for item in items:
+            if len(pending) >= 2 * self.workers:
+                yield pending.popleft().get()
+            pending.append(self.pool.apply_async(func, (item,)))
+        while pending:
+            yield pending.popleft().get()
+
+    def _forward(self, records: list[tuple[str, str]]) -> None:
+        for level, message in records:
+            getattr(self.logger, level)(message)
+
+
+class _BufferedLogger:
+    """LoggerType stand-in for worker processes that keeps warnings and errors."""
+
+    def __init__(self) -> None:
+        self.records: list[tuple[str, str]] = []
+
+    def trace(self, msg: str) -> None:
+        pass
+
+    def debug(self, msg: str) -> None:
+        pass
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def success(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        self.records.append(("warning", msg))
+
+    def error(self, msg: str) -> None:
+        self.records.append(("error", msg))
+
+    def critical(self, msr: str) -> None:
+        self.records.append(("critical", msr))
+
+    def complete(self) -> None:
+        pass
+
+
+def _init_worker(
+    in_bam_path: str,
+    ref_genome: str,
+    mapq_cutoff: int,
+    microinsertion_cutoff: int,
+    itd_length_cutoff: int,
+    allowed_mismatches_for_sr_rescue: int,
+    allowed_mismatches_for_insertion: int,
+    engine: str,
+    threads: int,
+    reference_cache_bytes: int,
+) -> None:
+    # imported here: main imports this module
+    from pathlib import Path
+
+    from .main import BamScanner
+
+    _WORKER.update(
+        bam_scanner=BamScanner(
+            input_bam=Path(in_bam_path),
+            mapq_cutoff=mapq_cutoff,
+            ref_genome=Path(ref_genome),
+            microinsertion_cutoff=microinsertion_cutoff,
+            regions=[],
+            logger=_BufferedLogger(),
+            threads=threads,
+            reference_cache_bytes=reference_cache_bytes,
+        ),
+        mapq_cutoff=mapq_cutoff,
+        itd_length_cutoff=itd_length_cutoff,
+        allowed_mismatches_for_sr_rescue=allowed_mismatches_for_sr_rescue,
+        allowed_mismatches_for_insertion=allowed_mismatches_for_insertion,
+        rescue_aligner=RescueAligner(),
+        engine=engine,
+    )
+
+
+def _anchor_shard(shard: tuple[str, int | None]) -> tuple[AnchorTable, list]:
+    region, home_start = shard
+    bam_scanner = _WORKER["bam_scanner"]
+    logger = _BufferedLogger()
+    bam_scanner.logger = logger
+    anchors = AnchorTable()
+    # a read belongs to the shard it starts in
+    for read in bam_scanner.in_bam_object.fetch(region=region):
+        if home_start is None or read.reference_start >= home_start:
+            anchor = bam_scanner.extract_anchor(read)
+            if anchor is not None:
+                anchors[read_name_hash(read.query_name)] = anchor
+    return anchors, logger.records
+
+
+def _scan_shard(shard: tuple[str, int | None]) -> tuple:
+    from .main import ScanEngine, _pileup_pass
+
+    region, _ = shard
+    bam_scanner = _WORKER["bam_scanner"]
+    logger = _BufferedLogger()
+    bam_scanner.logger = logger
+    collector = EvidenceCollector(
+        bam_scanner.genome_fasta,
+        {},
+        _WORKER["mapq_cutoff"],
+        _WORKER["itd_length_cutoff"],
+        _WORKER["allowed_mismatches_for_insertion"],
+        deferred_anchors=True,
+    )
+
+    if ScanEngine(_WORKER["engine"]) == ScanEngine.READ:
+        read_level_pass(bam_scanner, [region], collector, logger)
+    else:
+        _pileup_pass(bam_scanner.in_bam_object, [region], collector, logger)
+
+    return collector.attempts(), collector.tdup_allele_dict, dict(collector.ins_allele_dict), logger.records
+
+
+def _finalize_unit(unit: FinalizationUnit) -> tuple[list, list]:
+    logger = _BufferedLogger()
+    bam_scanner = _WORKER["bam_scanner"]
+    events = finalize_unit(
+        unit,
+        bam_scanner.in_bam_object,
+        bam_scanner.genome_fasta,
+        _WORKER["allowed_mismatches_for_sr_rescue"],
+        _WORKER["rescue_aligner"],
+        logger,
+    )
+    return events, logger.records
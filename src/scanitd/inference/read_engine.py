@@ -0,0 +1,462 @@
+"""Read-level scanning engine.
+
+The pileup engine visits every read once per reference column it covers and
+re-derives the read's attributes at each of them, although only two kinds of
+column ever matter for counting: the first column at which the read is counted
+(soft-clip collection or TDUP anchor support) and the columns preceding a large
+CIGAR insertion.  This engine iterates alignments with ``fetch``, derives those
+columns straight from ``cigartuples`` and replays them through the
+:class:`~scanitd.inference.evidence.EvidenceCollector` in pileup order
+(column, then file order), so each read is handled once.
+
+The ``stepper="all"`` pileup semantics are reproduced: unmapped, secondary,
+QC-fail and duplicate reads are skipped, a read is only seen at a column when its
+base quality there is at least 13, and htslib's overlapping-mate quality
+adjustment (``ignore_overlaps=True``) is replayed before that check.  The
+pileup engines lift pysam's ``max_depth`` cap of 8000 reads
+(``PILEUP_MAX_DEPTH``), so no engine drops reads at deep coverage.
+
+The overlap adjustment is a port of htslib's private ``tweak_overlap_quality``
+and of the khash read-name hash choosing the mate that keeps the quality, so it
+is only trusted on the pysam releases it is tested against
+(``tests/test_read_engine.py``, ``READ_ENGINE_PYSAM_VERSIONS``); on any other
+release :func:`read_engine_verified` is False and scans fall back to the
+pileup engine.
+"""
+
+from __future__ import annotations
+
+import heapq
+import re
+from itertools import count
+from typing import TYPE_CHECKING
+
+import pysam
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    from pysam import AlignedSegment, AlignmentFile
+
+    from scanitd.mtype import LoggerType
+
+    from .evidence import EvidenceCollector
+    from .main import BamScanner
+
+__all__ = ["READ_ENGINE_PYSAM_VERSIONS", "pileup_events", "read_engine_verified", "read_level_pass"]
+
+#: pysam ``(major, minor)`` release series the htslib port is verified against:
+#: from the first up to, excluding, the second
+READ_ENGINE_PYSAM_VERSIONS = ((0, 22), (0, 25))
+
+# flags skipped by the default ``stepper="all"`` pileup
+PILEUP_FLAG_FILTER = 0x4 | 0x100 | 0x200 | 0x400
+# default ``min_base_quality`` of ``AlignmentFile.pileup``
+PILEUP_MIN_BASE_QUALITY = 13
+# ``max_depth`` of every pileup: htslib's largest cap, i.e. none; the default of
+# 8000 would drop reads of deep amplicon panels, and which ones would depend on
+# the flag filter of the pileup
+PILEUP_MAX_DEPTH = 0x7FFFFFFF
+
+_ALIGNED_OPS = (0, 7, 8)  # M, =, X
+_INS = 1
+_DEL = 2
+_REF_SKIP = 3
+_SOFT_CLIP = 4
+_HARD_CLIP = 5
+_PAD = 6
+
+_PAIRED = 0x1
+_PROPER_PAIR = 0x2
+_MATE_UNMAPPED = 0x8
+
+_UINT32 = 0xFFFFFFFF
+
+
+def pileup_events(
+    read: AlignedSegment,
+    column_start: int,
+    column_end: int,
+    itd_length_cutoff: int,
+    qualities: Sequence[int] | None = None,
+) -> list[tuple[int, int, int]]:
+    """List the pileup columns at which a read can change the collected evidence.
+
+    Args:
+        read: A mapped alignment.
+        column_start: First reference column of the scanned region (0-based).
+        column_end: End of the scanned region (exclusive).
+        itd_length_cutoff: Minimum insertion length inspected for ITDs.
+        qualities: Base qualities to use instead of ``read.query_qualities``.
+
+    Returns:
+        list: ``(reference_pos, query_position, indel)`` tuples in column order.
+            The first valid column is included for reads with soft-clips and no
+            hard-clips; every insertion of at least ``itd_length_cutoff`` bases is
+            reported at the column of the base preceding it.  Columns whose query
+            position is 0 or whose base quality is below 13 are never reported,
+            exactly as the pileup loop ignores them.
+    """
+    cigartuples = read.cigartuples
+    if not cigartuples:
+        return []
+
+    ops = [op for op, _ in cigartuples]
+    needs_first = _SOFT_CLIP in ops and _HARD_CLIP not in ops
+    insertion_cutoff = max(itd_length_cutoff, 1)
+    needs_insertions = any(op == _INS and length >= insertion_cutoff for op, length in cigartuples)
+    if not needs_first and not needs_insertions:
+        return []
+
+    if qualities is None:
+        qualities = read.query_qualities
+    events: dict[int, tuple[int, int]] = {}
+    ref_pos = read.reference_start
+    query_pos = 0
+    n_ops = len(cigartuples)
+    for k, (op, length) in enumerate(cigartuples):
+        if op in (_DEL, _REF_SKIP):
+            ref_pos += length
+            continue
+        if op in (_INS, _SOFT_CLIP):
+            query_pos += length
+            continue
+        if op not in _ALIGNED_OPS:
+            continue
+
+        block_end = ref_pos + length
+        following_insertion = cigartuples[k + 1][1] if k + 1 < n_ops and cigartuples[k + 1][0] == _INS else 0
+        if needs_first:
+            for col in range(max(ref_pos, column_start), min(block_end, column_end)):
+                qpos = query_pos + col - ref_pos
+                if qpos > 0 and (qualities is None or qualities[qpos] >= PILEUP_MIN_BASE_QUALITY):
+                    events[col] = (qpos, following_insertion if col == block_end - 1 else 0)
+                    needs_first = False
+                    break
+        if following_insertion >= insertion_cutoff:
+            col = block_end - 1
+            qpos = query_pos + length - 1
+            if column_start <= col < column_end and qpos > 0 and (qualities is None or qualities[qpos] >= PILEUP_MIN_BASE_QUALITY):
+                events[col] = (qpos, following_insertion)
+        ref_pos = block_end
+        query_pos += length
+        if ref_pos >= column_end and not needs_first:
+            break
+    return [(col, qpos, indel) for col, (qpos, indel) in sorted(events.items())]
+
+
+def read_engine_verified(version: str | None = None) -> bool:
+    """Whether the read engine is verified on a pysam release.
+
+    Args:
+        version: pysam version string; defaults to the installed ``pysam.__version__``.
+    """
+    match = re.match(r"(\d+)\.(\d+)", pysam.__version__ if version is None else version)
+    if match is None:
+        return False
+    lowest, beyond = READ_ENGINE_PYSAM_VERSIONS
+    return lowest <= (int(match[1]), int(match[2])) < beyond
+
+
+def read_level_pass(
+    bam_scanner: BamScanner,
+    regions: list,
+    collector: EvidenceCollector,
+    logger: LoggerType,
+    *,
+    classify_anchors: bool = False,
+) -> None:
+    """Feed the evidence of every read of every region to the collector.
+
+    Args:
+        bam_scanner: BamScanner supplying the BAM handle and anchor extraction.
+        regions: List of samtools region strings; None means whole genome.
+        collector: EvidenceCollector receiving the observations.
+        logger: Logger instance implementing LoggerType.
+        classify_anchors: Classify TDUP anchors while reading (single-pass mode);
+            requires a collector created with ``deferred_anchors=True``.
+    """
+    bam_object: AlignmentFile = bam_scanner.in_bam_object
+    mapq_cutoff = collector.mapq_cutoff
+    itd_length_cutoff = collector.itd_length_cutoff
+    windowed = collector.counted_names.windowed
+
+    for _region in regions:
+        try:
+            _, _, region_start, region_end = bam_object.parse_region(region=_region)
+            pending: list = []
+            order = count()
+            serial = count()
+            overlaps = _OverlapTracker()
+            current_tid = None
+            for read in bam_object.fetch(region=_region):
+                if classify_anchors:
+                    anchor = bam_scanner.extract_anchor(read)
+                    if anchor is not None:
+                        collector.register_anchor(read.query_name, anchor)
+
+                if read.flag & PILEUP_FLAG_FILTER:
+                    continue
+
+                tid = read.reference_id
+                if tid != current_tid:
+                    _drain(pending, None, collector)
+                    current_tid = tid
+                _drain(pending, max(read.reference_start, region_start), collector)
+                if windowed:
+                    collector.observe_alignment(read)
+
+                # mates are tracked regardless of mapq, just as in the pileup
+                rank = next(order)
+                qualities, mate = overlaps.push(read)
+                if mate is not None:
+                    mate_read, mate_qualities, (mate_rank, mate_items) = mate
+                    for item in mate_items:
+                        if item[0] >= read.reference_start:
+                            item[-1] = False
+                    for col, qpos, indel in pileup_events(mate_read, region_start, region_end, itd_length_cutoff, mate_qualities):
+                        if col >= read.reference_start:
+                            heapq.heappush(pending, [col, mate_rank, next(serial), mate_read, qpos, indel, True])
+
+                if read.mapping_quality < mapq_cutoff:
+                    continue
+
+                items = [[col, rank, next(serial), read, qpos, indel, True] for col, qpos, indel in pileup_events(read, region_start, region_end, itd_length_cutoff, qualities)]
+                for item in items:
+                    heapq.heappush(pending, item)
+                overlaps.attach_events(read, rank, items)
+            _drain(pending, None, collector)
+
+        except ValueError as e:
+            logger.warning(f"region={_region}, {e=}")
+            continue
+
+
+def _drain(pending: list, before: int | None, collector: EvidenceCollector) -> None:
+    """Observe queued events in pileup order, up to (excluding) column ``before``."""
+    while pending and (before is None or pending[0][0] < before):
+        reference_pos, _, _, read, query_position, indel, live = heapq.heappop(pending)
+        if live:
+            collector.observe(read, query_position, indel, reference_pos)
+
+
+class _OverlapTracker:
+    """Replay htslib's overlapping-mate base quality adjustment for one pileup.
+
+    Mirrors ``overlap_push``/``overlap_remove`` of htslib's ``sam.c``: a properly
+    paired read whose mate is still to come waits in a name-keyed table until the
+    mate arrives (qualities of the overlapping bases are then rewritten for both
+    reads) or until the pileup moves past its end.
+    """
+
+    def __init__(self) -> None:
+        self.waiting: dict[str, list] = {}
+        self.live: list[tuple[int, int, int, str]] = []
+        self.order = count()
+        self.last_tid = -1
+        self.last_pos = -1
+
+    def push(self, read: AlignedSegment) -> tuple[list[int] | None, tuple | None]:
+        """Push a read that passed the flag filter, in file order.
+
+        Returns:
+            tuple: ``(qualities, mate)``.  ``qualities`` are the read's adjusted
+                qualities, or None when unchanged; ``mate`` is None or
+                ``(mate_read, mate_qualities, (mate_rank, mate_items))`` when the
+                read overlapped an earlier read of the same name whose queued
+                events must be re-derived from ``read.reference_start`` on.
+        """
+        tid = read.reference_id
+        pos = read.reference_start
+        # reads the pileup dropped after the previous push
+        live = self.live
+        while live and (live[0][0] < self.last_tid or (live[0][0] == self.last_tid and live[0][1] < self.last_pos)):
+            self.waiting.pop(heapq.heappop(live)[3], None)
+        self.last_tid = tid
+        self.last_pos = pos
+
+        flag = read.flag
+        end = pos + read.reference_length
+        if end <= pos or not flag & _PROPER_PAIR:
+            return None, None
+        query_name = read.query_name
+        heapq.heappush(live, (tid, end, next(self.order), query_name))
+
+        if flag & _MATE_UNMAPPED:
+            return None, None
+        mate_tid = read.next_reference_id
+        mate_pos = read.next_reference_start
+        if (mate_tid >= 0 and tid != mate_tid) or (abs(read.template_length) >= 2 * read.query_length and mate_pos >= end):
+            return None, None
+
+        entry = self.waiting.pop(query_name, None)
+        if entry is None:
+            if mate_pos >= pos or (flag & _PAIRED and mate_pos == -1):
+                self.waiting[query_name] = [read, None]
+            return None, None
+
+        mate_read, mate_events = entry
+        mate_qualities = _qualities(mate_read)
+        qualities = _qualities(read)
+        if not _tweak_overlap_quality(mate_read, mate_qualities, read, qualities):
+            return None, None
+        return qualities, (mate_read, mate_qualities, mate_events) if mate_events is not None else None
+
+    def attach_events(self, read: AlignedSegment, rank: int, items: list) -> None:
+        """Remember the file rank and queued events of a read waiting for its mate."""
+        entry = self.waiting.get(read.query_name)
+        if entry is not None and entry[0] is read:
+            entry[1] = (rank, items)
+
+
+def _qualities(read: AlignedSegment) -> list[int]:
+    qualities = read.query_qualities
+    if qualities is None:
+        return [0xFF] * read.query_length
+    return list(qualities)
+
+
+def _name_parity(query_name: str) -> int:
+    """Lowest bit of khash's Wang hash of the X31 string hash of a read name."""
+    data = query_name.encode()
+    key = data[0] if data else 0
+    for c in data[1:]:
+        key = (key * 31 + c) & _UINT32
+    key = (key + (~(key << 15) & _UINT32)) & _UINT32
+    key ^= key >> 10
+    key = (key + (key << 3)) & _UINT32
+    key ^= key >> 6
+    key = (key + (~(key << 11) & _UINT32)) & _UINT32
+    key ^= key >> 16
+    return key & 1
+
+
+def _iref2iseq_set(cigar: list, pos: int) -> tuple[int, int, int, int, int]:
+    """Port of htslib ``cigar_iref2iseq_set``: returns ``(ret, k, icig, iseq, iref)``."""
+    if pos < 0:
+        return -1, 0, 0, 0, 0
+    k = icig = iseq = iref = 0
+    while k < len(cigar):
+        op, n = cigar[k]
+        if op in (_SOFT_CLIP, _INS):
+            k += 1
+            iseq += n
+            icig = 0
+        elif op in (_HARD_CLIP, _PAD):
+            k += 1
+            icig = 0
+        elif op in _ALIGNED_OPS:
+            pos -= n
+            if pos < 0:
+                icig = n + pos
+                return 0, k, icig, iseq + icig, iref + icig
+            k += 1
+            iseq += n
+            icig = 0
+            iref += n
+        elif op in (_DEL, _REF_SKIP):
+            pos = max(pos - n, 0)
+            k += 1
+            icig = 0
+            iref += n
+        else:
+            return -2, k, icig, iseq, iref
+    return -1, k, icig, -1, iref
+
+
+def _iref2iseq_next(cigar: list, k: int, icig: int, iseq: int, iref: int) -> tuple[int, int, int, int, int]:
+    """Port of htslib ``cigar_iref2iseq_next``: returns ``(ret, k, icig, iseq, iref)``."""
+    while k < len(cigar):
+        op, n = cigar[k]
+        if op in _ALIGNED_OPS:
+            if icig >= n - 1:
+                icig = -1
+                k += 1
+                continue
+            return 0, k, icig + 1, iseq + 1, iref + 1
+        if op in (_DEL, _REF_SKIP):
+            iref += n
+        elif op in (_INS, _SOFT_CLIP):
+            iseq += n
+        elif op not in (_HARD_CLIP, _PAD):
+            return -2, k, icig, iseq, iref
+        k += 1
+        icig = -1
+    return -1, k, icig, -1, -1
+
+
+def _tweak_overlap_quality(a: AlignedSegment, a_qual: list[int], b: AlignedSegment, b_qual: list[int]) -> bool:
+    """Port of htslib ``tweak_overlap_quality`` for left read ``a`` and right read ``b``.
+
+    The quality lists are modified in place.
+
+    Returns:
+        bool: Whether the two reads overlap at all.
+    """
+    a_pos = a.reference_start
+    b_pos = b.reference_start
+    a_cigar = a.cigartuples
+    b_cigar = b.cigartuples
+    a_seq = a.query_sequence or ""
+    b_seq = b.query_sequence or ""
+    a_len = len(a_qual)
+    b_len = len(b_qual)
+
+    iref = b_pos
+    a_ret, a_k, a_icig, a_iseq, a_iref = _iref2iseq_set(a_cigar, iref - a_pos)
+    if a_ret < 0:
+        return False
+    b_ret, b_k, b_icig, b_iseq, b_iref = _iref2iseq_set(b_cigar, iref - b_pos)
+    if b_ret < 0:
+        return False
+
+    amul, bmul = (1, 0) if _name_parity(a.query_name) else (0, 1)
+    while True:
+        while a_ret >= 0 and a_iref >= 0 and a_iref < iref - a_pos:
+            a_ret, a_k, a_icig, a_iseq, a_iref = _iref2iseq_next(a_cigar, a_k, a_icig, a_iseq, a_iref)
+        if a_ret < 0:
+            break
+        while b_ret >= 0 and b_iref >= 0 and b_iref < iref - b_pos:
+            b_ret, b_k, b_icig, b_iseq, b_iref = _iref2iseq_next(b_cigar, b_k, b_icig, b_iseq, b_iref)
+        if b_ret < 0:
+            break
+
+        iref = max(iref, a_iref + a_pos, b_iref + b_pos) + 1
+
+        if a_iref + a_pos != b_iref + b_pos:
+            if a_iref + a_pos < b_iref + b_pos and b_k > 0 and b_cigar[b_k - 1][0] == _DEL:
+                while True:
+                    a_qual[a_iseq] = int(a_qual[a_iseq] * 0.8) if amul else 0
+                    a_ret, a_k, a_icig, a_iseq, a_iref = _iref2iseq_next(a_cigar, a_k, a_icig, a_iseq, a_iref)
+                    if a_ret < 0:
+                        return True
+                    if a_iref + a_pos >= b_iref + b_pos:
+                        break
+            elif a_k > 0 and a_cigar[a_k - 1][0] == _DEL:
+                while True:
+                    b_qual[b_iseq] = int(b_qual[b_iseq] * 0.8) if bmul else 0
+                    b_ret, b_k, b_icig, b_iseq, b_iref = _iref2iseq_next(b_cigar, b_k, b_icig, b_iseq, b_iref)
+                    if b_ret < 0:
+                        return True
+                    if b_iref + b_pos >= a_iref + a_pos:
+                        break
+            else:
+                continue
+
+        if a_iseq >= a_len or b_iseq >= b_len:
+            return True
+
+        if a_seq[a_iseq] == b_seq[b_iseq]:
+            qual = min(a_qual[a_iseq] + b_qual[b_iseq], 200)
+            a_qual[a_iseq] = amul * qual
+            b_qual[b_iseq] = bmul * qual
+        elif a_qual[a_iseq] > b_qual[b_iseq]:
+            a_qual[a_iseq] = int(0.8 * a_qual[a_iseq])
+            b_qual[b_iseq] = 0
+        elif a_qual[a_iseq] < b_qual[b_iseq]:
+            b_qual[b_iseq] = int(0.8 * b_qual[b_iseq])
+            a_qual[a_iseq] = 0
+        else:
+            a_qual[a_iseq] = int(amul * 0.8 * a_qual[a_iseq])
+            b_qual[b_iseq] = int(bmul * 0.8 * b_qual[b_iseq])
+    return True
@@ -0,0 +1,230 @@
+"""In-memory reference access in front of a pyfaidx Fasta.
+
+The counting pass and the split-read rescue look up short reference slices for
+every qualifying read, in coordinate order.  Going to pyfaidx for each of them
+means a file seek, a read and newline stripping per call.  :class:`ReferenceCache`
+keeps decoded sequence in memory instead: a contig that fits into the memory
+budget is loaded whole, a larger one through a window that slides along with the
+scan.  A scan of target regions never loads whole contigs: each lookup loads the
+padded target region it falls in, or a window if it falls outside the targets
+or the region is longer than a window.  Contigs, regions and windows share one
+budget and are evicted least recently used first.
+
+The cache is a drop-in replacement for the Fasta object:
+``reference[chrom][start:end].seq`` returns the same string as pyfaidx does
+(with ``sequence_always_upper=True``, default ``strict_bounds`` and no
+``default_seq``), including its clamping at the contig end.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from pyfaidx import FetchError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from pyfaidx import Fasta
+
+__all__ = ["DEFAULT_REFERENCE_CACHE_BYTES", "DEFAULT_REFERENCE_WINDOW", "ReferenceCache"]
+
+DEFAULT_REFERENCE_CACHE_BYTES = 512 * 1024 * 1024
+DEFAULT_REFERENCE_WINDOW = 1_000_000
+
+# bases loaded on either side of a target region, for reads and rescued
+# alignments reaching past its ends
+_REGION_PADDING = 10_000
+
+
+class ReferenceCache:
+    """LRU cache of decoded reference sequence, indexed like a pyfaidx Fasta.
+
+    Args:
+        genome_fasta: Reference genome Fasta object the sequence is read from.
+        max_bytes: Memory budget of the cached sequence, in bases (one byte each).
+        window_size: Length of the window loaded for contigs longer than the
+            budget.
+        regions: ``(chrom, start, end)`` target regions of the scan, 0-based and
+            half-open, or None for a whole-genome scan.  When given, even an
+            empty list, contigs are never loaded whole.
+
+    Attributes:
+        hits: Number of lookups answered from memory.
+        misses: Number of lookups that had to read from the FASTA file.
+        evictions: Number of contigs or windows dropped to stay within budget.
+    """
+
+    def __init__(
+        self,
+        genome_fasta: Fasta,
+        max_bytes: int = DEFAULT_REFERENCE_CACHE_BYTES,
+        window_size: int = DEFAULT_REFERENCE_WINDOW,
+        regions: Iterable[tuple[str, int, int]] | None = None,
+    ) -> None:
+        if max_bytes < 1 or window_size < 1:
+            msg = f"max_bytes and window_size must be positive, got {max_bytes} and {window_size}"
+            raise ValueError(msg)
+        self.genome_fasta = genome_fasta
+        self.max_bytes = max_bytes
+        self.window_size = window_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # chrom -> (window start, window sequence), most recently used last
+        self._blocks: OrderedDict[str, tuple[int, str]] = OrderedDict()
+        self._cached_bytes = 0
+        self._contigs: dict[str, _CachedContig] = {}
+        # chrom -> (starts, ends) of the merged, padded target regions
+        self._regions: dict[str, tuple[list[int], list[int]]] | None = None
+        if regions is not None:
+            self._regions = {}
+            for chrom, start, end in sorted(regions):
+                starts, ends = self._regions.setdefault(chrom, ([], []))
+                padded_start, padded_end = max(0, start - _REGION_PADDING), end + _REGION_PADDING
+                if ends and padded_start <= ends[-1]:
+                    ends[-1] = max(ends[-1], padded_end)
+                else:
+                    starts.append(padded_start)
+                    ends.append(padded_end)
+
+    def __getitem__(self, chrom: str) -> _CachedContig:
+        contig = self._contigs.get(chrom)
+        if contig is None:
+            record = self.genome_fasta[chrom]
+            contig = self._contigs[chrom] = _CachedContig(self, chrom, len(record))
+        return contig
+
+    def __contains__(self, chrom: str) -> bool:
+        return chrom in self.genome_fasta
+
+    def keys(self):
+        """Contig names of the reference."""
+        return self.genome_fasta.keys()
+
+    def fetch(self, chrom: str, start: int, end: int) -> str:
+        """Return the reference bases of ``[start, end)`` on ``chrom``.
+
+        Args:
+            chrom: Contig name.
+            start: 0-based start, at least 0.
+            end: 0-based exclusive end; clamped to the contig length.
+
+        Returns:
+            str: Upper-case sequence, empty when the interval is empty.
+        """
+        length = len(self[chrom])
+        end = min(end, length)
+        if end <= start:
+            return ""
+
+        block = self._blocks.get(chrom)
+        if block is not None:
+            block_start, block_seq = block
+            if block_start <= start and end <= block_start + len(block_seq):
+                self.hits += 1
+                self._blocks.move_to_end(chrom)
+                return block_seq[start - block_start : end - block_start]
+
+        self.misses += 1
+        block_start, block_seq = self._load(chrom, start, end, length)
+        return block_seq[start - block_start : end - block_start]
+
+    def stats(self) -> str:
+        """One-line summary of the cache counters."""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate), "
+            f"{self.evictions} evictions, {self._cached_bytes} bases cached"
+        )
+
+    def _load(self, chrom: str, start: int, end: int, length: int) -> tuple[int, str]:
+        """Read the contig, its target region or a window around ``[start, end)`` into the cache."""
+        region = self._region(chrom, start)
+        if self._regions is None and length <= self.max_bytes:
+            block_start, block_end = 0, length
+        elif region is not None and region[1] - region[0] <= self.window_size:
+            block_start, block_end = min(region[0], start), min(length, max(region[1], end))
+        else:
+            # the scan moves forward: keep a little behind and most ahead
+            block_start = max(0, start - self.window_size // 8)
+            block_end = min(length, max(end, block_start + self.window_size))
+
+        old = self._blocks.pop(chrom, None)
+        if old is not None:
+            self._cached_bytes -= len(old[1])
+        size = block_end - block_start
+        while self._blocks and self._cached_bytes + size > self.max_bytes:
+            _, (_, evicted) = self._blocks.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+            self.evictions += 1
+
+        block_seq = self.genome_fasta[chrom][block_start:block_end].seq
+        self._blocks[chrom] = (block_start, block_seq)
+        self._cached_bytes += len(block_seq)
+        return block_start, block_seq
+
+    def _region(self, chrom: str, start: int) -> tuple[int, int] | None:
+        """The padded target region holding ``start``, if any."""
+        if self._regions is None or chrom not in self._regions:
+            return None
+        starts, ends = self._regions[chrom]
+        i = bisect_right(starts, start) - 1
+        if i >= 0 and start < ends[i]:
+            return starts[i], ends[i]
+        return None
+
+
+class _CachedContig:
+    """Contig view of a :class:`ReferenceCache`, sliced like a pyfaidx FastaRecord."""
+
+    __slots__ = ("_cache", "_length", "name")
+
+    def __init__(self, cache: ReferenceCache, name: str, length: int) -> None:
+        self._cache = cache
+        self._length = length
+        self.name = name
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, n: slice | int) -> _Sequence:
+        # index arithmetic of pyfaidx.FastaRecord.__getitem__
+        if isinstance(n, slice):
+            start = 0 if n.start is None else n.start
+            stop = self._length if n.stop is None else n.stop
+            if stop < 0:
+                stop += self._length
+            if start < 0:
+                start += self._length
+            step = n.step
+        else:
+            start = n + self._length if n < 0 else n
+            stop = start + 1
+            step = None
+        if start < 0:
+            msg = "Requested start coordinate must be greater than 1."
+            raise FetchError(msg)
+        seq = self._cache.fetch(self.name, start, stop)
+        return _Sequence(seq if step is None else seq[::step])
+
+    def __repr__(self) -> str:
+        return f'_CachedContig("{self.name}")'
+
+
+class _Sequence:
+    """Result of a slice; exposes the bases as ``seq`` like pyfaidx.Sequence."""
+
+    __slots__ = ("seq",)
+
+    def __init__(self, seq: str) -> None:
+        self.seq = seq
+
+    def __str__(self) -> str:
+        return self.seq
+
+    def __len__(self) -> int:
+        return len(self.seq)
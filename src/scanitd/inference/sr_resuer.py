@@ -2,46 +2,169 @@
 
 Uses Smith-Waterman local alignment (ssw-py) to rescue soft-clipped reads
 that support a TDUP event but lack an SA tag, improving allele frequency estimates.
+
+Identical soft-clips (PCR duplicates, amplicon reads) are aligned once per
+breakpoint and counted with their multiplicity, and a :class:`RescueAligner`
+keeps the verdicts of a scan so TDUPs sharing a breakpoint and reference window
+reuse them.
 """
 
 from __future__ import annotations
 
+from operator import ne
 from typing import TYPE_CHECKING
 
+import numpy as np
 from ssw import AlignmentMgr
 
 from scanitd.base import MappingMode
 
+from .catalog import SoftclipCatalog
+
 if TYPE_CHECKING:
     from pyfaidx import Fasta
 
 __all__ = [
+    "RescueAligner",
+    "prefilter_rescue",
     "update_tdup_ao",
 ]
 
+# one aligner per process, created on first use
+_ALIGN_MGR: AlignmentMgr | None = None
+
+
+def _shared_align_mgr() -> AlignmentMgr:
+    global _ALIGN_MGR  # noqa: PLW0603
+    if _ALIGN_MGR is None:
+        _ALIGN_MGR = AlignmentMgr(
+            match_score=2,
+            mismatch_penalty=2,
+        )
+    return _ALIGN_MGR
+
+
+class RescueAligner:
+    """Cache of split-read rescue verdicts for one scan.
+
+    Verdicts of :func:`alignment_operation` are keyed by query, reference window,
+    read mode and mismatch cutoff.  A query is first offered to
+    :func:`prefilter_rescue`; only the queries it cannot decide are aligned, with
+    one ``ssw.AlignmentMgr`` shared by all instances of a process.
+
+    Attributes:
+        hits: Number of verdicts answered from the cache.
+        misses: Number of verdicts computed.
+        prefilter_accepted: Verdicts decided as exact anchored matches.
+        prefilter_rejected: Verdicts decided by a mismatching anchor base.
+        aligned: Verdicts that needed a Smith-Waterman alignment.
+    """
+
+    def __init__(self) -> None:
+        self.align_mgr = _shared_align_mgr()
+        self.verdicts: dict[tuple[str, str, MappingMode, int], bool] = {}
+        self.hits = 0
+        self.misses = 0
+        self.prefilter_accepted = 0
+        self.prefilter_rejected = 0
+        self.aligned = 0
+
+    def supports(self, query_seq: str, reference_seq: str, read_mode: MappingMode, mismatches_cutoff: int) -> bool:
+        """Cached :func:`alignment_operation` of ``query_seq`` against ``reference_seq``."""
+        key = (query_seq, reference_seq, read_mode, mismatches_cutoff)
+        verdict = self.verdicts.get(key)
+        if verdict is not None:
+            self.hits += 1
+            return verdict
+
+        self.misses += 1
+        verdict = prefilter_rescue(query_seq, reference_seq, read_mode, mismatches_cutoff)
+        if verdict is None:
+            self.aligned += 1
+            verdict = alignment_operation(self.align_mgr, query_seq, reference_seq, read_mode, mismatches_cutoff)
+        elif verdict:
+            self.prefilter_accepted += 1
+        else:
+            self.prefilter_rejected += 1
+        self.verdicts[key] = verdict
+        return verdict
+
+    def stats(self) -> str:
+        """One-line summary of how the rescue queries were resolved."""
+        return (
+            f"{self.hits} cached, {self.prefilter_accepted} exact matches, "
+            f"{self.prefilter_rejected} anchor-base rejects, {self.aligned} aligned"
+        )
+
+
+_BASES = frozenset("ACGT")
+
+
+def prefilter_rescue(query_seq: str, reference_seq: str, read_mode: MappingMode, mismatches_cutoff: int) -> bool | None:
+    """Decide the verdict of :func:`alignment_operation` without aligning, where possible.
+
+    An optimal local alignment starts and ends with a match, because trimming a
+    mismatch or gap raises the score.  So if the anchor bases differ (the last
+    bases in SM mode, the first in MS mode), the alignment cannot be anchored and
+    the query is rejected.  A query that occurs exactly once in the reference,
+    at the anchored end, is accepted: nothing else reaches the score of a full
+    exact match.  Only upper-case A, C, G and T query bases are decided, since
+    ssw scores other symbols differently.
+
+    Args:
+        query_seq: Softclipped read sequence.
+        reference_seq: Reference sequence spanning the expected duplicated region.
+        read_mode: MappingMode indicating which end of the alignment must be anchored.
+        mismatches_cutoff: Maximum allowed mismatches (SNVs + indels).
+
+    Returns:
+        bool | None: The verdict, or None if a Smith-Waterman alignment is needed.
+    """
+    if not query_seq or not reference_seq:
+        return None
+    if read_mode == MappingMode.SM:
+        query_base, reference_base = query_seq[-1], reference_seq[-1]
+        exact_at_anchor = len(query_seq) <= len(reference_seq) and reference_seq.find(query_seq) == len(reference_seq) - len(query_seq)
+    else:
+        query_base, reference_base = query_seq[0], reference_seq[0]
+        exact_at_anchor = reference_seq.startswith(query_seq) and reference_seq.find(query_seq, 1) == -1
+    if query_base != reference_base:
+        if query_base in _BASES and reference_base in _BASES:
+            return False
+        return None
+    # ssw aligns case-insensitively but the mismatch count is case-sensitive
+    if exact_at_anchor and mismatches_cutoff >= 0 and _BASES.issuperset(query_seq) and reference_seq.isupper():
+        return True
+    return None
+
 
 def update_tdup_ao(
     tdup_id: tuple[str, int, int, str],
     original_ao: int,
     genome_fasta: Fasta,
-    to_be_rescued_sequences: dict,
+    to_be_rescued_sequences: SoftclipCatalog | dict,
     mismatches_cutoff: int = 5,
+    aligner: RescueAligner | None = None,
 ) -> int:
     """Update the allele observation count for one TDUP event by rescuing soft-clipped reads.
 
     For both SM and MS breakpoint positions, collects softclipped sequences that
     could not be anchored to a TDUP via an SA tag, aligns them against the
     expected duplicated reference sequence, and counts those passing the mismatch
-    threshold as additional supporting reads.
+    threshold as additional supporting reads.  Identical softclipped sequences
+    are aligned once and counted with their multiplicity.
 
     Args:
         tdup_id: 5-tuple of (chrom, ref_start, tdup_size, tdup_seq, MicroRegion)
             uniquely identifying the TDUP event.
         original_ao: Original SA-tag-derived allele observation count.
         genome_fasta: Reference genome Fasta object for sequence extraction.
-        to_be_rescued_sequences: Dict mapping (chrom, position, MappingMode) to
-            lists of softclipped sequences to attempt rescue on.
+        to_be_rescued_sequences: SoftclipCatalog of the softclipped sequences
+            to attempt rescue on, keyed by (chrom, position, MappingMode), or a
+            dict mapping those keys to lists or Counters of sequences.
         mismatches_cutoff: Maximum mismatches allowed in a rescue alignment (default: 5).
+        aligner: RescueAligner whose verdicts are shared with other TDUPs of the
+            scan; a fresh one is used when None.
 
     Returns:
         int: Updated allele observation count (original_ao + rescued_ao).
@@ -49,10 +172,10 @@ def update_tdup_ao(
     tdup_chrm, tdup_ref_start, tdup_size, _tdup_seq, break_point_region = tdup_id
     tdup_ref_end = tdup_ref_start + tdup_size
 
-    align_mgr = AlignmentMgr(
-        match_score=2,
-        mismatch_penalty=2,
-    )
+    if aligner is None:
+        aligner = RescueAligner()
+    if not isinstance(to_be_rescued_sequences, SoftclipCatalog):
+        to_be_rescued_sequences = SoftclipCatalog.from_mapping(to_be_rescued_sequences)
 
     rescued_ao = 0
     # SM, tdup_ref_start as breakpoint
@@ -60,8 +183,7 @@ def update_tdup_ao(
     rescued_read_mode = MappingMode.SM
     possible_rescued_id = tdup_chrm, tdup_ref_start, rescued_read_mode
 
-    query_sequences = to_be_rescued_sequences.get(possible_rescued_id)
-    if query_sequences:
+    if possible_rescued_id in to_be_rescued_sequences:
         __ref_seq_from_genome_partial = genome_fasta[tdup_chrm][tdup_ref_start - tdup_size : tdup_ref_end].seq
         if break_point_region.micro_type == "microinsertion":
             ref_seq_from_genome = __ref_seq_from_genome_partial + break_point_region.sequence
@@ -70,23 +192,16 @@ def update_tdup_ao(
         else:
             ref_seq_from_genome = __ref_seq_from_genome_partial
 
-        for query_seq in query_sequences:
-            if alignment_operation(
-                align_mgr,
-                query_seq,
-                ref_seq_from_genome,
-                rescued_read_mode,
-                mismatches_cutoff,
-            ):
-                rescued_ao += 1
+        for query_seq, multiplicity in to_be_rescued_sequences.clips(possible_rescued_id):
+            if aligner.supports(query_seq, ref_seq_from_genome, rescued_read_mode, mismatches_cutoff):
+                rescued_ao += multiplicity
 
     # MS, tdup_ref_end as breakpoint
 
     rescued_read_mode = MappingMode.MS
     possible_rescued_id = tdup_chrm, tdup_ref_end, rescued_read_mode
 
-    query_sequences = to_be_rescued_sequences.get(possible_rescued_id)
-    if query_sequences:
+    if possible_rescued_id in to_be_rescued_sequences:
         __ref_seq_from_genome_partial = genome_fasta[tdup_chrm][tdup_ref_start : tdup_ref_end + tdup_size].seq
         if break_point_region.micro_type == "microinsertion":
             ref_seq_from_genome = break_point_region.sequence + __ref_seq_from_genome_partial
@@ -95,15 +210,9 @@ def update_tdup_ao(
         else:
             ref_seq_from_genome = __ref_seq_from_genome_partial
 
-        for query_seq in query_sequences:
-            if alignment_operation(
-                align_mgr,
-                query_seq,
-                ref_seq_from_genome,
-                rescued_read_mode,
-                mismatches_cutoff,
-            ):
-                rescued_ao += 1
+        for query_seq, multiplicity in to_be_rescued_sequences.clips(possible_rescued_id):
+            if aligner.supports(query_seq, ref_seq_from_genome, rescued_read_mode, mismatches_cutoff):
+                rescued_ao += multiplicity
 
     return original_ao + rescued_ao
 
@@ -144,6 +253,14 @@ def alignment_operation(
     reference_end = alignment.reference_end
     query_start = alignment.read_start
     query_end = alignment.read_end
+
+    # anchoring is cheaper to check than the mismatches
+    if not (
+        (read_mode == MappingMode.SM and reference_end == len(reference_seq) - 1 and query_end == len(query_seq) - 1)
+        or (read_mode == MappingMode.MS and reference_start == 0 and query_start == 0)
+    ):
+        return False
+
     variants = calculate_variants(
         alignment.cigar_pair_list,
         reference_seq,
@@ -152,12 +269,13 @@ def alignment_operation(
         reference_end,
         query_start,
         query_end,
+        mismatches_cutoff,
     )
+    return variants["mismatches"] <= mismatches_cutoff
 
-    if variants["mismatches"] > mismatches_cutoff:
-        return False
 
-    return (read_mode == MappingMode.SM and reference_end == len(reference_seq) - 1 and query_end == len(query_seq) - 1) or (read_mode == MappingMode.MS and reference_start == 0 and query_start == 0)
+# M blocks at least this long are compared with numpy, shorter ones base by base in C
+_NUMPY_BLOCK_LENGTH = 96
 
 
 def calculate_variants(
@@ -168,18 +286,25 @@ def calculate_variants(
     reference_end: int,
     query_start: int,
     query_end: int,
+    mismatches_cutoff: int | None = None,
 ):
     """
     Calculate the number of indels, deletions, and SNVs from CIGAR string and sequences.
 
+    Each ``M`` block is compared as a whole: equal slices cost one string
+    comparison, long blocks one NumPy comparison.  With ``mismatches_cutoff``
+    the walk stops after the first operation that pushes the mismatches above
+    the cutoff, so the counts are partial but still exceed it.
+
     Parameters:
-        cigar_string (str): CIGAR string (e.g., "9M1I5M")
-        read_seq (str): The read sequence
-        ref_seq (str): The reference sequence
-        ref_start (int): Start position in reference (0-based)
-        ref_end (int): End position in reference (0-based)
-        read_start (int): Start position in read (0-based)
-        read_end (int): End position in read (0-based)
+        cigar_pair_list (list): ``(length, op)`` pairs of the alignment
+        reference_seq (str): The reference sequence
+        query_seq (str): The read sequence
+        reference_start (int): Start position in reference (0-based)
+        reference_end (int): End position in reference (0-based)
+        query_start (int): Start position in read (0-based)
+        query_end (int): End position in read (0-based)
+        mismatches_cutoff (int | None): Stop counting once mismatches exceed it
 
     Returns:
         dict: Dictionary containing counts of indels, deletions, and SNVs, and details
@@ -198,14 +323,15 @@ def calculate_variants(
 
     for length, op in cigar_pair_list:
         if op == "M":  # Match/mismatch
-            # Compare sequences to find SNVs
-            for i in range(length):
-                if read_pos + i < query_end and ref_pos + i < reference_end:
-                    read_base = query_seq[read_pos + i]
-                    ref_base = reference_seq[ref_pos + i]
-                    if read_base != ref_base:
-                        variants["snvs"] += 1
-                        variants["mismatches"] += 1
+            # bases before query_end and reference_end (both inclusive) are compared
+            compared = min(length, query_end - read_pos, reference_end - ref_pos)
+            if compared > 0:
+                read_bases = query_seq[read_pos : read_pos + compared]
+                ref_bases = reference_seq[ref_pos : ref_pos + compared]
+                if read_bases != ref_bases:
+                    snvs = _count_mismatched_bases(read_bases, ref_bases)
+                    variants["snvs"] += snvs
+                    variants["mismatches"] += snvs
             read_pos += length
             ref_pos += length
 
@@ -219,4 +345,17 @@ def calculate_variants(
             variants["mismatches"] += length
             ref_pos += length
 
+        else:
+            continue
+
+        if mismatches_cutoff is not None and variants["mismatches"] > mismatches_cutoff:
+            break
+
     return variants
+
+
+def _count_mismatched_bases(read_bases: str, ref_bases: str) -> int:
+    """Number of positions at which two equal-length sequences differ."""
+    if len(read_bases) < _NUMPY_BLOCK_LENGTH or not (read_bases.isascii() and ref_bases.isascii()):
+        return sum(map(ne, read_bases, ref_bases))
+    return int(np.count_nonzero(np.frombuffer(read_bases.encode(), dtype=np.uint8) != np.frombuffer(ref_bases.encode(), dtype=np.uint8)))
@@ -0,0 +1,208 @@
+"""Checkpointed scan state, so the VCF can be refiltered without rescanning.
+
+:func:`~scanitd.inference.main.scan_itd` spends its time on the BAM passes and
+the split-read rescue; the ``AO``/``DP``/``VAF`` thresholds are only applied by
+:func:`~scanitd.inference.helper.write_events_to_vcf`.  The unfiltered events
+carry everything those thresholds read: the original and rescued observation
+counts, the depth and the alleles of every TDUP and insertion.
+
+:func:`save_scan_state` writes them to a state directory, or
+:func:`checkpoint_events` as they stream to the VCF writer:
+
+* ``manifest.json``: format version, ScanITD version, the BAM header, the scan
+  parameters and one entry per region file;
+* one ``events-NNNNN.bin`` file per contig, a zlib-compressed run of packed
+  records (see :func:`_pack_event`).
+
+:func:`load_scan_state` reads them back as the same events, in the same order,
+into an :class:`~scanitd.base.EventTable` that ``scanitd refilter`` filters with
+vectorized masks.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from collections import deque
+from itertools import groupby
+from operator import attrgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from scanitd import __version__
+from scanitd.base import Event, EventTable, MicroRegion
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from scanitd.mtype import LoggerType
+
+__all__ = ["MANIFEST_NAME", "STATE_FORMAT_VERSION", "ScanState", "checkpoint_events", "load_scan_state", "save_scan_state"]
+
+MANIFEST_NAME = "manifest.json"
+STATE_FORMAT_VERSION = 1
+
+_EVENT_TYPES = ("TDUP", "INS")
+# event type, ref_start, event_size, oao, ao, dp
+_RECORD = struct.Struct("<BqqIII")
+_LENGTH = struct.Struct("<I")
+_NONE = 0xFFFFFFFF
+
+
+class ScanState(NamedTuple):
+    """Events and context of a scan, as loaded by :func:`load_scan_state`."""
+
+    events: EventTable
+    bam_header: dict[str, Any]
+    parameters: dict[str, Any]
+
+
+def _pack_str(value: str | None) -> bytes:
+    if value is None:
+        return _LENGTH.pack(_NONE)
+    data = value.encode()
+    return _LENGTH.pack(len(data)) + data
+
+
+def _unpack_str(buffer: bytes, offset: int) -> tuple[str | None, int]:
+    (length,) = _LENGTH.unpack_from(buffer, offset)
+    offset += _LENGTH.size
+    if length == _NONE:
+        return None, offset
+    return buffer[offset : offset + length].decode(), offset + length
+
+
+def _pack_event(event: Event) -> bytes:
+    """One record: fixed-width counts and coordinates, then length-prefixed strings."""
+    return b"".join(
+        (
+            _RECORD.pack(_EVENT_TYPES.index(event.event_type), event.ref_start, event.event_size, event.oao, event.ao, event.dp),
+            _pack_str(event.event_sequence),
+            _pack_str(event.ref_allele),
+            _pack_str(event.alt_allele),
+            _pack_str(None if event.break_point_region is None else event.break_point_region.prefixed()),
+        ),
+    )
+
+
+def _unpack_events(chrom: str, buffer: bytes) -> list[Event]:
+    events = []
+    offset = 0
+    while offset < len(buffer):
+        event_type, ref_start, event_size, oao, ao, dp = _RECORD.unpack_from(buffer, offset)
+        offset += _RECORD.size
+        event_sequence, offset = _unpack_str(buffer, offset)
+        ref_allele, offset = _unpack_str(buffer, offset)
+        alt_allele, offset = _unpack_str(buffer, offset)
+        region, offset = _unpack_str(buffer, offset)
+        event_id = (chrom, ref_start, event_size, event_sequence, None if region is None else MicroRegion(region))
+        events.append(Event.new(_EVENT_TYPES[event_type], event_id, oao, ao, dp, ref_allele, alt_allele))
+    return events
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
+
+
+def checkpoint_events(
+    state_dir: Path,
+    bam_header: dict[str, Any],
+    events: Iterable[Event],
+    parameters: dict[str, Any],
+    logger: LoggerType,
+) -> Iterator[Event]:
+    """Pass ``events`` through, saving them to ``state_dir`` contig by contig.
+
+    A contig's file is written once its last event has passed, and the manifest
+    once the stream is exhausted, so a state directory whose manifest loads is
+    complete.  An earlier state in the same directory is removed first.
+
+    Args:
+        state_dir: Directory of the state; created if missing.
+        bam_header: BAM header dict of the scan.
+        events: Events of the scan, e.g. from :func:`~scanitd.inference.main.iter_events`.
+        parameters: Scan parameters recorded in the manifest (JSON-serializable).
+        logger: Logger instance implementing LoggerType.
+
+    Yields:
+        Event: The events of ``events``, unchanged.
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    (state_dir / MANIFEST_NAME).unlink(missing_ok=True)
+    for stale in state_dir.glob("events-*.bin"):
+        stale.unlink()
+
+    regions = []
+    # events come sorted by contig: one file per run of a contig
+    for index, (chrom, contig_events) in enumerate(groupby(events, key=attrgetter("chrom"))):
+        records = []
+        for event in contig_events:
+            records.append(_pack_event(event))
+            yield event
+        file_name = f"events-{index:05d}.bin"
+        _write_atomically(state_dir / file_name, zlib.compress(b"".join(records)))
+        regions.append({"contig": chrom, "file": file_name, "events": len(records)})
+
+    manifest = {
+        "format_version": STATE_FORMAT_VERSION,
+        "scanitd_version": __version__,
+        "parameters": parameters,
+        "bam_header": bam_header,
+        "regions": regions,
+    }
+    _write_atomically(state_dir / MANIFEST_NAME, json.dumps(manifest, indent=1).encode())
+    logger.info(f"Saved {sum(region['events'] for region in regions)} events of {len(regions)} contigs to {state_dir}")
+
+
+def save_scan_state(
+    state_dir: Path,
+    bam_header: dict[str, Any],
+    events: Iterable[Event],
+    parameters: dict[str, Any],
+    logger: LoggerType,
+) -> None:
+    """Write the unfiltered events of a scan to ``state_dir``.
+
+    Args:
+        state_dir: Directory of the state; created if missing.
+        bam_header: BAM header dict, as returned by ``scan_itd``.
+        events: Events of the scan, as returned by ``scan_itd``.
+        parameters: Scan parameters recorded in the manifest (JSON-serializable).
+        logger: Logger instance implementing LoggerType.
+    """
+    deque(checkpoint_events(state_dir, bam_header, events, parameters, logger), maxlen=0)
+
+
+def load_scan_state(state_dir: Path) -> ScanState:
+    """Read the events, BAM header and scan parameters saved by :func:`save_scan_state`.
+
+    Args:
+        state_dir: Directory of the state.
+
+    Returns:
+        ScanState: The events in the order they were saved, as an EventTable
+            over the BAM header's contigs, the BAM header and the scan parameters.
+
+    Raises:
+        ValueError: If ``state_dir`` holds no state, or a state of another
+            format version.
+    """
+    manifest_path = Path(state_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        msg = f"No scan state in {state_dir}: {MANIFEST_NAME} is missing"
+        raise ValueError(msg)
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("format_version") != STATE_FORMAT_VERSION:
+        msg = f"Scan state in {state_dir} has format version {manifest.get('format_version')}, expected {STATE_FORMAT_VERSION}"
+        raise ValueError(msg)
+
+    events: list[Event] = []
+    for region in manifest["regions"]:
+        buffer = zlib.decompress((Path(state_dir) / region["file"]).read_bytes())
+        events.extend(_unpack_events(region["contig"], buffer))
+    contigs = [contig["SN"] for contig in manifest["bam_header"].get("SQ", [])]
+    return ScanState(EventTable.from_events(events, contigs), manifest["bam_header"], manifest["parameters"])
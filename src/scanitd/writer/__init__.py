@@ -1,6 +1,7 @@
 """VCF output writer package for ScanITD."""
 
-from .writer import Writer
+from .bgzf import BgzfWriter
 from .vcf_writer import VCFWriter
+from .writer import Writer
 
-__all__ = ["VCFWriter", "Writer"]
+__all__ = ["BgzfWriter", "VCFWriter", "Writer"]
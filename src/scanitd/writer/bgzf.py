@@ -0,0 +1,147 @@
+"""BGZF text output, optionally compressed on worker threads and tabix-indexed.
+
+BGZF, the blocked gzip of htslib, is a series of gzip members of at most 64 KiB
+of input each, followed by an empty end-of-file block.  Blocks are compressed
+independently, so :class:`BgzfWriter` hands them to a thread pool when asked to
+(``zlib`` releases the GIL while compressing) and writes them back in order.
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pysam
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from typing_extensions import Self
+
+__all__ = ["BGZF_BLOCK_SIZE", "BGZF_EOF", "BGZF_MAX_BLOCK_SIZE", "BgzfWriter", "compress_block"]
+
+#: Uncompressed bytes per block, as htslib's ``BGZF_BLOCK_SIZE``.
+BGZF_BLOCK_SIZE = 0xFF00
+#: Largest BGZF block, header and footer included: its size field is 16 bits.
+BGZF_MAX_BLOCK_SIZE = 0x10000
+#: The empty block closing every BGZF file.
+BGZF_EOF = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+# gzip member header with the BC extra field: ID1 ID2 CM FLG MTIME XFL OS XLEN SI1 SI2 SLEN BSIZE
+_HEADER = struct.Struct("<4BI2BH2BHH")
+_FOOTER = struct.Struct("<II")
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    """BGZF block(s) holding ``data``.
+
+    ``data`` of at most :data:`BGZF_BLOCK_SIZE` bytes always fits one block.
+    Should the compressed block still exceed :data:`BGZF_MAX_BLOCK_SIZE`, e.g.
+    for longer incompressible input, the input is split in halves compressed
+    as blocks of their own, as htslib does.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    block_size = _HEADER.size + len(cdata) + _FOOTER.size
+    if block_size > BGZF_MAX_BLOCK_SIZE:
+        half = len(data) // 2
+        return compress_block(data[:half], level) + compress_block(data[half:], level)
+    return _HEADER.pack(31, 139, 8, 4, 0, 0, 255, 6, 66, 67, 2, block_size - 1) + cdata + _FOOTER.pack(zlib.crc32(data), len(data))
+
+
+class BgzfWriter:
+    """Write-only text file compressed to BGZF.
+
+    Args:
+        file_path: Path of the output file.
+        threads: Number of threads compressing blocks; 1 compresses in the
+            writing thread.
+        tabix_preset: ``pysam.tabix_index`` preset (e.g. ``vcf``) of a tabix
+            index built when the file is closed, or None for no index.
+        level: zlib compression level.
+    """
+
+    def __init__(self, file_path: Path, threads: int = 1, tabix_preset: str | None = None, level: int = 6) -> None:
+        """Open ``file_path`` for writing."""
+        if threads < 1:
+            msg = f"threads must be positive, got {threads}"
+            raise ValueError(msg)
+        self.file_path = Path(file_path)
+        self.tabix_preset = tabix_preset
+        self.level = level
+        self.threads = threads
+        self._raw = self.file_path.open("wb")
+        self._pending = bytearray()
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix="bgzf") if threads > 1 else None
+        self._blocks: deque[Future] = deque()
+        self.closed = False
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, text: str) -> int:
+        """Buffer ``text``, compressing every full block."""
+        self._pending += text.encode()
+        if len(self._pending) >= BGZF_BLOCK_SIZE:
+            view = memoryview(self._pending)
+            full = len(self._pending) - len(self._pending) % BGZF_BLOCK_SIZE
+            for start in range(0, full, BGZF_BLOCK_SIZE):
+                self._submit(bytes(view[start : start + BGZF_BLOCK_SIZE]))
+            view.release()
+            del self._pending[:full]
+        return len(text)
+
+    def _submit(self, data: bytes) -> None:
+        if self._executor is None:
+            self._raw.write(compress_block(data, self.level))
+            return
+        self._blocks.append(self._executor.submit(compress_block, data, self.level))
+        # keep a bounded number of blocks in flight, written in submission order
+        while len(self._blocks) > 2 * self.threads:
+            self._raw.write(self._blocks.popleft().result())
+
+    def close(self) -> None:
+        """Compress the last block, write the EOF block and build the tabix index."""
+        if self.closed:
+            return
+        try:
+            if self._pending:
+                self._submit(bytes(self._pending))
+                self._pending.clear()
+            while self._blocks:
+                self._raw.write(self._blocks.popleft().result())
+            self._raw.write(BGZF_EOF)
+        finally:
+            self._raw.close()
+            if self._executor is not None:
+                self._executor.shutdown()
+            self.closed = True
+        if self.tabix_preset is not None:
+            pysam.tabix_index(str(self.file_path), preset=self.tabix_preset, force=True)
+
+    def abort(self) -> None:
+        """Close without the last block, the EOF block or the tabix index.
+
+        The file is left truncated, so readers checking for the EOF block
+        reject it.
+        """
+        if self.closed:
+            return
+        for block in self._blocks:
+            block.cancel()
+        self._blocks.clear()
+        self._pending.clear()
+        self._raw.close()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.closed = True
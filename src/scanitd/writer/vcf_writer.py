@@ -10,10 +10,14 @@ from loguru import logger
 
 from scanitd import __version__
 
+from .bgzf import BgzfWriter
 from .writer import Writer
 
 from scanitd.base import Event
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
 
 class VCFWriter(Writer):
     """Writer for VCF files.
@@ -42,6 +46,8 @@ class VCFWriter(Writer):
     """
 
     num_fields = 10
+    #: Bytes buffered before a plain-text VCF is written out.
+    buffer_size = 1 << 20
 
     reserved_info: ClassVar[dict[str, str]] = {
         "DP": "Integer",
@@ -85,16 +91,23 @@ class VCFWriter(Writer):
         self,
         file_path: str,
         bam_header: dict[str, Any],
+        threads: int = 1,
     ) -> None:
         """Initialize VCFWriter object.
 
+        A path ending in ``.gz`` (e.g. ``sample.vcf.gz``) is written as BGZF and
+        tabix-indexed (``.tbi``) when the file is closed.
+
         Args:
             file_path: Path to the output VCF file (stem used as sample name).
             bam_header: BAM header dict used to populate VCF contig lines and reference info.
+            threads: Number of threads compressing a BGZF output (default: 1).
         """
         super().__init__(file_path)
         self.bam_header = bam_header
-        self.sample_name: str = self.file_path.stem
+        self.compressed: bool = self.file_path.suffix == ".gz"
+        self.threads = threads
+        self.sample_name: str = self.file_path.with_suffix("").stem if self.compressed else self.file_path.stem
         self.event_id: int = 1
 
     @property
@@ -129,7 +142,10 @@ class VCFWriter(Writer):
         """
         if self.is_opened:
             logger.warning(f"{self.__class__.__name__}: File is already opened.")
-        self.io = self.file_path.open(mode)  # add asyncio support
+        if self.compressed:
+            self.io = BgzfWriter(self.file_path, threads=self.threads, tabix_preset="vcf")  # type: ignore
+        else:
+            self.io = self.file_path.open(mode, buffering=self.buffer_size)
         if hasattr(self, "write_header"):
             self.write_header()
         return self.io
@@ -141,6 +157,19 @@ class VCFWriter(Writer):
             self.io.close()  # type: ignore
             self.io = None
 
+    def discard(self) -> None:
+        """Close the file without completing it and remove it, with any tabix index."""
+        if self.io is None:
+            return
+        if isinstance(self.io, BgzfWriter):
+            self.io.abort()
+        else:
+            self.io.close()
+        self.io = None
+        self.file_path.unlink(missing_ok=True)
+        if self.compressed:
+            self.file_path.with_name(f"{self.file_path.name}.tbi").unlink(missing_ok=True)
+
     def write_line(self, line: str) -> None:
         """Write line to file."""
         if self.is_opened:
@@ -177,6 +206,39 @@ class VCFWriter(Writer):
         hop_vcf_feature = vcf_feature_transformer(_hop_vcf_feature, event_id)
         self.write_line(self.formatter(hop_vcf_feature))
 
+    def write_events(self, events: Iterable[Event]) -> int:
+        """Write Events to the VCF file in one write, numbered from ``event_id``.
+
+        Formats each record straight from the Event, with the same text as
+        :meth:`write_data` (see :func:`get_vcf_features_from_event` and
+        :func:`vcf_feature_transformer`), and advances ``event_id``.
+
+        Args:
+            events: Events to write, in output order.
+
+        Returns:
+            int: Number of records written.
+        """
+        records = []
+        event_id = self.event_id
+        for event in events:
+            sv_type = event.event_type
+            chrom = event.chrom
+            micro_type = event.break_point_region.micro_type  # type: ignore
+            micro_sequence = event.break_point_region.sequence  # type: ignore
+            records.append(
+                f"{chrom}\t{event.ref_start + 1}\t{event_id}\t{event.ref_allele}\t{event.alt_allele}\t.\t.\t"
+                f"SVTYPE={sv_type};OAO={event.oao};AO={event.ao};CHR2={chrom};END={event.end + 1};"
+                f"DP={event.dp};AF={event.af:.3g};SVLEN={event.event_size};"
+                f"INSSEQ={micro_sequence if micro_type == 'microinsertion' else '.'};"
+                f"HOMSEQ={micro_sequence if micro_type == 'microhomology' else '.'};"
+                f"SEQ={event.event_sequence if sv_type in {'TDUP', 'INS'} else '.'};SVMETHOD=ScanITD2\tGT\t0/1\n",
+            )
+            event_id += 1
+        self.write_line("".join(records))
+        self.event_id = event_id
+        return len(records)
+
     @property
     def header(self) -> str:
         """VCF header provides metadata describing the body of the file."""
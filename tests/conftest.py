@@ -66,3 +66,14 @@ def simple_interval():
 @pytest.fixture
 def two_exon_intervals():
     return Intervals([Interval(0, 10), Interval(20, 30)])
+
+
+# ---------------------------------------------------------------------------
+# Synthetic BAM / FASTA fixtures (end-to-end pipeline tests)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture(scope="session")
+def synthetic_sample(tmp_path_factory):
+    from .simulate import build_synthetic_sample
+
+    return build_synthetic_sample(tmp_path_factory.mktemp("synthetic"), seed=7, depth=60)
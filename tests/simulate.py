@@ -0,0 +1,316 @@
+"""Synthetic sample builder for end-to-end ScanITD tests and benchmarks.
+
+Builds a small random reference genome, plants tandem duplications and a novel
+insertion, simulates paired-end reads from reference and alternate haplotypes,
+and writes a coordinate-sorted, indexed BAM with BWA-style ``MC`` (mate CIGAR)
+tags and, on chimeric reads, ``SA`` tags.  Reads spanning a junction are represented either as CIGAR
+insertions, as split (primary + supplementary) alignments, or as plain
+soft-clipped alignments, so every detection strategy has something to find.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pysam
+
+__all__ = ["PlantedEvent", "SyntheticSample", "build_synthetic_sample"]
+
+BASES = "ACGT"
+
+
+@dataclass
+class PlantedEvent:
+    """One variant planted in the synthetic genome."""
+
+    chrom: str
+    start: int
+    end: int
+    kind: str = "TDUP"
+    micro_insertion: str = ""
+    inserted: str = ""
+    vaf: float = 0.4
+    split_fraction: float = 0.5
+
+
+@dataclass
+class SyntheticSample:
+    """Paths and metadata of a generated sample."""
+
+    bam: Path
+    fasta: Path
+    contigs: dict[str, int]
+    events: list[PlantedEvent] = field(default_factory=list)
+
+
+def _random_seq(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(BASES) for _ in range(length))
+
+
+def _mutate(rng: random.Random, seq: str, error_rate: float) -> str:
+    if error_rate <= 0:
+        return seq
+    chars = list(seq)
+    for i in range(len(chars)):
+        if rng.random() < error_rate:
+            chars[i] = rng.choice([b for b in BASES if b != chars[i]])
+    return "".join(chars)
+
+
+class _Haplotype:
+    """Alternate haplotype with a mapping back to reference coordinates."""
+
+    def __init__(self, chrom: str, ref: str, event: PlantedEvent | None) -> None:
+        self.chrom = chrom
+        self.event = event
+        if event is None:
+            self.seq = ref
+        elif event.kind == "TDUP":
+            s, e, mi = event.start, event.end, event.micro_insertion
+            self.seq = ref[:e] + mi + ref[s:e] + ref[e:]
+        else:
+            self.seq = ref[: event.start] + event.inserted + ref[event.start :]
+
+    def align(self, a: int, length: int, rng: random.Random):
+        """Return alignment records (pos, cigar, is_primary) for hap[a:a+length].
+
+        Returns a list of ``(ref_pos, cigar, sa_cigar)`` where the first entry is the
+        primary alignment and an optional second entry is the supplementary one.
+        """
+        ev = self.event
+        if ev is None:
+            return [(a, f"{length}M")]
+
+        if ev.kind == "TDUP":
+            junction = ev.end
+            novel = len(ev.micro_insertion)
+            size = ev.end - ev.start
+            resume = ev.start
+        else:
+            junction = ev.start
+            novel = len(ev.inserted)
+            size = 0
+            resume = ev.start
+
+        b = a + length
+        if b <= junction:
+            return [(a, f"{length}M")]
+        if a >= junction + novel:
+            return [(resume + (a - junction - novel), f"{length}M")]
+        if a >= junction:
+            # starts inside the novel sequence
+            x = junction + novel - a
+            return [(resume, f"{x}S{length - x}M")]
+
+        x = junction - a  # bases left of the junction
+        y = length - x - novel  # bases right of the novel sequence
+        if y <= 0:
+            return [(a, f"{x}M{length - x}S")]
+        gap = novel + size
+        if y > size and min(x, y - size) >= 15 and rng.random() >= ev.split_fraction:
+            # insertion-style alignment: left flank, duplicated copy as I, right flank
+            return [(a, f"{x}M{gap}I{y - size}M")]
+        if min(x, y) < 20:
+            # too short for a supplementary hit: soft-clip only
+            if y >= x:
+                return [(resume, f"{x + novel}S{y}M")]
+            return [(a, f"{x}M{length - x}S")]
+        if y >= x:
+            return [(resume, f"{x + novel}S{y}M"), (a, f"{x}M{length - x}S")]
+        return [(a, f"{x}M{length - x}S"), (resume, f"{x + novel}S{y}M")]
+
+
+def _nm(cigar: str) -> int:
+    total = 0
+    num = ""
+    for ch in cigar:
+        if ch.isdigit():
+            num += ch
+            continue
+        if ch in "ID":
+            total += int(num)
+        num = ""
+    return total
+
+
+def _hard_clip(cigar: str) -> str:
+    return cigar.replace("S", "H")
+
+
+def build_synthetic_sample(
+    out_dir: str | Path,
+    *,
+    seed: int = 7,
+    read_length: int = 100,
+    depth: int = 40,
+    contigs: dict[str, int] | None = None,
+    events: list[PlantedEvent] | None = None,
+    error_rate: float = 0.002,
+    duplicate_rate: float = 0.03,
+    low_mapq_rate: float = 0.02,
+    low_quality_rate: float = 0.05,
+    name: str = "sample",
+) -> SyntheticSample:
+    """Generate a reference FASTA and an indexed BAM with planted ITDs.
+
+    Args:
+        out_dir: Directory receiving ``<name>.fa`` and ``<name>.bam`` (plus indexes).
+        seed: Random seed; identical arguments give byte-identical output.
+        read_length: Length of every simulated read.
+        depth: Approximate fold coverage.
+        contigs: Contig name to length mapping (defaults to three small contigs).
+        events: Planted variants (defaults to three TDUPs and one novel insertion).
+        error_rate: Per-base substitution error rate.
+        duplicate_rate: Fraction of pairs duplicated with the duplicate flag set.
+        low_mapq_rate: Fraction of pairs written with MAPQ 5.
+        low_quality_rate: Fraction of reads whose first bases have quality 5.
+        name: File stem for the generated files.
+
+    Returns:
+        SyntheticSample describing the generated files.
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if contigs is None:
+        contigs = {"chr1": 6000, "chr2": 4500, "chr10": 2500}
+    if events is None:
+        events = [
+            PlantedEvent("chr1", 2000, 2060, vaf=0.4, split_fraction=0.6),
+            PlantedEvent("chr1", 4000, 4025, vaf=0.3, split_fraction=0.2),
+            PlantedEvent("chr2", 1500, 1530, micro_insertion="AC", vaf=0.5, split_fraction=0.8),
+            PlantedEvent("chr2", 3000, 3000, kind="INS", inserted="", vaf=0.5, split_fraction=0.0),
+            PlantedEvent("chr10", 1200, 1245, vaf=0.25, split_fraction=0.5),
+        ]
+
+    reference = {chrom: _random_seq(rng, length) for chrom, length in contigs.items()}
+    for ev in events:
+        if ev.kind == "INS" and not ev.inserted:
+            ev.inserted = _random_seq(rng, 24)
+
+    fasta = out_dir / f"{name}.fa"
+    with fasta.open("w") as fh:
+        for chrom, seq in reference.items():
+            fh.write(f">{chrom}\n")
+            for i in range(0, len(seq), 60):
+                fh.write(seq[i : i + 60] + "\n")
+    pysam.faidx(str(fasta))
+
+    header = {
+        "HD": {"VN": "1.6", "SO": "unsorted"},
+        "SQ": [{"SN": chrom, "LN": length} for chrom, length in contigs.items()],
+        "PG": [{"ID": "bwa", "PN": "bwa", "VN": "0.7.17", "CL": f"bwa mem {fasta.name} r1.fq r2.fq"}],
+    }
+    tids = {chrom: i for i, chrom in enumerate(contigs)}
+
+    unsorted = out_dir / f"{name}.unsorted.bam"
+    pair_id = 0
+    with pysam.AlignmentFile(str(unsorted), "wb", header=header) as out:
+
+        def make_segment(qname, chrom, pos, cigar, seq, quals, flag, mapq, tags):
+            seg = pysam.AlignedSegment(out.header)
+            seg.query_name = qname
+            seg.flag = flag
+            seg.reference_id = tids[chrom]
+            seg.reference_start = pos
+            seg.mapping_quality = mapq
+            seg.cigarstring = cigar
+            if "H" in cigar:
+                lead = int(cigar.split("H")[0]) if cigar.split("H")[0].isdigit() else 0
+                kept = sum(int(n) for n, op in _iter_cigar(cigar) if op in "MIS=X")
+                seq = seq[lead : lead + kept]
+                quals = quals[lead : lead + kept]
+            seg.query_sequence = seq
+            seg.query_qualities = pysam.qualitystring_to_array("".join(chr(q + 33) for q in quals))
+            seg.set_tags(tags)
+            return seg
+
+        def emit_read(qname, hap, a, strand, flag_base, mapq, mate, dup):
+            seq = _mutate(rng, hap.seq[a : a + read_length], error_rate)
+            quals = [rng.randint(20, 40) for _ in range(read_length)]
+            if rng.random() < low_quality_rate:
+                for i in range(5):
+                    quals[i] = 5
+            alignments = hap.align(a, read_length, rng)
+            flag = flag_base | (16 if strand == "-" else 0) | (1024 if dup else 0)
+            records = []
+            primary_pos, primary_cigar = alignments[0]
+            tags = [("NM", _nm(primary_cigar))]
+            if len(alignments) > 1:
+                sa_pos, sa_cigar = alignments[1]
+                sa_tag = f"{hap.chrom},{sa_pos + 1},{strand},{sa_cigar},{mapq},0;"
+                if rng.random() < 0.05:
+                    sa_tag += f"{hap.chrom},{sa_pos + 301},{strand},{sa_cigar},{mapq},0;"
+                tags.append(("SA", sa_tag))
+            records.append(make_segment(qname, hap.chrom, primary_pos, primary_cigar, seq, quals, flag, mapq, tags))
+            if len(alignments) > 1:
+                sa_pos, sa_cigar = alignments[1]
+                supp_tags = [
+                    ("NM", _nm(sa_cigar)),
+                    ("SA", f"{hap.chrom},{primary_pos + 1},{strand},{primary_cigar},{mapq},0;"),
+                ]
+                records.append(make_segment(qname, hap.chrom, sa_pos, _hard_clip(sa_cigar), seq, quals, flag | 2048, mapq, supp_tags))
+            return records
+
+        for chrom, ref in reference.items():
+            chrom_events = [ev for ev in events if ev.chrom == chrom]
+            haps = [(_Haplotype(chrom, ref, None), 1.0)]
+            n_pairs = depth * len(ref) // (2 * read_length)
+            for ev in chrom_events:
+                haps.append((_Haplotype(chrom, ref, ev), ev.vaf))
+
+            for _ in range(n_pairs):
+                # choose haplotype: alt reads only near their event
+                frag_len = rng.randint(160, 320)
+                hap = haps[0][0]
+                center = rng.randint(0, len(ref) - 1)
+                for alt_hap, vaf in haps[1:]:
+                    ev = alt_hap.event
+                    if abs(center - ev.end) < 400 and rng.random() < vaf:
+                        hap = alt_hap
+                        break
+                max_start = len(hap.seq) - frag_len
+                if max_start <= 0:
+                    continue
+                f_start = min(max(center - frag_len // 2, 0), max_start)
+                pair_id += 1
+                qname = f"{name}:{pair_id:07d}"
+                mapq = 5 if rng.random() < low_mapq_rate else 60
+                dup = rng.random() < duplicate_rate
+                r1_start = f_start
+                r2_start = f_start + frag_len - read_length
+                r1_strand, r2_strand = ("+", "-") if rng.random() < 0.5 else ("-", "+")
+                if r1_strand == "-":
+                    r1_start, r2_start = r2_start, r1_start
+                recs1 = emit_read(qname, hap, r1_start, r1_strand, 0x1 | 0x2 | 0x40, mapq, None, dup)
+                recs2 = emit_read(qname, hap, r2_start, r2_strand, 0x1 | 0x2 | 0x80, mapq, None, dup)
+                p1, p2 = recs1[0], recs2[0]
+                for rec, mate in ((p1, p2), (p2, p1)):
+                    rec.next_reference_id = mate.reference_id
+                    rec.next_reference_start = mate.reference_start
+                    if mate.is_reverse:
+                        rec.flag |= 0x20
+                    span = max(p1.reference_end, p2.reference_end) - min(p1.reference_start, p2.reference_start)
+                    rec.template_length = span if rec.reference_start <= mate.reference_start else -span
+                    rec.set_tag("MC", mate.cigarstring)
+                for rec in recs1 + recs2:
+                    out.write(rec)
+
+    bam = out_dir / f"{name}.bam"
+    pysam.sort("-o", str(bam), str(unsorted))
+    pysam.index(str(bam))
+    unsorted.unlink()
+    return SyntheticSample(bam=bam, fasta=fasta, contigs=dict(contigs), events=list(events))
+
+
+def _iter_cigar(cigar: str):
+    num = ""
+    for ch in cigar:
+        if ch.isdigit():
+            num += ch
+        else:
+            yield num, ch
+            num = ""
@@ -0,0 +1,99 @@
+"""Tests for scanitd.inference.anchors — the columnar TDUP anchor table."""
+
+import pickle
+import random
+
+import pytest
+
+from scanitd.base import MicroRegion
+from scanitd.inference.anchors import AnchorTable
+from scanitd.inference.evidence import TdupAnchor
+from scanitd.inference.readnames import read_name_hash
+
+
+def _anchor(chrom, start, end, strand="+", region=None):
+    region = region or MicroRegion("+AC")
+    tdup_id = (chrom, start, end - start, "AC", "ACGT")
+    return TdupAnchor(chrom, start, end, strand, region, tdup_id, "A")
+
+
+def _random_anchors(seed, n):
+    rng = random.Random(seed)
+    tdups = [_anchor(rng.choice(["chr1", "chr2"]), start, start + rng.randint(10, 500)) for start in rng.sample(range(10**8), n // 8 + 1)]
+    anchors = {}
+    for i in range(n):
+        anchor = rng.choice(tdups)
+        anchors[read_name_hash(f"read{seed}_{i}")] = anchor._replace(strand=rng.choice("+-"))
+    return anchors
+
+
+class TestAnchorTable:
+    @pytest.mark.parametrize("seed", range(3))
+    def test_behaves_like_the_dict(self, seed):
+        anchors = _random_anchors(seed, 2000)
+        table = AnchorTable()
+        table.update(anchors)
+        assert len(table) == len(anchors)
+        assert dict(table.items()) == anchors
+        assert list(table) == list(anchors)
+        for name_key, anchor in anchors.items():
+            assert name_key in table
+            assert table[name_key] == anchor
+        assert read_name_hash("missing") not in table
+        assert table.get(read_name_hash("missing")) is None
+        with pytest.raises(KeyError):
+            table[read_name_hash("missing")]
+
+    def test_assignment_replaces_the_anchor_of_a_name(self):
+        table = AnchorTable()
+        table[7] = _anchor("chr1", 100, 140, "-")
+        table[7] = _anchor("chr2", 500, 560, "+")
+        assert len(table) == 1
+        assert table[7] == _anchor("chr2", 500, 560, "+")
+
+    def test_rows_keep_insertion_order(self):
+        table = AnchorTable()
+        keys = [i << 40 for i in range(200)]
+        for i, key in enumerate(keys):
+            table[key] = _anchor("chr1", i, i + 50)
+        table[keys[0]] = _anchor("chr1", 1000, 1050)
+        assert list(table) == keys
+        assert [anchor.tdup_ref_start for anchor in table.values()] == [1000, *range(1, 200)]
+
+    def test_anchors_of_a_tdup_share_their_id_and_region(self):
+        table = AnchorTable()
+        # equal but distinct objects, as extracted from two reads
+        table[1] = _anchor("chr1", 100, 140, "+", MicroRegion("-GT"))
+        table[2] = _anchor("chr1", 100, 140, "-", MicroRegion("-GT"))
+        assert table[1].tdup_id is table[2].tdup_id
+        assert table[1].break_point_region is table[2].break_point_region
+
+    def test_pickle_and_nbytes(self):
+        anchors = _random_anchors(0, 500)
+        table = AnchorTable()
+        table.update(anchors)
+        restored = pickle.loads(pickle.dumps(table))
+        assert dict(restored.items()) == anchors
+        restored[read_name_hash("late")] = _anchor("chr3", 1, 60)
+        assert len(restored) == len(anchors) + 1
+        assert table.nbytes() < 100 * len(anchors)
+
+    def test_lookups_between_index_merges(self):
+        anchors = list(_random_anchors(1, 20_000).items())
+        rng = random.Random(1)
+        table = AnchorTable()
+        for i, (name_key, anchor) in enumerate(anchors):
+            table[name_key] = anchor
+            earlier_key, earlier = anchors[rng.randrange(i + 1)]
+            assert table.get(earlier_key) == earlier
+            assert read_name_hash(f"missing{i}") not in table
+        assert table._pending
+        assert len(table._index) + len(table._pending) == len(table) == len(anchors)
+        assert list(table.items()) == anchors
+
+    def test_name_index_is_compact(self):
+        table = AnchorTable()
+        table.update(_random_anchors(2, 50_000))
+        table._merge()
+        assert not table._pending
+        assert table.nbytes() < 45 * len(table)
@@ -36,6 +36,11 @@ class TestMicroRegion:
         a, b = MicroRegion("-GC"), MicroRegion("-GC")
         assert hash(a) == hash(b)
 
+    @pytest.mark.parametrize("prefixed", ["", "+ACGT", "-TTG"])
+    def test_prefixed_round_trip(self, prefixed):
+        assert MicroRegion(prefixed).prefixed() == prefixed
+        assert MicroRegion(MicroRegion(prefixed).prefixed()) == MicroRegion(prefixed)
+
 
 # ---------------------------------------------------------------------------
 # Strand
@@ -1,11 +1,12 @@
-"""Tests for scanitd.base.basic_read — Read.new() and reverse_complement()."""
+"""Tests for scanitd.base.basic_read — Read constructors and reverse_complement()."""
 
 from array import array
 
 import pytest
 
-from scanitd.base import MappingMode, Read
+from scanitd.base import LazyRead, MappingMode, Read
 from scanitd.base.basic_read import reverse_complement
+from scanitd.base.cigar import parse_cigar
 
 
 # ---------------------------------------------------------------------------
@@ -120,3 +121,92 @@ class TestReadNew:
         # 50M + 2D + 10M  → ref consumed = 62, read consumed = 60
         r = Read.new("r", "chr1", 100, "+", "50M2D10M", 60, 0, seq, None)
         assert r.ref_end == 100 + 62
+
+
+# ---------------------------------------------------------------------------
+# Read.from_aligned_segment
+# ---------------------------------------------------------------------------
+
+class TestReadFromAlignedSegment:
+    @pytest.mark.parametrize("cigar", ["50M", "5S45M", "45M5S", "5S10M2I5M10N10M15S"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_same_as_read_new(self, cigar, reverse):
+        pysam = pytest.importorskip("pysam")
+        header = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": 10_000}]})
+        segment = pysam.AlignedSegment(header)
+        segment.query_name = "read1"
+        segment.reference_id = 0
+        segment.reference_start = 1000
+        segment.is_reverse = reverse
+        segment.mapping_quality = 60
+        segment.cigarstring = cigar
+        segment.query_sequence = "ACGT" * 20
+        segment.query_qualities = _qualities(80)
+        segment.set_tag("NM", 3)
+
+        strand = "-" if reverse else "+"
+        expected = Read.new("read1", "chr1", 1000, strand, cigar, 60, 3, "ACGT" * 20, _qualities(80))
+        r = Read.from_aligned_segment(segment)
+        assert {slot: getattr(r, slot) for slot in Read.__slots__} == {slot: getattr(expected, slot) for slot in Read.__slots__}
+
+
+# ---------------------------------------------------------------------------
+# LazyRead
+# ---------------------------------------------------------------------------
+
+def _segment(cigar, reverse):
+    pysam = pytest.importorskip("pysam")
+    header = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": 10_000}]})
+    segment = pysam.AlignedSegment(header)
+    segment.query_name = "read1"
+    segment.reference_id = 0
+    segment.reference_start = 1000
+    segment.is_reverse = reverse
+    segment.mapping_quality = 60
+    segment.cigarstring = cigar
+    segment.query_sequence = "AACGTTTGCA" * 6
+    segment.query_qualities = array("B", range(60))
+    segment.set_tag("NM", 3)
+    return segment
+
+
+def _fields(read):
+    return {slot: getattr(read, slot) for slot in Read.__slots__}
+
+
+class TestLazyRead:
+    @pytest.mark.parametrize("cigar", ["60M", "20S40M", "40M20S", "5S10M2I5M10N18M20S"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_matches_read_of_the_segment(self, cigar, reverse):
+        segment = _segment(cigar, reverse)
+        lazy = LazyRead(segment)
+        assert _fields(lazy) == _fields(Read.from_aligned_segment(segment))
+        assert lazy.simple_mode == Read.from_aligned_segment(segment).simple_mode
+        assert hash(lazy) == hash(Read.from_aligned_segment(segment))
+
+    @pytest.mark.parametrize("strand_sa", ["+", "-"])
+    @pytest.mark.parametrize("reverse", [False, True])
+    def test_matches_read_of_the_sa_alignment(self, strand_sa, reverse):
+        segment = _segment("20S40M", reverse)
+        flipped = strand_sa != ("-" if reverse else "+")
+        sequence = reverse_complement(segment.query_sequence) if flipped else segment.query_sequence
+        qualities = segment.query_qualities[::-1] if flipped else segment.query_qualities
+        expected = Read.new("read1", "chr1", 5000, strand_sa, "40M20S", 30, 1, sequence, qualities)
+        lazy = LazyRead.from_sa(segment, "chr1", 5000, strand_sa, "40M20S", 30, 1)
+        assert _fields(lazy) == _fields(expected)
+
+    def test_mode_is_settable(self):
+        lazy = LazyRead(_segment("20S40M", False))
+        lazy.mode = MappingMode.SM
+        assert lazy.mode == MappingMode.SM
+        assert "LazyRead(" in repr(lazy)
+
+    def test_only_sa_cigars_go_through_the_parse_cigar_cache(self):
+        segment = _segment("5S10M2I5M10N18M20S", False)
+        before = parse_cigar.cache_info()
+        assert LazyRead(segment).sms == (5, 35, 20)
+        assert Read.from_aligned_segment(segment).lt_soft_len == 5
+        after = parse_cigar.cache_info()
+        assert (after.hits, after.misses) == (before.hits, before.misses)
+        assert LazyRead.from_sa(segment, "chr1", 5000, "+", "40M20S", 30, 1).sms == (0, 40, 20)
+        assert parse_cigar.cache_info().hits + parse_cigar.cache_info().misses == before.hits + before.misses + 1
@@ -0,0 +1,81 @@
+"""Tests for scanitd.writer.bgzf — BGZF output and its tabix index."""
+
+import gzip
+import random
+import struct
+
+import pysam
+import pytest
+
+from scanitd.writer.bgzf import BGZF_BLOCK_SIZE, BGZF_EOF, BGZF_MAX_BLOCK_SIZE, BgzfWriter, compress_block
+
+
+def _vcf_text(records=20_000):
+    lines = ["##fileformat=VCFv4.3\n", "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS\n"]
+    lines += [f"chr{chrom}\t{pos}\t.\tA\t<TDUP>\t.\t.\tSVLEN={pos % 97}\tGT\t0/1\n" for chrom in (1, 2) for pos in range(1, records * 10, 10)]
+    return "".join(lines)
+
+
+class TestBgzfWriter:
+    @pytest.mark.parametrize("threads", [1, 3])
+    def test_round_trip_across_blocks(self, tmp_path, threads):
+        text = _vcf_text()
+        assert len(text) > 4 * BGZF_BLOCK_SIZE
+        path = tmp_path / "out.vcf.gz"
+        with BgzfWriter(path, threads=threads) as out:
+            for start in range(0, len(text), 7_000):
+                out.write(text[start : start + 7_000])
+        assert out.closed
+        with gzip.open(path, "rt") as handle:
+            assert handle.read() == text
+        assert path.read_bytes().endswith(BGZF_EOF)
+
+    def test_blocks_do_not_depend_on_threads(self, tmp_path):
+        text = _vcf_text()
+        for threads in (1, 4):
+            with BgzfWriter(tmp_path / f"{threads}.gz", threads=threads) as out:
+                out.write(text)
+        assert (tmp_path / "1.gz").read_bytes() == (tmp_path / "4.gz").read_bytes()
+
+    def test_tabix_index(self, tmp_path):
+        path = tmp_path / "out.vcf.gz"
+        with BgzfWriter(path, tabix_preset="vcf") as out:
+            out.write(_vcf_text())
+        with pysam.TabixFile(str(path)) as tabix:
+            assert set(tabix.contigs) == {"chr1", "chr2"}
+            assert [line.split("\t")[1] for line in tabix.fetch("chr2", 100, 150)] == ["101", "111", "121", "131", "141"]
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "empty.gz"
+        BgzfWriter(path).close()
+        assert path.read_bytes() == BGZF_EOF
+
+    def test_error_leaves_the_file_unterminated(self, tmp_path):
+        path = tmp_path / "out.vcf.gz"
+        with pytest.raises(RuntimeError), BgzfWriter(path, threads=2, tabix_preset="vcf") as out:
+            out.write(_vcf_text())
+            raise RuntimeError
+        assert out.closed
+        assert not path.read_bytes().endswith(BGZF_EOF)
+        assert not path.with_name("out.vcf.gz.tbi").exists()
+
+    def test_block_is_a_gzip_member(self):
+        data = b"ACGT" * 1000
+        assert gzip.decompress(compress_block(data)) == data
+
+    @pytest.mark.parametrize(("size", "level"), [(BGZF_BLOCK_SIZE, 9), (BGZF_BLOCK_SIZE, 0), (3 * BGZF_BLOCK_SIZE, 6)])
+    def test_incompressible_input_fits_the_block_size_field(self, size, level):
+        data = random.Random(size).randbytes(size)
+        blocks = compress_block(data, level)
+        assert gzip.decompress(blocks) == data
+        offset = 0
+        while offset < len(blocks):
+            # BSIZE, the block size minus one, follows the 16-byte header prefix
+            (bsize,) = struct.unpack_from("<H", blocks, offset + 16)
+            assert bsize + 1 <= BGZF_MAX_BLOCK_SIZE
+            offset += bsize + 1
+        assert offset == len(blocks)
+
+    def test_threads_must_be_positive(self, tmp_path):
+        with pytest.raises(ValueError):
+            BgzfWriter(tmp_path / "out.gz", threads=0)
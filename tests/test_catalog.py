@@ -0,0 +1,84 @@
+"""Tests for scanitd.inference.catalog — the packed soft-clip catalog."""
+
+import pickle
+import random
+from collections import Counter
+
+import pytest
+
+from scanitd.base import MappingMode
+from scanitd.inference.catalog import SoftclipCatalog
+
+
+KEY = ("chr1", 100, MappingMode.SM)
+OTHER_KEY = ("chr1", 140, MappingMode.MS)
+
+
+def _random_clips(seed, n):
+    rng = random.Random(seed)
+    pool = ["".join(rng.choice("ACGT") for _ in range(rng.randint(1, 40))) for _ in range(n // 4 + 1)]
+    pool += ["ACGNT", "NNNN", "ACRT", ""]
+    return [rng.choice(pool) for _ in range(n)]
+
+
+class TestSoftclipCatalog:
+    @pytest.mark.parametrize("seed", range(5))
+    def test_round_trip_with_multiplicities(self, seed):
+        clips = _random_clips(seed, 300)
+        catalog = SoftclipCatalog()
+        for clip in clips:
+            catalog.add(KEY, clip)
+        assert list(catalog.clips(KEY)) == list(Counter(clips).items())
+
+    @pytest.mark.parametrize("length", range(1, 10))
+    def test_packing_keeps_leading_and_trailing_bases(self, length):
+        for clip in ("A" * length, "T" * length, "A" * (length - 1) + "C", "G" + "A" * (length - 1)):
+            catalog = SoftclipCatalog()
+            catalog.add(KEY, clip)
+            assert catalog.counts(KEY) == {clip: 1}
+
+    def test_identical_clips_are_stored_once(self):
+        catalog = SoftclipCatalog()
+        for _ in range(1000):
+            catalog.add(KEY, "ACGT" * 10)
+        assert catalog.counts(KEY) == {"ACGT" * 10: 1000}
+        assert catalog.nbytes() < 64
+
+    def test_remove_drops_empty_keys(self):
+        catalog = SoftclipCatalog.from_mapping({KEY: ["AC", "AC"], OTHER_KEY: ["GT"]})
+        catalog.remove(KEY, "AC")
+        assert catalog.counts(KEY) == {"AC": 1}
+        catalog.remove(KEY, "AC")
+        assert list(catalog) == [OTHER_KEY]
+        with pytest.raises(KeyError):
+            catalog.remove(OTHER_KEY, "TT")
+
+    def test_mapping_protocol_subset_and_pickle(self):
+        catalog = SoftclipCatalog.from_mapping({KEY: Counter({"AC": 2}), OTHER_KEY: ["GTN"]})
+        assert KEY in catalog
+        assert len(catalog) == 2
+        subset = catalog.subset([OTHER_KEY, ("chr2", 1, MappingMode.SM)])
+        assert list(subset) == [OTHER_KEY]
+        restored = pickle.loads(pickle.dumps(catalog))
+        assert restored.counts(KEY) == {"AC": 2}
+        assert restored.counts(OTHER_KEY) == {"GTN": 1}
+        del catalog[KEY]
+        assert KEY not in catalog
+        assert list(catalog.clips(KEY)) == []
+
+    def test_subset_is_unaffected_by_later_adds(self):
+        catalog = SoftclipCatalog()
+        catalog.add(KEY, "AC")
+        catalog.add(KEY, "GT")
+        subset = catalog.subset([KEY])
+        catalog.add(KEY, "GT")
+        subset.add(KEY, "TT")
+        assert catalog.counts(KEY) == {"AC": 1, "GT": 2}
+        assert subset.counts(KEY) == {"AC": 1, "GT": 1, "TT": 1}
+
+    def test_many_distinct_clips_at_one_key(self):
+        clips = [format(i, "020b").replace("0", "A").replace("1", "C") for i in range(5000)]
+        catalog = SoftclipCatalog()
+        for clip in clips:
+            catalog.add(KEY, clip)
+        assert catalog.counts(KEY) == dict.fromkeys(clips, 1)
@@ -0,0 +1,74 @@
+"""Tests for scanitd.inference.chimeric_index — the sidecar BAM of chimeric alignments."""
+
+import os
+import shutil
+from pathlib import Path
+
+import pysam
+import pytest
+from loguru import logger
+
+from scanitd.inference import chimeric_index
+from scanitd.inference.chimeric_index import chimeric_index_path, is_chimeric_candidate, open_chimeric_index
+from scanitd.inference.main import BamScanner
+
+
+@pytest.fixture
+def bam_copy(synthetic_sample, tmp_path):
+    """The synthetic BAM copied to a directory of its own, so its index can be written next to it."""
+    bam = tmp_path / "sample.bam"
+    shutil.copy(synthetic_sample.bam, bam)
+    shutil.copy(f"{synthetic_sample.bam}.bai", f"{bam}.bai")
+    return bam
+
+
+def _open(bam, index_dir=None):
+    bam_object = pysam.AlignmentFile(str(bam))
+    return bam_object, open_chimeric_index(bam, bam_object, logger, index_dir)
+
+
+class TestChimericIndex:
+    def test_holds_the_anchor_candidates_in_bam_order(self, bam_copy):
+        bam_object, index = _open(bam_copy)
+        expected = [read.to_string() for read in bam_object.fetch() if is_chimeric_candidate(read)]
+        assert expected
+        assert [read.to_string() for read in index.fetch()] == expected
+        assert chimeric_index_path(bam_copy).exists()
+        assert Path(f"{chimeric_index_path(bam_copy)}.bai").exists()
+
+    def test_anchors_identical_to_scanning_the_bam(self, bam_copy, synthetic_sample):
+        for regions in ([None], ["chr1:1900-2100", "chr1:2000-4100", "chr2"]):
+            scanner = BamScanner(bam_copy, 15, Path(synthetic_sample.fasta), 10, regions, logger)
+            from_bam = dict(scanner.iter_bam().items())
+            scanner = BamScanner(bam_copy, 15, Path(synthetic_sample.fasta), 10, regions, logger)
+            _, index = _open(bam_copy)
+            assert dict(scanner.iter_bam(index).items()) == from_bam
+
+    def test_reused_while_the_bam_is_unchanged(self, bam_copy, monkeypatch):
+        _open(bam_copy)
+
+        def fail(*args):
+            raise AssertionError
+
+        monkeypatch.setattr(chimeric_index, "write_chimeric_index", fail)
+        assert _open(bam_copy)[1] is not None
+
+    def test_rebuilt_when_the_bam_changes(self, bam_copy):
+        _open(bam_copy)
+        index_path = chimeric_index_path(bam_copy)
+        built = index_path.stat().st_mtime_ns
+        stat = bam_copy.stat()
+        os.utime(bam_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        _open(bam_copy)
+        assert index_path.stat().st_mtime_ns != built
+
+    def test_index_dir(self, bam_copy, tmp_path):
+        _, index = _open(bam_copy, tmp_path / "cache")
+        assert index is not None
+        assert (tmp_path / "cache" / f"{bam_copy.name}.scanitd-sa.bam").exists()
+        assert not chimeric_index_path(bam_copy).exists()
+
+    def test_unwritable_dir_falls_back_to_the_bam(self, bam_copy, tmp_path):
+        blocker = tmp_path / "blocker"
+        blocker.write_text("")
+        assert _open(bam_copy, blocker / "cache")[1] is None
@@ -1,8 +1,10 @@
-"""Tests for scanitd.base.cigar — parse_cigar()."""
+"""Tests for scanitd.base.cigar — parse_cigar(), its cache, and parse_cigartuples()."""
+
+import dataclasses
 
 import pytest
 
-from scanitd.base.cigar import CigarResult, parse_cigar
+from scanitd.base.cigar import CIGAR_CACHE_SIZE, CigarResult, cigar_cache_stats, parse_cigar, parse_cigartuples
 
 
 # ---------------------------------------------------------------------------
@@ -77,12 +79,12 @@ class TestParseCigarEdgeCases:
         r = parse_cigar("")
         assert r.lt_soft_len == 0
         assert r.rt_soft_len == 0
-        assert r.cigartuples == []
+        assert r.cigartuples == ()
 
     def test_star_cigar_no_crash(self):
         """'*' is the SAM unmapped sentinel — no recognised ops, must not crash."""
         r = parse_cigar("*")
-        assert r.cigartuples == []
+        assert r.cigartuples == ()
         assert r.lt_soft_len == 0
 
     def test_hard_clip_not_soft_clip(self):
@@ -90,3 +92,48 @@ class TestParseCigarEdgeCases:
         r = parse_cigar("5H40M5H")
         assert r.lt_soft_len == 0
         assert r.rt_soft_len == 0
+
+
+# ---------------------------------------------------------------------------
+# parse_cigartuples: integer operations as exposed by pysam
+# ---------------------------------------------------------------------------
+
+class TestParseCigartuples:
+    @pytest.mark.parametrize("cigar", ["50M", "5S45M", "45M5S", "10M5I10M", "10M5D10M", "5S10M2I5M10N10M15S", "5H40M5H", "3S10=2X10M"])
+    def test_matches_parse_cigar(self, cigar):
+        expected = parse_cigar(cigar)
+        assert parse_cigartuples(expected.cigartuples) == expected
+
+    @pytest.mark.parametrize("cigartuples", [None, []])
+    def test_missing_cigar_is_zeroed(self, cigartuples):
+        assert parse_cigartuples(cigartuples) == CigarResult()
+
+    def test_accepts_pysam_cigartuples(self):
+        pysam = pytest.importorskip("pysam")
+        segment = pysam.AlignedSegment()
+        segment.cigarstring = "5S10M2I5M10N10M15S"
+        assert parse_cigartuples(segment.cigartuples) == parse_cigar("5S10M2I5M10N10M15S")
+
+
+# ---------------------------------------------------------------------------
+# Interning cache
+# ---------------------------------------------------------------------------
+
+class TestParseCigarCache:
+    def test_repeated_cigars_share_one_result(self):
+        parse_cigar.cache_clear()
+        first = parse_cigar("85S66M")
+        assert parse_cigar("85S66M") is first
+        assert parse_cigar.cache_info().hits == 1
+        assert parse_cigar.cache_info().misses == 1
+        assert "1 hits, 1 misses (50.0% hit rate)" in cigar_cache_stats()
+
+    def test_results_are_immutable(self):
+        r = parse_cigar("5S45M")
+        assert isinstance(r.cigartuples, tuple)
+        assert isinstance(r.cigartuples_without_soft, tuple)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            r.lt_soft_len = 0
+
+    def test_cache_is_bounded(self):
+        assert parse_cigar.cache_info().maxsize == CIGAR_CACHE_SIZE
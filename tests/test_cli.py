@@ -0,0 +1,60 @@
+"""Tests for scanitd.cli — subcommand dispatch of the ``scanitd`` command group."""
+
+import pytest
+from typer.testing import CliRunner
+
+from scanitd.cli import cli
+from scanitd.cli.cli import app
+
+from .test_state import _body
+
+
+@pytest.fixture(autouse=True)
+def keep_test_logging(monkeypatch):
+    """Keep the commands from replacing the log handlers with one on the runner's stdout."""
+    monkeypatch.setattr(cli, "configure_logger", lambda log_level: None)
+
+
+class TestDefaultCommandGroup:
+    def test_options_without_a_subcommand_run_call(self, synthetic_sample, tmp_path):
+        runner = CliRunner()
+        scan_args = ["-i", str(synthetic_sample.bam), "-r", str(synthetic_sample.fasta), "-c", "1"]
+        implicit = tmp_path / "implicit" / "sample.vcf"
+        explicit = tmp_path / "explicit" / "sample.vcf"
+        implicit.parent.mkdir()
+        explicit.parent.mkdir()
+        result = runner.invoke(app, [*scan_args, "-o", str(implicit)])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(app, ["call", *scan_args, "-o", str(explicit)])
+        assert result.exit_code == 0, result.output
+        assert _body(implicit)
+        assert _body(implicit) == _body(explicit)
+
+    def test_refilter_with_new_thresholds_matches_a_direct_run(self, synthetic_sample, tmp_path):
+        runner = CliRunner()
+        scan_args = ["-i", str(synthetic_sample.bam), "-r", str(synthetic_sample.fasta)]
+        state_dir = tmp_path / "state"
+        result = runner.invoke(app, [*scan_args, "-o", str(tmp_path / "sample.vcf"), "--state-dir", str(state_dir)])
+        assert result.exit_code == 0, result.output
+
+        thresholds = ["-c", "3", "-d", "10", "-f", "0.05"]
+        direct = tmp_path / "direct" / "sample.vcf"
+        refiltered = tmp_path / "refiltered" / "sample.vcf"
+        direct.parent.mkdir()
+        refiltered.parent.mkdir()
+        result = runner.invoke(app, [*scan_args, "-o", str(direct), *thresholds])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(app, ["refilter", "-s", str(state_dir), "-o", str(refiltered), *thresholds])
+        assert result.exit_code == 0, result.output
+        assert _body(refiltered) == _body(direct)
+        assert _body(refiltered) != _body(tmp_path / "sample.vcf")
+
+    def test_subcommand_names_are_not_rewritten(self, tmp_path):
+        result = CliRunner().invoke(app, ["refilter", "--state-dir", str(tmp_path), "-o", str(tmp_path / "out.vcf")])
+        assert result.exit_code != 0
+        assert "No scan state" in result.output
+
+    def test_no_arguments_show_the_group_help(self):
+        result = CliRunner().invoke(app, [])
+        assert "call" in result.output
+        assert "refilter" in result.output
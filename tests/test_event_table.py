@@ -0,0 +1,78 @@
+"""Tests for scanitd.base.event_table — the columnar EventTable."""
+
+import random
+
+import numpy as np
+import pytest
+
+from scanitd.base import Event, EventTable, MicroRegion
+
+CONTIGS = ["chr1", "chr2", "chr10"]
+
+
+def _records(events):
+    return [
+        (e.chrom, e.ref_start, e.end, e.event_type, e.event_size, e.event_sequence, e.oao, e.ao, e.dp, e.af, e.ref_allele, e.alt_allele, e.break_point_region)
+        for e in events
+    ]
+
+
+def _random_events(count, seed=3):
+    rng = random.Random(seed)
+    regions = [MicroRegion(""), MicroRegion("+GA"), MicroRegion("-TTG"), None]
+    events = []
+    for _ in range(count):
+        size = rng.randrange(10, 40)
+        ao = rng.randrange(0, 12)
+        event_id = (rng.choice(CONTIGS), rng.randrange(50), size, "".join(rng.choices("ACGT", k=size)), rng.choice(regions))
+        alleles = rng.choice([("A", "<TDUP>"), (None, None)])
+        events.append(Event.new(rng.choice(("TDUP", "INS")), event_id, ao, ao + rng.randrange(3), ao + rng.randrange(1, 40), *alleles))
+    return events
+
+
+class TestEventTable:
+    def test_round_trip(self):
+        events = _random_events(300)
+        table = EventTable.from_events(events, CONTIGS)
+        assert len(table) == 300
+        assert _records(table.to_events()) == _records(events)
+        assert _records(table) == _records(events)
+
+    @pytest.mark.parametrize("thresholds", [(0, 0, 0.0), (4, 10, 0.1), (1, 1, 0.25), (8, 30, 0.5)])
+    def test_filter_matches_per_event_comparison(self, thresholds):
+        min_ao, min_depth, min_vaf = thresholds
+        events = _random_events(500)
+        expected = [e for e in events if e.ao >= min_ao and e.dp >= min_depth and e.af >= min_vaf]
+        table = EventTable.from_events(events, CONTIGS)
+        assert int(table.mask(*thresholds).sum()) == len(expected)
+        assert _records(table.filter(*thresholds)) == _records(expected)
+
+    def test_sort_follows_contig_order(self):
+        events = _random_events(300)
+        ordered = EventTable.from_events(events, CONTIGS).sort().to_events()
+        # a stable sort on (header index, ref_start): chr2 before chr10, ties in row order
+        expected = sorted(events, key=lambda e: (CONTIGS.index(e.chrom), e.ref_start))
+        assert _records(ordered) == _records(expected)
+        assert [e.chrom for e in ordered].index("chr10") > [e.chrom for e in ordered].index("chr2")
+
+    def test_contigs_missing_from_the_order_are_appended(self):
+        events = [Event.new("INS", (chrom, 5, 12, "A" * 12, MicroRegion("")), 3, 3, 9) for chrom in ("chrX", "chr2", "chrM")]
+        table = EventTable.from_events(events, ["chr1", "chr2"])
+        assert table.contigs == ["chr1", "chr2", "chrX", "chrM"]
+        assert [e.chrom for e in table.sort()] == ["chr2", "chrX", "chrM"]
+
+    def test_take_shares_the_text_buffer(self):
+        table = EventTable.from_events(_random_events(50), CONTIGS)
+        subset = table.take(np.arange(10, 20))
+        assert subset._text is table._text
+        assert _records(subset) == _records(table.to_events()[10:20])
+
+    def test_empty(self):
+        table = EventTable.from_events([], CONTIGS)
+        assert len(table) == 0
+        assert table.filter(4, 10, 0.1).sort().to_events() == []
+
+    def test_unknown_event_type(self):
+        event = Event("chr1", 5, 12, "A" * 12, "DEL", 3, 3, 9, 17)
+        with pytest.raises(ValueError):
+            EventTable.from_events([event])
@@ -0,0 +1,233 @@
+"""Tests for scanitd.inference.evidence — EvidenceCollector bookkeeping."""
+
+import pytest
+
+from scanitd.base import MappingMode, MicroRegion
+from scanitd.base.cigar import parse_cigar
+from scanitd.inference.evidence import EvidenceCollector, TdupAnchor, resolve_tdup_id
+from scanitd.inference.helper import self_loop_checker
+from scanitd.inference.readnames import read_name_hash
+
+
+REF = "ACGTTGCAAC" * 50
+
+
+class _Slice:
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class _Contig:
+    def __getitem__(self, item):
+        return _Slice(REF[item])
+
+
+class FakeFasta(dict):
+    def __missing__(self, key):
+        return _Contig()
+
+
+class FakeSegment:
+    """Minimal stand-in for pysam.AlignedSegment."""
+
+    def __init__(self, name, start, cigar, seq_len=60, mapq=60, reverse=False):
+        self.query_name = name
+        self.reference_name = "chr1"
+        self.reference_start = start
+        self.cigarstring = cigar
+        self.cigartuples = parse_cigar(cigar).cigartuples
+        self.mapping_quality = mapq
+        self.is_reverse = reverse
+        self.query_sequence = REF[start : start + seq_len]
+        self.query_qualities = None
+
+    def get_tag(self, tag):
+        assert tag == "NM"
+        return 0
+
+
+def _anchor(start, end):
+    return TdupAnchor("chr1", start, end, "+", MicroRegion(""), *resolve_tdup_id(FakeFasta(), "chr1", start, end, MicroRegion("")))
+
+
+ANCHOR = _anchor(100, 140)
+OTHER_ANCHOR = _anchor(200, 230)
+
+
+def _names(*names):
+    return {read_name_hash(name) for name in names}
+
+
+def _collector(anchors=None, *, deferred=True):
+    anchors = {read_name_hash(name): anchor for name, anchor in (anchors or {}).items()}
+    return EvidenceCollector(FakeFasta(), anchors, 15, 10, 2, deferred_anchors=deferred)
+
+
+class TestTwoPassCounting:
+    def test_softclip_collected_once_per_name(self):
+        c = _collector(deferred=False)
+        read = FakeSegment("r1", 100, "20S40M")
+        c.observe(read, 25, 0, 105)
+        c.observe(read, 26, 0, 106)
+        assert c.to_be_rescued_sequences.counts(("chr1", 100, MappingMode.SM)) == {read.query_sequence[:20]: 1}
+        assert set(c.counted_names) == _names("r1")
+
+    def test_known_anchor_counts_tdup(self):
+        c = _collector({"r1": ANCHOR}, deferred=False)
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        tdup_id = ANCHOR.tdup_id
+        assert dict(c.tdup_ao) == {tdup_id: 1}
+        assert not c.to_be_rescued_sequences
+
+    @pytest.mark.parametrize("position", [0, None])
+    def test_falsy_query_position_ignored(self, position):
+        c = _collector(deferred=False)
+        c.observe(FakeSegment("r1", 100, "20S40M"), position, 0, 100)
+        assert not c.counted_names
+
+    def test_low_mapq_ignored(self):
+        c = _collector(deferred=False)
+        c.observe(FakeSegment("r1", 100, "20S40M", mapq=3), 25, 0, 105)
+        assert not c.counted_names
+
+
+class TestNameHashCollisions:
+    def test_colliding_name_counts_as_already_counted(self, monkeypatch):
+        import scanitd.inference.evidence as evidence
+
+        monkeypatch.setattr(evidence, "read_name_hash", lambda name: 42)
+        c = _collector(deferred=False)
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.observe(FakeSegment("r2", 200, "20S40M"), 25, 0, 205)
+        assert list(c.to_be_rescued_sequences) == [("chr1", 100, MappingMode.SM)]
+        assert set(c.counted_names) == {42}
+
+
+class TestDeferredAnchors:
+    def test_late_anchor_moves_softclip(self):
+        c = _collector()
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.register_anchor("r1", ANCHOR)
+        tdup_id = ANCHOR.tdup_id
+        assert dict(c.tdup_ao) == {tdup_id: 1}
+        assert not c.to_be_rescued_sequences
+        assert tdup_id in c.tdup_allele_dict
+
+    def test_replaced_anchor_moves_count(self):
+        c = _collector({"r1": ANCHOR})
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.register_anchor("r1", OTHER_ANCHOR)
+        other_id = OTHER_ANCHOR.tdup_id
+        assert dict(c.tdup_ao) == {other_id: 1}
+
+    def test_unseen_name_only_registers(self):
+        c = _collector()
+        c.register_anchor("r1", ANCHOR)
+        assert c.tdup_anchors == {read_name_hash("r1"): ANCHOR}
+        assert not c.tdup_ao
+
+    def test_order_follows_first_observation(self):
+        c = _collector({"r2": OTHER_ANCHOR})
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.observe(FakeSegment("r2", 200, "20S40M"), 25, 0, 205)
+        c.register_anchor("r1", ANCHOR)
+        first_id = ANCHOR.tdup_id
+        second_id = OTHER_ANCHOR.tdup_id
+        assert list(c.ordered_tdup_ao()) == [first_id, second_id]
+
+
+class TestReplay:
+    def _shard(self, *reads):
+        shard = _collector()
+        for read, position in reads:
+            shard.observe(read, position, 0, read.reference_start + position)
+        return shard.attempts(), shard.tdup_allele_dict, shard.ins_allele_dict
+
+    def test_attempts_follow_observation_order(self):
+        attempts, _, _ = self._shard((FakeSegment("r2", 200, "20S40M"), 25), (FakeSegment("r1", 100, "20S40M"), 25))
+        assert [(name_key, kind) for name_key, kind, _ in attempts] == [(read_name_hash("r2"), "softclip"), (read_name_hash("r1"), "softclip")]
+
+    def test_softclips_reclassified_against_anchors(self):
+        merged = _collector({"r1": ANCHOR}, deferred=False)
+        merged.replay(*self._shard((FakeSegment("r1", 100, "20S40M"), 25), (FakeSegment("r2", 200, "20S40M"), 25)))
+        tdup_id = ANCHOR.tdup_id
+        assert dict(merged.tdup_ao) == {tdup_id: 1}
+        assert list(merged.to_be_rescued_sequences) == [("chr1", 200, MappingMode.SM)]
+
+    def test_names_counted_by_earlier_shards_are_skipped(self):
+        merged = _collector(deferred=False)
+        merged.replay(*self._shard((FakeSegment("r1", 100, "20S40M"), 25)))
+        merged.replay(*self._shard((FakeSegment("r1", 300, "20S40M"), 25)))
+        assert list(merged.to_be_rescued_sequences) == [("chr1", 100, MappingMode.SM)]
+
+
+class TestBoundedCatalog:
+    def _bounded(self, anchors=None, horizon=50):
+        return EvidenceCollector(FakeFasta(), dict(anchors or {}), 15, 10, 2, catalog_horizon=horizon)
+
+    def test_softclips_behind_the_sweep_are_evicted(self):
+        c = self._bounded()
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.observe(FakeSegment("r2", 140, "20S40M"), 25, 0, 145)
+        assert len(c.to_be_rescued_sequences) == 2
+        c.observe(FakeSegment("r3", 180, "20S40M"), 25, 0, 185)
+        assert list(c.to_be_rescued_sequences) == [("chr1", 140, MappingMode.SM), ("chr1", 180, MappingMode.SM)]
+        assert c.catalog_evictions == 1
+
+    def test_anchor_breakpoints_are_kept(self):
+        c = self._bounded({"a1": ANCHOR})
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        c.observe(FakeSegment("r2", 400, "20S40M"), 25, 0, 405)
+        assert ("chr1", 100, MappingMode.SM) in c.to_be_rescued_sequences
+        assert c.catalog_evictions == 0
+
+    def test_insertion_tdup_breakpoints_are_kept(self):
+        c = self._bounded()
+        c.observe(FakeSegment("r1", 118, "20S40M"), 25, 0, 118)
+        # REF has period 10: a 20 bp insertion after column 119 is a TDUP, left-shifted to 118
+        insertion = FakeSegment("r2", 100, "20M20I20M")
+        insertion.query_sequence = REF[100:120] + REF[100:140]
+        c.observe(insertion, 19, 20, 119)
+        assert [tdup_id[:3] for tdup_id in c.tdup_ao] == [("chr1", 118, 20)]
+        c.observe(FakeSegment("r3", 400, "20S40M"), 25, 0, 405)
+        assert list(c.to_be_rescued_sequences)[0] == ("chr1", 118, MappingMode.SM)
+        assert c.late_breakpoints == 0
+
+    def test_new_chromosome_flushes_catalog(self):
+        c = self._bounded()
+        c.observe(FakeSegment("r1", 100, "20S40M"), 25, 0, 105)
+        other = FakeSegment("r2", 100, "20S40M")
+        other.reference_name = "chr2"
+        c.observe(other, 25, 0, 105)
+        assert list(c.to_be_rescued_sequences) == [("chr2", 100, MappingMode.SM)]
+
+    def test_needs_anchors_up_front(self):
+        with pytest.raises(ValueError):
+            EvidenceCollector(FakeFasta(), {}, 15, 10, 2, deferred_anchors=True, catalog_horizon=50)
+
+
+class TestInsertionVerdicts:
+    def test_same_insertion_checked_once(self, monkeypatch):
+        import scanitd.inference.evidence as evidence
+
+        calls = []
+
+        def counting_checker(*args):
+            calls.append(args)
+            return self_loop_checker(*args)
+
+        monkeypatch.setattr(evidence, "self_loop_checker", counting_checker)
+        c = _collector(deferred=False)
+        for name in ("r1", "r2"):
+            c.observe_insertion(FakeSegment(name, 100, "20M12I28M"), 19, 12, 119)
+        c.observe_insertion(FakeSegment("r3", 100, "21M12I27M"), 20, 12, 120)
+        assert len(calls) == 2
+        assert set(c.counted_names) == _names("r1", "r2", "r3")
+
+
+class TestResolveTdupId:
+    def test_id_and_reference_allele(self):
+        tdup_id, ref_allele = resolve_tdup_id(FakeFasta(), "chr1", 100, 140, MicroRegion("+AC"))
+        assert tdup_id == ("chr1", 100, 40, REF[100:140], MicroRegion("+AC"))
+        assert ref_allele == REF[100]
+        assert ANCHOR.tdup_id == ("chr1", 100, 40, REF[100:140], MicroRegion(""))
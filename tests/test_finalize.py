@@ -0,0 +1,86 @@
+"""Tests for scanitd.inference.finalize — per-chromosome finalization units."""
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from scanitd.base import Event, MappingMode, MicroRegion
+from scanitd.inference.catalog import SoftclipCatalog
+from scanitd.inference.finalize import iter_contig_events, plan_finalization
+
+
+def _tdup(chrom, start, size=30):
+    return (chrom, start, size, "A" * size, MicroRegion(""))
+
+
+def _ins(chrom, start):
+    return (chrom, start, 12, "C" * 12, MicroRegion(""))
+
+
+@pytest.fixture
+def collector():
+    tdups = [_tdup("chr2", 500), _tdup("chr1", 900), _tdup("chr1", 100), _tdup("chr2", 40)]
+    insertions = [_ins("chr1", 400), _ins("chr3", 10)]
+    return SimpleNamespace(
+        tdup_ao=dict.fromkeys(tdups, 2),
+        tdup_allele_dict=dict.fromkeys(tdups, ("A", "TDUP")),
+        ins_ao=dict.fromkeys(insertions, 1),
+        ins_allele_dict=dict.fromkeys(insertions, ("G", "GCCCCCCCCCCCC")),
+        to_be_rescued_sequences=SoftclipCatalog.from_mapping(
+            {
+                ("chr1", 100, MappingMode.SM): ["AAA", "AAA", "CC"],
+                ("chr1", 930, MappingMode.MS): ["T"],
+                ("chr1", 5, MappingMode.SM): ["G"],
+            },
+        ),
+    )
+
+
+class TestPlanFinalization:
+    def test_units_group_chromosomes_in_position_order(self, collector):
+        units = plan_finalization(collector, collector.tdup_ao)
+        assert [unit.chrom for unit in units] == ["chr2", "chr1", "chr3"]
+        chr1 = units[1]
+        assert [item[0] for item in chr1.tdups] == [2, 1]
+        assert [item[0] for item in chr1.insertions] == [4]
+        candidates = chr1.rescue_candidates
+        assert {key: candidates.counts(key) for key in candidates} == {
+            ("chr1", 100, MappingMode.SM): {"AAA": 2, "CC": 1},
+            ("chr1", 930, MappingMode.MS): {"T": 1},
+        }
+
+    def test_unit_size_splits_chromosomes(self, collector):
+        units = plan_finalization(collector, collector.tdup_ao, unit_size=2)
+        assert [(unit.chrom, len(unit.tdups) + len(unit.insertions)) for unit in units] == [
+            ("chr2", 2),
+            ("chr1", 2),
+            ("chr1", 1),
+            ("chr3", 1),
+        ]
+        indices = sorted(item[0] for unit in units for item in (*unit.tdups, *unit.insertions))
+        assert indices == list(range(6))
+
+    def test_invalid_unit_size(self, collector):
+        with pytest.raises(ValueError, match="positive"):
+            plan_finalization(collector, collector.tdup_ao, unit_size=0)
+
+
+class TestIterContigEvents:
+    def test_result_order_does_not_matter(self):
+        # equal ref_start keys: the serial index decides
+        events = [
+            (index, Event.new(kind, event_id, 1, 1, 10, "A", "<TDUP>"))
+            for index, (kind, event_id) in enumerate(
+                [("TDUP", _tdup("chr2", 50)), ("TDUP", _tdup("chr2", 50, 40)), ("TDUP", _tdup("chr2", 20)), ("INS", _ins("chr2", 50))],
+            )
+        ]
+        expected = [events[2][1], events[0][1], events[1][1], events[3][1]]
+        chr10 = [(4, Event.new("TDUP", _tdup("chr10", 5), 1, 1, 10, "A", "<TDUP>"))]
+        rng = random.Random(2)
+        for _ in range(10):
+            shuffled = events[:]
+            rng.shuffle(shuffled)
+            results = [("chr2", shuffled[:1]), ("chr2", shuffled[1:3]), ("chr2", shuffled[3:]), ("chr10", chr10)]
+            # chromosomes keep the unit order (header order), not name order
+            assert list(iter_contig_events(results)) == [("chr2", expected), ("chr10", [chr10[0][1]])]
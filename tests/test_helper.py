@@ -1,13 +1,24 @@
 """Tests for scanitd.inference.helper — pure functions."""
 
+import random
+
+import threading
+
+import pysam
 import pytest
+from loguru import logger
 
+from scanitd.base import Event, EventTable, MappingMode, MicroRegion
+from scanitd.inference import helper
 from scanitd.inference.helper import (
     format_sa_tag,
     get_insertion_reference_pos,
+    obtain_depth_given_genomic_position,
+    obtain_depths_given_genomic_positions,
     obtain_sa_query_seq_from_ra,
     parse_target_genomic_coordinates,
     self_loop_checker,
+    write_events_to_vcf,
 )
 
 
@@ -109,6 +120,32 @@ class TestParseTargetGenomicCoordinates:
         assert result[0] == "chr1:50-150"
 
 
+# ---------------------------------------------------------------------------
+# obtain_depths_given_genomic_positions
+# ---------------------------------------------------------------------------
+
+class TestObtainDepthsGivenGenomicPositions:
+    @pytest.mark.parametrize("read_mode", [MappingMode.SM, MappingMode.MS])
+    @pytest.mark.parametrize("max_gap", [0, 150, 1_000_000])
+    def test_matches_per_position_count(self, synthetic_sample, read_mode, max_gap):
+        rng = random.Random(11)
+        with pysam.AlignmentFile(str(synthetic_sample.bam)) as bam:
+            positions = [
+                (chrom, rng.randrange(1, length))
+                for chrom, length in zip(bam.references, bam.lengths)
+                for _ in range(40)
+            ]
+            positions += positions[:5]
+            depths = obtain_depths_given_genomic_positions(bam, positions, read_mode, max_gap=max_gap)
+            assert set(depths) == set(positions)
+            for chrom, position in positions:
+                assert depths[(chrom, position)] == obtain_depth_given_genomic_position(bam, chrom, position, read_mode)
+
+    def test_no_positions(self, synthetic_sample):
+        with pysam.AlignmentFile(str(synthetic_sample.bam)) as bam:
+            assert obtain_depths_given_genomic_positions(bam, []) == {}
+
+
 # ---------------------------------------------------------------------------
 # get_insertion_reference_pos
 # ---------------------------------------------------------------------------
@@ -199,3 +236,115 @@ class TestSelfLoopChecker:
         is_dup, shift, _ = self_loop_checker(ins_seq, left_seq, right_seq, 0)
         if is_dup:
             assert shift == 1   # must be 1, not 2
+
+    @pytest.mark.parametrize("seed", range(4))
+    def test_matches_rotation_by_rotation_scan(self, seed):
+        rng = random.Random(seed)
+        for _ in range(2000):
+            ins_len = rng.choice([0, 1, 2, 3, 5, 10, 17, 40])
+            left_len = max(0, rng.choice([ins_len - 1, ins_len, rng.randrange(0, 2 * ins_len + 3)]))
+            right_len = max(0, rng.choice([ins_len - 1, rng.randrange(0, 2 * ins_len + 3)]))
+            flank = "".join(rng.choice("ACGT") for _ in range(left_len + right_len))
+            if ins_len and left_len + right_len >= ins_len and rng.random() < 0.6:
+                start = rng.randrange(left_len + right_len - ins_len + 1)
+                ins_seq = list(flank[start : start + ins_len])
+                for _ in range(rng.randrange(3)):
+                    ins_seq[rng.randrange(ins_len)] = rng.choice("ACGT")
+                ins_seq = "".join(ins_seq)
+            else:
+                ins_seq = "".join(rng.choice("ACGT") for _ in range(ins_len))
+            args = (ins_seq, flank[:left_len], flank[left_len:], rng.choice([0, 1, 2, 5]))
+            assert self_loop_checker(*args) == _rotation_scan(*args), args
+
+
+def _rotation_scan(insertion_seq, left_seq, right_seq, allowed_mismatched):
+    """Rotation-by-rotation reference implementation of self_loop_checker."""
+
+    def mismatches(str1, str2):
+        return sum(a != b for a, b in zip(str1, str2)) + abs(len(str1) - len(str2))
+
+    ins_len = len(insertion_seq)
+    steps = (ins_len + 1) // 2
+    for count in range(1, steps + 1):
+        ins_seq = insertion_seq[-count:] + insertion_seq[:-count]
+        combo_seq = left_seq[-count:] + right_seq[: ins_len - count]
+        if mismatches(ins_seq, combo_seq) <= allowed_mismatched:
+            return True, count, combo_seq
+    for count in range(1, steps + 1):
+        ins_seq = insertion_seq[count:] + insertion_seq[:count]
+        combo_seq = left_seq[-(ins_len - count) :] + right_seq[:count]
+        if mismatches(ins_seq, combo_seq) <= allowed_mismatched:
+            return True, ins_len - count - 1, combo_seq
+    return False, 0, ""
+
+
+# ---------------------------------------------------------------------------
+# write_events_to_vcf
+# ---------------------------------------------------------------------------
+
+HEADER = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": "chr1", "LN": 100_000}]}
+
+
+def _events(count):
+    return [Event.new("TDUP", ("chr1", 100 * i, 20, "ACGT" * 5, MicroRegion("")), 3, i % 7, 10, "A", "AACGT") for i in range(count)]
+
+
+def _records(path):
+    return [line for line in path.read_text().splitlines() if not line.startswith("#")]
+
+
+class TestWriteEventsToVcf:
+    def test_stream_written_like_a_list(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(helper, "WRITE_BATCH_SIZE", 4)
+        events = _events(50)
+        write_events_to_vcf(tmp_path / "list.vcf", HEADER, events, logger, min_ao=2)
+        write_events_to_vcf(tmp_path / "stream.vcf", HEADER, iter(events), logger, min_ao=2)
+        records = _records(tmp_path / "list.vcf")
+        assert records == _records(tmp_path / "stream.vcf")
+        assert len(records) == sum(event.ao >= 2 for event in events)
+        assert [record.split("\t")[2] for record in records] == [str(i) for i in range(1, len(records) + 1)]
+
+    def test_event_table_filtered_like_a_list(self, tmp_path):
+        events = _events(50)
+        write_events_to_vcf(tmp_path / "list.vcf", HEADER, events, logger, min_ao=3, min_vaf=0.5)
+        write_events_to_vcf(tmp_path / "table.vcf", HEADER, EventTable.from_events(events, ["chr1"]), logger, min_ao=3, min_vaf=0.5)
+        assert _records(tmp_path / "table.vcf") == _records(tmp_path / "list.vcf")
+
+    def test_producer_error_stops_the_writer(self, tmp_path):
+        def failing():
+            yield from _events(10)
+            raise RuntimeError
+
+        threads = threading.active_count()
+        with pytest.raises(RuntimeError):
+            write_events_to_vcf(tmp_path / "out.vcf", HEADER, failing(), logger)
+        assert threading.active_count() == threads
+
+    @pytest.mark.parametrize("name", ["out.vcf", "out.vcf.gz"])
+    def test_producer_error_leaves_no_output(self, tmp_path, monkeypatch, name):
+        monkeypatch.setattr(helper, "WRITE_BATCH_SIZE", 4)
+
+        def failing():
+            yield from _events(50)
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            write_events_to_vcf(tmp_path / name, HEADER, failing(), logger, threads=2)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_producer_error_removes_a_previous_output(self, tmp_path):
+        path = tmp_path / "out.vcf.gz"
+        write_events_to_vcf(path, HEADER, _events(10), logger)
+        assert path.with_name("out.vcf.gz.tbi").exists()
+
+        def failing():
+            yield from _events(10)
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            write_events_to_vcf(path, HEADER, failing(), logger)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_writer_error_reaches_the_caller(self, tmp_path):
+        with pytest.raises(OSError):
+            write_events_to_vcf(tmp_path / "missing" / "out.vcf", HEADER, _events(5000), logger)
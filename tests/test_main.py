@@ -0,0 +1,280 @@
+"""End-to-end tests for scanitd.inference.main — scan_itd() on a synthetic BAM."""
+
+import random
+from pathlib import Path
+
+import pysam
+import pytest
+from loguru import logger
+
+from scanitd.inference import iter_events, scan_itd
+from scanitd.inference.main import BamScanner, ScanEngine, _collect_evidence, _sweeps_forward
+
+from .simulate import PlantedEvent, build_synthetic_sample
+
+
+TARGETS = "chr1:1900-2100\nchr1:2000-4100\nchr2\nchr10:1-1300"
+
+
+def _run(sample, target="", **kwargs):
+    events, header = scan_itd(
+        in_bam_path=sample.bam,
+        mapq_cutoff=15,
+        ref_genome=sample.fasta,
+        target_file=target,
+        itd_length_cutoff=10,
+        allowed_mismatches_for_sr_rescue=1,
+        allowed_mismatches_for_insertion=2,
+        logger=logger,
+        **kwargs,
+    )
+    return events, header
+
+
+def _iter(sample, target="", **kwargs):
+    return iter_events(sample.bam, 15, sample.fasta, target, 10, 1, 2, logger, **kwargs)
+
+
+def _as_records(events):
+    return [
+        (
+            e.chrom, e.ref_start, e.event_type, e.event_size, e.event_sequence,
+            e.oao, e.ao, e.dp, e.af, e.ref_allele, e.alt_allele, e.break_point_region,
+        )
+        for e in events
+    ]
+
+
+class TestScanItd:
+    def test_planted_events_are_found(self, synthetic_sample):
+        events, header = _run(synthetic_sample)
+        assert header["HD"]["SO"] == "coordinate"
+        found = {(e.chrom, e.ref_start, e.event_size) for e in events if e.event_type == "TDUP"}
+        for planted in synthetic_sample.events:
+            if planted.kind == "TDUP":
+                assert (planted.chrom, planted.start, planted.end - planted.start) in found
+        assert any(e.event_type == "INS" and e.chrom == "chr2" for e in events)
+
+    def test_rescue_adds_support(self, synthetic_sample):
+        events, _ = _run(synthetic_sample)
+        assert any(e.ao > e.oao for e in events if e.event_type == "TDUP")
+
+    def test_decompression_threads_do_not_change_events(self, synthetic_sample):
+        events, _ = _run(synthetic_sample)
+        threaded, _ = _run(synthetic_sample, threads=3)
+        assert _as_records(threaded) == _as_records(events)
+
+
+class TestBoundedCatalog:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    @pytest.mark.parametrize("engine", ["pileup", "read"])
+    def test_identical_to_full_catalog(self, synthetic_sample, target, engine):
+        full, _ = _run(synthetic_sample, target, engine=engine)
+        bounded, _ = _run(synthetic_sample, target, engine=engine, catalog_horizon=500)
+        assert _as_records(bounded) == _as_records(full)
+
+    def test_rejected_with_single_pass(self, synthetic_sample):
+        with pytest.raises(ValueError):
+            _run(synthetic_sample, single_pass=True, catalog_horizon=500)
+
+
+class TestChimericIndex:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    def test_identical_to_scanning_the_bam(self, synthetic_sample, tmp_path, target):
+        events, _ = _run(synthetic_sample, target)
+        first, _ = _run(synthetic_sample, target, chimeric_index_dir=tmp_path)
+        rerun, _ = _run(synthetic_sample, target, chimeric_index_dir=tmp_path)
+        assert _as_records(first) == _as_records(events)
+        assert _as_records(rerun) == _as_records(events)
+
+    def test_rejected_with_workers(self, synthetic_sample, tmp_path):
+        with pytest.raises(ValueError):
+            _run(synthetic_sample, workers=2, chimeric_index_dir=tmp_path)
+
+
+class TestReadNameWindow:
+    @pytest.mark.parametrize("engine", list(ScanEngine))
+    def test_counts_identical_to_keeping_every_name(self, synthetic_sample, engine):
+        def collect(name_window):
+            scanner = BamScanner(Path(synthetic_sample.bam), 15, Path(synthetic_sample.fasta), 10, [None], logger)
+            return _collect_evidence(scanner, [None], 10, 2, engine, False, logger, name_window=name_window)
+
+        full, windowed = collect(False), collect(True)
+        assert windowed.counted_names.evictions > 0
+        assert len(windowed.counted_names) < len(full.counted_names)
+        assert dict(windowed.tdup_ao) == dict(full.tdup_ao)
+        assert dict(windowed.ins_ao) == dict(full.ins_ao)
+        assert {key: windowed.to_be_rescued_sequences.counts(key) for key in windowed.to_be_rescued_sequences} == {
+            key: full.to_be_rescued_sequences.counts(key) for key in full.to_be_rescued_sequences
+        }
+
+    @pytest.mark.parametrize("mate_start", [300, 20])
+    @pytest.mark.parametrize("engine", list(ScanEngine))
+    def test_supplementary_alignment_of_the_mate_past_the_window(self, tmp_path, engine, mate_start):
+        # r1 is counted without an SA tag; its mate, below the MAPQ cutoff, is never
+        # counted, and the mate's supplementary alignment, with a large insertion,
+        # lies far downstream of both
+        rng = random.Random(5)
+        reference = "".join(rng.choice("ACGT") for _ in range(6000))
+        fasta = tmp_path / "ref.fa"
+        fasta.write_text(f">chr1\n{reference}\n")
+        pysam.faidx(str(fasta))
+        header = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": "chr1", "LN": 6000}]}
+
+        def segment(name, start, cigar, flag, tags=(), mate_start=None, mapq=60):
+            read = pysam.AlignedSegment(pysam.AlignmentHeader.from_dict(header))
+            read.query_name, read.reference_id, read.reference_start = name, 0, start
+            read.cigarstring, read.flag, read.mapping_quality = cigar, flag, mapq
+            length = read.infer_query_length()
+            read.query_sequence = "".join(rng.choice("ACGT") for _ in range(length))
+            read.query_qualities = pysam.qualitystring_to_array("I" * length)
+            if mate_start is not None:
+                read.next_reference_id, read.next_reference_start = 0, mate_start
+            read.set_tags(list(tags))
+            return read
+
+        reads = [
+            segment("pair", 100, "20S80M", 0x1 | 0x40, [("MC", "30S70M")], mate_start),
+            segment("pair", mate_start, "30S70M", 0x1 | 0x80, [("MC", "20S80M"), ("SA", "chr1,5001,+,30S20M15I35M,60,0;")], 100, mapq=5),
+            segment("filler1", 1000, "10S90M", 0),
+            segment("filler2", 2000, "10S90M", 0),
+            segment("pair", 5000, "30H20M15I35M", 0x1 | 0x80 | 0x800, [("SA", f"chr1,{mate_start + 1},+,30S70M,5,0;")], 100),
+        ]
+        bam = tmp_path / "mates.bam"
+        with pysam.AlignmentFile(str(bam), "wb", header=header) as out:
+            for read in sorted(reads, key=lambda read: read.reference_start):
+                out.write(read)
+        pysam.index(str(bam))
+
+        def collect(name_window):
+            scanner = BamScanner(bam, 15, fasta, 10, [None], logger)
+            return _collect_evidence(scanner, [None], 10, 2, engine, False, logger, name_window=name_window)
+
+        full, windowed = collect(False), collect(True)
+        assert not full.ins_ao and not full.tdup_ao
+        assert windowed.counted_names.evictions > 0
+        assert dict(windowed.tdup_ao) == dict(full.tdup_ao)
+        assert dict(windowed.ins_ao) == dict(full.ins_ao)
+
+    def test_only_forward_sweeps_are_windowed(self, synthetic_sample):
+        bam_object = BamScanner(Path(synthetic_sample.bam), 15, Path(synthetic_sample.fasta), 10, [None], logger).in_bam_object
+        assert _sweeps_forward(bam_object, [None])
+        assert _sweeps_forward(bam_object, ["chr1:100-200", "chr1:300-400", "chr2"])
+        assert not _sweeps_forward(bam_object, ["chr1:100-200", "chr1:150-400"])
+        assert not _sweeps_forward(bam_object, ["chr2", "chr1"])
+
+
+class TestBamScanner:
+    def test_anchors_of_a_tdup_share_one_resolved_id(self, synthetic_sample):
+        scanner = BamScanner(Path(synthetic_sample.bam), 15, Path(synthetic_sample.fasta), 10, [None], logger)
+        anchors = scanner.iter_bam()
+        by_tdup = {}
+        for anchor in anchors.values():
+            assert anchor.tdup_id[:3] == (anchor.chrom, anchor.tdup_ref_start, anchor.tdup_ref_end - anchor.tdup_ref_start)
+            assert by_tdup.setdefault(anchor.tdup_id, anchor.tdup_id) is anchor.tdup_id
+        assert len(by_tdup) < len(anchors)
+        assert scanner.genome_fasta.misses <= len(synthetic_sample.contigs)
+
+    def test_targeted_scan_loads_the_target_regions(self, synthetic_sample, monkeypatch):
+        monkeypatch.setattr("scanitd.inference.reference._REGION_PADDING", 500)
+        scanner = BamScanner(Path(synthetic_sample.bam), 15, Path(synthetic_sample.fasta), 10, ["chr1:1900-2100"], logger)
+        scanner.iter_bam()
+        assert scanner.genome_fasta.misses > 0
+        assert scanner.genome_fasta._cached_bytes == 1 + 2100 - 1900 + 2 * 500
+
+
+@pytest.fixture(scope="module")
+def deep_amplicon(tmp_path_factory):
+    """Amplicon-like sample deeper than pysam's default pileup cap, half of it duplicates."""
+    return build_synthetic_sample(
+        tmp_path_factory.mktemp("deep"),
+        depth=9000,
+        contigs={"chr1": 500},
+        events=[PlantedEvent("chr1", 230, 270, vaf=0.4, split_fraction=0.6)],
+        duplicate_rate=0.5,
+        name="deep",
+    )
+
+
+class TestSinglePass:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    def test_identical_to_two_pass(self, synthetic_sample, target):
+        two_pass, _ = _run(synthetic_sample, target)
+        single_pass, _ = _run(synthetic_sample, target, single_pass=True)
+        assert _as_records(single_pass) == _as_records(two_pass)
+
+    def test_identical_to_two_pass_above_the_pileup_cap(self, deep_amplicon):
+        with pysam.AlignmentFile(str(deep_amplicon.bam)) as bam:
+            assert bam.count("chr1", 250, 251) > 8000
+
+        def collect(engine, single_pass):
+            scanner = BamScanner(Path(deep_amplicon.bam), 15, Path(deep_amplicon.fasta), 10, [None], logger)
+            return _collect_evidence(scanner, [None], 10, 2, engine, single_pass, logger)
+
+        two_pass = collect(ScanEngine.PILEUP, False)
+        assert two_pass.tdup_ao
+        for other in (collect(ScanEngine.PILEUP, True), collect(ScanEngine.READ, False)):
+            assert dict(other.tdup_ao) == dict(two_pass.tdup_ao)
+            assert dict(other.ins_ao) == dict(two_pass.ins_ao)
+            assert {key: other.to_be_rescued_sequences.counts(key) for key in other.to_be_rescued_sequences} == {
+                key: two_pass.to_be_rescued_sequences.counts(key) for key in two_pass.to_be_rescued_sequences
+            }
+
+
+class TestReadEngine:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    @pytest.mark.parametrize("single_pass", [False, True])
+    def test_identical_to_pileup_engine(self, synthetic_sample, target, single_pass):
+        pileup, _ = _run(synthetic_sample, target)
+        read_level, _ = _run(synthetic_sample, target, single_pass=single_pass, engine="read")
+        assert _as_records(read_level) == _as_records(pileup)
+
+    def test_unknown_engine_rejected(self, synthetic_sample):
+        with pytest.raises(ValueError):
+            _run(synthetic_sample, engine="columns")
+
+
+class TestWorkers:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    @pytest.mark.parametrize(
+        "options",
+        [{}, {"single_pass": True}, {"engine": "read"}, {"engine": "read", "single_pass": True}],
+    )
+    def test_identical_to_serial_scan(self, synthetic_sample, target, options):
+        serial, _ = _run(synthetic_sample, target)
+        # small shards put many reads and mate pairs across shard boundaries
+        sharded, _ = _run(synthetic_sample, target, workers=2, shard_size=333, **options)
+        assert _as_records(sharded) == _as_records(serial)
+
+
+class TestIterEvents:
+    @pytest.mark.parametrize("target", ["", TARGETS])
+    def test_contigs_in_header_order(self, synthetic_sample, target):
+        events = list(_iter(synthetic_sample, target))
+        scanned, header = _run(synthetic_sample, target)
+        contigs = [contig["SN"] for contig in header["SQ"]]
+        assert [(contigs.index(e.chrom), e.ref_start) for e in events] == sorted((contigs.index(e.chrom), e.ref_start) for e in events)
+        assert "chr10" in {e.chrom for e in events}
+        assert _as_records(events) == _as_records(scanned)
+
+    def test_workers_stream_identical_to_serial(self, synthetic_sample):
+        serial = list(_iter(synthetic_sample, TARGETS))
+        sharded = list(_iter(synthetic_sample, TARGETS, workers=2, shard_size=333))
+        assert _as_records(sharded) == _as_records(serial)
+
+    def test_reference_budget_split_between_processes(self, synthetic_sample, monkeypatch):
+        budgets = []
+
+        class RecordingScanner(BamScanner):
+            def __init__(self, *args, reference_cache_bytes, **kwargs):
+                budgets.append(reference_cache_bytes)
+                super().__init__(*args, reference_cache_bytes=reference_cache_bytes, **kwargs)
+
+        monkeypatch.setattr("scanitd.inference.main.BamScanner", RecordingScanner)
+        _iter(synthetic_sample, reference_cache_bytes=1000).close()
+        _iter(synthetic_sample, workers=4, reference_cache_bytes=1000).close()
+        assert budgets == [1000, 200]
+
+    def test_options_checked_when_called(self, synthetic_sample):
+        with pytest.raises(ValueError):
+            _iter(synthetic_sample, single_pass=True, catalog_horizon=500)
@@ -0,0 +1,56 @@
+"""Tests for scanitd.inference.parallel — shard planning and the sharded scan."""
+
+import pysam
+import pytest
+from loguru import logger
+
+from scanitd.inference.parallel import ShardedScan, plan_shards
+
+
+@pytest.fixture
+def bam_object(synthetic_sample):
+    with pysam.AlignmentFile(synthetic_sample.bam) as bam:
+        yield bam
+
+
+class TestPlanShards:
+    def test_whole_genome_covers_every_contig(self, bam_object):
+        shards = plan_shards(bam_object, [None], 2000)
+        assert shards == [
+            ("chr1:1-2000", None),
+            ("chr1:2001-4000", 2000),
+            ("chr1:4001-6000", 4000),
+            ("chr2:1-2000", None),
+            ("chr2:2001-4000", 2000),
+            ("chr2:4001-4500", 4000),
+            ("chr10:1-2000", None),
+            ("chr10:2001-2500", 2000),
+        ]
+
+    def test_regions_keep_order_and_bounds(self, bam_object):
+        shards = plan_shards(bam_object, ["chr2:101-250", "chr1:1-100", "chr10"], 100)
+        assert shards[:3] == [("chr2:101-200", None), ("chr2:201-250", 200), ("chr1:1-100", None)]
+        assert shards[-1] == ("chr10:2401-2500", 2400)
+        assert len(shards) == 3 + 25
+
+    def test_rejects_non_positive_shard_size(self, bam_object):
+        with pytest.raises(ValueError, match="shard_size"):
+            plan_shards(bam_object, [None], 0)
+
+
+class TestShardedScan:
+    def test_results_stream_in_order_through_a_bounded_window(self, synthetic_sample):
+        with ShardedScan(2, synthetic_sample.bam, synthetic_sample.fasta, 15, 10, 10, 1, 2, "pileup", logger) as scan:
+            submitted = []
+            apply_async = scan.pool.apply_async
+
+            def counting_apply_async(func, args):
+                submitted.append(args)
+                return apply_async(func, args)
+
+            scan.pool.apply_async = counting_apply_async
+            results = []
+            for result in scan._imap_window(abs, range(-1, -20, -1)):
+                assert len(submitted) - len(results) <= 4
+                results.append(result)
+        assert results == list(range(1, 20))
@@ -0,0 +1,202 @@
+"""Tests for scanitd.inference.read_engine — fetch-based replay of the pileup."""
+
+import random
+import re
+from pathlib import Path
+
+import pysam
+import pytest
+from loguru import logger
+
+from scanitd.inference.evidence import EvidenceCollector
+from scanitd.inference.main import BamScanner, ScanEngine, _collect_evidence, _resolve_engine
+from scanitd.inference.read_engine import PILEUP_FLAG_FILTER, _OverlapTracker, pileup_events, read_engine_verified
+
+from .simulate import build_synthetic_sample
+
+
+HEADER = {"HD": {"VN": "1.6", "SO": "coordinate"}, "SQ": [{"SN": "chr1", "LN": 1000}]}
+
+
+def _segment(name, start, cigar, *, seq_len=None, qualities=None, flag=0, mate_start=-1, tlen=0, seq=None):
+    header = pysam.AlignmentHeader.from_dict(HEADER)
+    read = pysam.AlignedSegment(header)
+    read.query_name = name
+    read.reference_id = 0
+    read.reference_start = start
+    read.cigarstring = cigar
+    read.flag = flag
+    read.mapping_quality = 60
+    length = read.infer_query_length() if seq_len is None else seq_len
+    read.query_sequence = seq or "A" * length
+    read.query_qualities = pysam.qualitystring_to_array("I" * length) if qualities is None else qualities
+    if mate_start >= 0:
+        read.next_reference_id = 0
+        read.next_reference_start = mate_start
+        read.template_length = tlen
+    return read
+
+
+class TestPileupEvents:
+    def test_plain_match_has_no_events(self):
+        assert pileup_events(_segment("r", 100, "50M"), 0, 1000, 10) == []
+
+    def test_first_column_of_soft_clipped_read(self):
+        events = pileup_events(_segment("r", 100, "10S40M"), 0, 1000, 10)
+        assert events == [(100, 10, 0)]
+
+    def test_first_column_respects_region_start(self):
+        events = pileup_events(_segment("r", 100, "10S40M"), 120, 1000, 10)
+        assert events == [(120, 30, 0)]
+
+    def test_query_position_zero_is_skipped(self):
+        events = pileup_events(_segment("r", 100, "40M10S"), 0, 1000, 10)
+        assert events == [(101, 1, 0)]
+
+    def test_low_quality_bases_are_skipped(self):
+        qualities = pysam.qualitystring_to_array("+" * 12 + "I" * 38)  # Q10 then Q40
+        events = pileup_events(_segment("r", 100, "10S40M", qualities=qualities), 0, 1000, 10)
+        assert events == [(102, 12, 0)]
+
+    def test_hard_clipped_read_only_reports_insertions(self):
+        assert pileup_events(_segment("r", 100, "10H40M"), 0, 1000, 10) == []
+        events = pileup_events(_segment("r", 100, "10H20M15I20M"), 0, 1000, 10)
+        assert events == [(119, 19, 15)]
+
+    def test_insertion_below_cutoff_is_ignored(self):
+        assert pileup_events(_segment("r", 100, "20M5I20M"), 0, 1000, 10) == []
+
+    def test_insertion_and_first_column(self):
+        events = pileup_events(_segment("r", 100, "5S20M12I20M"), 0, 1000, 10)
+        assert events == [(100, 5, 0), (119, 24, 12)]
+
+
+def _pileup_qualities(bam_path):
+    observed = {}
+    with pysam.AlignmentFile(bam_path) as bam:
+        for column in bam.pileup(stepper="all", min_base_quality=0):
+            for pileup_read, quality in zip(column.pileups, column.get_query_qualities()):
+                if pileup_read.query_position is not None:
+                    read = pileup_read.alignment
+                    observed[(read.query_name, read.flag, pileup_read.query_position)] = quality
+    return observed
+
+
+class TestOverlapTracker:
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_htslib_overlap_adjustment(self, tmp_path, seed):
+        rng = random.Random(seed)
+        cigars = ["60M", "20M2D40M", "25M3I32M", "5S55M", "30M1D10M2I18M", "58M2S"]
+        reads = []
+        for i in range(60):
+            start = rng.randrange(0, 400)
+            mate_start = start + rng.randrange(0, 70)
+            for is_first, pos, other in ((True, start, mate_start), (False, mate_start, start)):
+                cigar = rng.choice(cigars)
+                length = sum(int(n) for n, op in re.findall(r"(\d+)([MIS=X])", cigar))
+                flag = 0x1 | 0x2 | (0x40 if is_first else 0x80) | rng.choice([0, 0, 0, 0x400])
+                seq = "".join(rng.choice("ACGT") for _ in range(length))
+                qualities = [rng.choice([2, 10, 20, 30, 30, 40]) for _ in range(length)]
+                reads.append(_segment(f"pair{i}", pos, cigar, qualities=qualities, flag=flag, mate_start=other, tlen=abs(other - pos) + 60, seq=seq))
+        reads.sort(key=lambda r: r.reference_start)
+        bam_path = tmp_path / "pairs.bam"
+        with pysam.AlignmentFile(bam_path, "wb", header=HEADER) as out:
+            for read in reads:
+                out.write(read)
+        pysam.index(str(bam_path))
+
+        tracker = _OverlapTracker()
+        adjusted = {}
+        with pysam.AlignmentFile(bam_path) as bam:
+            for read in bam.fetch():
+                if read.flag & PILEUP_FLAG_FILTER:
+                    continue
+                qualities, mate = tracker.push(read)
+                adjusted[(read.query_name, read.flag)] = list(read.query_qualities) if qualities is None else qualities
+                tracker.attach_events(read, 0, [])
+                if mate is not None:
+                    mate_read, mate_qualities, _ = mate
+                    adjusted[(mate_read.query_name, mate_read.flag)] = mate_qualities
+
+        observed = _pileup_qualities(bam_path)
+        assert observed
+        for (name, flag, qpos), quality in observed.items():
+            assert adjusted[(name, flag)][qpos] == quality
+
+
+@pytest.fixture(scope="module")
+def discordant_mates(tmp_path_factory):
+    """Sample whose overlapping mates disagree often and whose leading bases are often poor."""
+    return build_synthetic_sample(tmp_path_factory.mktemp("discordant"), seed=11, depth=80, error_rate=0.04, low_quality_rate=0.3)
+
+
+class TestReadLevelPass:
+    def test_sample_has_disagreeing_overlaps(self, discordant_mates):
+        tracker = _OverlapTracker()
+        zeroed = 0
+        with pysam.AlignmentFile(discordant_mates.bam) as bam:
+            for read in bam.fetch():
+                if read.flag & PILEUP_FLAG_FILTER:
+                    continue
+                qualities, _ = tracker.push(read)
+                tracker.attach_events(read, 0, [])
+                if qualities is not None:
+                    zeroed += sum(1 for quality, original in zip(qualities, read.query_qualities) if quality == 0 < original)
+        assert zeroed > 0
+
+    def test_observations_identical_to_pileup(self, discordant_mates, monkeypatch):
+        """The read engine sees every counted read at the column the pileup first counts it."""
+        observations = {}
+        for name in ScanEngine:
+            observed = observations[name] = []
+            first = set()
+
+            def record(collector, read, query_position, indel, reference_pos, *, observed=observed, first=first):
+                if query_position and read.mapping_quality >= collector.mapq_cutoff:
+                    key = (read.query_name, read.flag, read.reference_start)
+                    is_first = "S" in read.cigarstring and "H" not in read.cigarstring and key not in first
+                    first.add(key)
+                    if is_first or indel >= collector.itd_length_cutoff:
+                        observed.append((reference_pos, *key, query_position, indel))
+
+            monkeypatch.setattr(EvidenceCollector, "observe", record)
+            scanner = BamScanner(Path(discordant_mates.bam), 15, Path(discordant_mates.fasta), 10, [None], logger)
+            _collect_evidence(scanner, [None], 10, 2, name, False, logger)
+        assert observations[ScanEngine.PILEUP]
+        assert observations[ScanEngine.READ] == observations[ScanEngine.PILEUP]
+
+    @pytest.mark.parametrize("single_pass", [False, True])
+    def test_counts_identical_to_pileup(self, discordant_mates, single_pass):
+        def collect(engine):
+            scanner = BamScanner(Path(discordant_mates.bam), 15, Path(discordant_mates.fasta), 10, [None], logger)
+            return _collect_evidence(scanner, [None], 10, 2, engine, single_pass, logger)
+
+        pileup, read_level = collect(ScanEngine.PILEUP), collect(ScanEngine.READ)
+        assert pileup.tdup_ao
+        assert dict(read_level.tdup_ao) == dict(pileup.tdup_ao)
+        assert dict(read_level.ins_ao) == dict(pileup.ins_ao)
+        assert {key: read_level.to_be_rescued_sequences.counts(key) for key in read_level.to_be_rescued_sequences} == {
+            key: pileup.to_be_rescued_sequences.counts(key) for key in pileup.to_be_rescued_sequences
+        }
+
+
+class TestReadEngineVerified:
+    @pytest.mark.parametrize(("version", "verified"), [("0.22.0", True), ("0.24.1", True), ("0.21.9", False), ("0.25.0", False), ("1.0", False), ("dev", False)])
+    def test_verified_release_series(self, version, verified):
+        assert read_engine_verified(version) is verified
+
+    def test_installed_release_is_verified(self):
+        assert read_engine_verified()
+
+    @pytest.mark.parametrize(("version", "expected"), [("0.24.1", ScanEngine.READ), ("0.25.0", ScanEngine.PILEUP)])
+    def test_unverified_release_falls_back_to_pileup(self, monkeypatch, version, expected):
+        warnings = []
+
+        class Logger:
+            def warning(self, message):
+                warnings.append(message)
+
+        monkeypatch.setattr(pysam, "__version__", version)
+        assert _resolve_engine("read", Logger()) == expected
+        assert _resolve_engine("pileup", Logger()) == ScanEngine.PILEUP
+        assert len(warnings) == (expected == ScanEngine.PILEUP)
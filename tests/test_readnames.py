@@ -0,0 +1,96 @@
+"""Tests for scanitd.inference.readnames — hashed, windowed read names."""
+
+import pysam
+import pytest
+
+from scanitd.inference.readnames import ReadNameSet, last_observable_position, read_name_hash
+
+
+HEADER = pysam.AlignmentHeader.from_dict({"SQ": [{"SN": "chr1", "LN": 10_000}, {"SN": "chr2", "LN": 10_000}]})
+
+
+def _segment(start=100, cigar="100M", *, mate=None, tags=()):
+    seg = pysam.AlignedSegment(HEADER)
+    seg.query_name = "r1"
+    seg.reference_id = 0
+    seg.reference_start = start
+    seg.cigarstring = cigar
+    seg.query_sequence = "A" * 100
+    if mate is not None:
+        seg.flag = 0x1
+        seg.next_reference_id, seg.next_reference_start = mate
+    seg.set_tags(list(tags))
+    return seg
+
+
+class TestReadNameHash:
+    def test_stable_64_bit(self):
+        key = read_name_hash("A00123:8:H7KJ2DSXX:1:1101:10004:10019")
+        assert key == read_name_hash("A00123:8:H7KJ2DSXX:1:1101:10004:10019")
+        assert 0 <= key < 2**64
+        assert key != read_name_hash("A00123:8:H7KJ2DSXX:1:1101:10004:10020")
+
+
+class TestLastObservablePosition:
+    def test_unpaired_read_ends_at_its_last_base(self):
+        assert last_observable_position(_segment(100, "20S60M5D20M")) == (0, 184)
+
+    def test_downstream_mate_extends_through_mate_cigar(self):
+        read = _segment(mate=(0, 300), tags=[("MC", "50M10D50M")])
+        assert last_observable_position(read) == (0, 409)
+
+    def test_upstream_mate_does_not_shorten(self):
+        read = _segment(mate=(0, 10), tags=[("MC", "100M")])
+        assert last_observable_position(read) == (0, 199)
+
+    def test_mate_on_later_chromosome(self):
+        read = _segment(mate=(1, 5), tags=[("MC", "100M")])
+        assert last_observable_position(read) == (1, 104)
+
+    @pytest.mark.parametrize("tags", [[("SA", "chr2,500,+,50S50M,60,0;"), ("MC", "100M")], []])
+    def test_names_that_can_reappear_anywhere_are_kept(self, tags):
+        assert last_observable_position(_segment(mate=(0, 300), tags=tags)) is None
+
+
+class TestReadNameSet:
+    def test_names_evicted_behind_the_sweep(self):
+        names = ReadNameSet(windowed=True)
+        names.add(1, (0, 150))
+        names.add(2, (0, 400))
+        names.add(3, None)
+        names.advance(0, 150)
+        assert set(names) == {1, 2, 3}
+        names.advance(0, 151)
+        assert set(names) == {2, 3}
+        names.advance(1, 0)
+        assert set(names) == {3}
+        assert names.evictions == 2
+
+    def test_extend_and_pin(self):
+        names = ReadNameSet(windowed=True)
+        names.add(1, (0, 150))
+        names.add(2, (0, 150))
+        names.extend(1, (0, 500))
+        names.extend(2, None)
+        names.extend(1, (0, 200))
+        names.advance(0, 300)
+        assert set(names) == {1, 2}
+        names.advance(0, 501)
+        assert set(names) == {2}
+
+    def test_pinned_names_are_kept_whenever_added(self):
+        names = ReadNameSet(windowed=True)
+        names.add(1, (0, 150))
+        names.pin(1)
+        names.pin(2)
+        names.add(2, (0, 150))
+        names.add(3, (0, 150))
+        names.advance(0, 500)
+        assert set(names) == {1, 2}
+
+    def test_unwindowed_set_keeps_everything(self):
+        names = ReadNameSet()
+        names.add(1, (0, 150))
+        names.advance(5, 0)
+        assert 1 in names
+        assert len(names) == 1
@@ -0,0 +1,119 @@
+"""Tests for scanitd.inference.reference — ReferenceCache against pyfaidx."""
+
+import random
+
+import pytest
+from pyfaidx import Fasta, FetchError
+
+from scanitd.inference.reference import ReferenceCache
+
+
+@pytest.fixture
+def fasta_path(tmp_path):
+    rng = random.Random(5)
+    path = tmp_path / "ref.fa"
+    with path.open("w") as fh:
+        for name, length in (("chr1", 1000), ("chr2", 250), ("chr3", 61)):
+            seq = "".join(rng.choice("ACGTacgtN") for _ in range(length))
+            fh.write(f">{name}\n")
+            fh.writelines(seq[i : i + 60] + "\n" for i in range(0, length, 60))
+    return path
+
+
+def _slices(rng, length):
+    yield slice(None, None)
+    yield slice(None, 10)
+    yield slice(length - 5, None)
+    yield slice(-10, -2)
+    yield slice(30, 20)
+    yield slice(length - 3, length + 40)
+    yield slice(length + 5, length + 9)
+    for _ in range(200):
+        start = rng.randrange(-length, length + 10)
+        yield slice(start, start + rng.randrange(-5, 120))
+
+
+class TestReferenceCache:
+    @pytest.mark.parametrize("max_bytes", [10_000, 300, 40])
+    def test_slices_match_pyfaidx(self, fasta_path, max_bytes):
+        fasta = Fasta(str(fasta_path), sequence_always_upper=True)
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True), max_bytes, window_size=100)
+        rng = random.Random(max_bytes)
+        for chrom in ("chr1", "chr2", "chr3", "chr1"):
+            length = len(fasta[chrom])
+            assert len(cache[chrom]) == length
+            for window in _slices(rng, length):
+                if window.start is not None and window.start + length < 0:
+                    continue
+                assert cache[chrom][window].seq == fasta[chrom][window].seq, window
+            for index in (0, 7, length - 1, -1, length):
+                assert cache[chrom][index].seq == fasta[chrom][index].seq
+
+    def test_start_before_contig_raises_like_pyfaidx(self, fasta_path):
+        fasta = Fasta(str(fasta_path), sequence_always_upper=True)
+        cache = ReferenceCache(fasta)
+        with pytest.raises(FetchError):
+            fasta["chr3"][-100:5]
+        with pytest.raises(FetchError):
+            cache["chr3"][-100:5]
+
+    def test_unknown_contig(self, fasta_path):
+        cache = ReferenceCache(Fasta(str(fasta_path)))
+        with pytest.raises(KeyError):
+            cache["chrZ"]
+        assert "chr1" in cache
+        assert "chrZ" not in cache
+
+    def test_whole_contigs_are_read_once(self, fasta_path):
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True))
+        for start in range(0, 900, 50):
+            cache["chr1"][start : start + 20]
+        cache["chr2"][3:9]
+        assert (cache.misses, cache.hits, cache.evictions) == (2, 17, 0)
+
+    def test_lru_eviction_by_contig(self, fasta_path):
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True), max_bytes=320, window_size=50)
+        cache["chr2"][0:5]
+        cache["chr3"][0:5]
+        cache["chr2"][5:10]
+        assert cache.evictions == 0
+        # chr1 exceeds the budget: a window is loaded, evicting the LRU contig chr3
+        cache["chr1"][500:510]
+        assert cache.evictions == 1
+        cache["chr2"][10:20]
+        assert cache.misses == 3
+        cache["chr3"][0:5]
+        assert cache.misses == 4
+
+    def test_window_slides_forward(self, fasta_path):
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True), max_bytes=500, window_size=200)
+        for start in range(0, 1000, 10):
+            cache["chr1"][start : start + 10]
+        assert cache.misses == 6
+        assert cache.hits == 94
+
+    def test_invalid_budget(self, fasta_path):
+        with pytest.raises(ValueError, match="positive"):
+            ReferenceCache(Fasta(str(fasta_path)), max_bytes=0)
+
+    def test_target_regions_are_loaded_instead_of_contigs(self, fasta_path, monkeypatch):
+        monkeypatch.setattr("scanitd.inference.reference._REGION_PADDING", 20)
+        fasta = Fasta(str(fasta_path), sequence_always_upper=True)
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True), window_size=150, regions=[("chr1", 100, 150), ("chr1", 170, 200), ("chr1", 600, 900)])
+        # the first two regions merge into [80, 220) once padded
+        assert cache["chr1"][90:100].seq == fasta["chr1"][90:100].seq
+        assert cache["chr1"][200:215].seq == fasta["chr1"][200:215].seq
+        assert (cache.misses, cache._cached_bytes) == (1, 140)
+        # longer than the window: the window slides
+        assert cache["chr1"][700:710].seq == fasta["chr1"][700:710].seq
+        assert cache._cached_bytes == 150
+        # outside the targets and on contigs without targets
+        assert cache["chr1"][400:450].seq == fasta["chr1"][400:450].seq
+        assert cache["chr2"][0:250].seq == fasta["chr2"][0:250].seq
+        assert cache.misses == 4
+        assert cache._cached_bytes == 150 + 250
+
+    def test_no_whole_contigs_for_an_empty_target_list(self, fasta_path):
+        cache = ReferenceCache(Fasta(str(fasta_path), sequence_always_upper=True), window_size=100, regions=[])
+        cache["chr1"][500:510]
+        assert cache._cached_bytes == 100
@@ -0,0 +1,212 @@
+"""Tests for scanitd.inference.sr_resuer — split-read rescue."""
+
+import random
+from collections import Counter
+
+from ssw import AlignmentMgr
+
+from scanitd.base import MappingMode, MicroRegion
+from scanitd.inference.catalog import SoftclipCatalog
+from scanitd.inference.sr_resuer import (
+    RescueAligner,
+    alignment_operation,
+    calculate_variants,
+    prefilter_rescue,
+    update_tdup_ao,
+)
+
+
+REF = "".join(random.Random(3).choice("ACGT") for _ in range(400))
+
+
+class _Slice:
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class _Contig:
+    def __getitem__(self, item):
+        return _Slice(REF[item])
+
+
+class FakeFasta(dict):
+    def __missing__(self, key):
+        return _Contig()
+
+
+TDUP_ID = ("chr1", 200, 40, REF[200:240], MicroRegion(""))
+
+
+def _softclips():
+    # SM clips end at the TDUP end; MS clips start at the TDUP start
+    sm = [REF[225:240], REF[220:240], "ACGTACGTACGTACG", REF[228:240]]
+    ms = [REF[200:215], REF[200:212], "TTTTTTTTTTTTTTT"]
+    return {
+        ("chr1", 200, MappingMode.SM): sm * 3 + sm[:1],
+        ("chr1", 240, MappingMode.MS): ms * 2,
+    }
+
+
+def _naive_rescue(softclips):
+    rescued = 0
+    for (_, _, mode), sequences in softclips.items():
+        ref_seq = REF[160:240] if mode == MappingMode.SM else REF[200:280]
+        for query_seq in sequences:
+            rescued += alignment_operation(AlignmentMgr(match_score=2, mismatch_penalty=2), query_seq, ref_seq, mode, 1)
+    return rescued
+
+
+class TestUpdateTdupAo:
+    def test_counts_every_copy_of_a_rescued_clip(self):
+        softclips = _softclips()
+        expected = _naive_rescue(softclips)
+        assert expected > 0
+        assert update_tdup_ao(TDUP_ID, 5, FakeFasta(), softclips, 1) == 5 + expected
+
+    def test_counters_and_lists_agree(self):
+        softclips = _softclips()
+        collapsed = {key: Counter(sequences) for key, sequences in softclips.items()}
+        assert update_tdup_ao(TDUP_ID, 0, FakeFasta(), collapsed, 1) == update_tdup_ao(TDUP_ID, 0, FakeFasta(), softclips, 1)
+
+    def test_packed_catalog_and_lists_agree(self):
+        softclips = _softclips()
+        catalog = SoftclipCatalog()
+        for key, sequences in softclips.items():
+            for sequence in sequences:
+                catalog.add(key, sequence)
+        assert update_tdup_ao(TDUP_ID, 0, FakeFasta(), catalog, 1) == update_tdup_ao(TDUP_ID, 0, FakeFasta(), softclips, 1)
+
+    def test_unique_clips_aligned_once_across_events(self):
+        softclips = _softclips()
+        aligner = RescueAligner()
+        first = update_tdup_ao(TDUP_ID, 0, FakeFasta(), softclips, 1, aligner)
+        assert aligner.misses == 7
+        assert aligner.hits == 0
+        assert update_tdup_ao(TDUP_ID, 0, FakeFasta(), softclips, 1, aligner) == first
+        assert (aligner.misses, aligner.hits) == (7, 7)
+
+    def test_no_candidates(self):
+        assert update_tdup_ao(TDUP_ID, 3, FakeFasta(), {}, 1) == 3
+
+
+class TestPrefilterRescue:
+    def test_exact_unique_anchored_match_accepted(self):
+        assert prefilter_rescue("GGTA", "ACGTTGGTA", MappingMode.SM, 0) is True
+        assert prefilter_rescue("ACGT", "ACGTTGGTA", MappingMode.MS, 0) is True
+
+    def test_repeated_match_left_to_the_aligner(self):
+        # the tandem copy ends first, so ssw reports it and rejects the read
+        assert prefilter_rescue("ACGT", "ACGTACGT", MappingMode.SM, 0) is None
+        assert alignment_operation(AlignmentMgr(match_score=2, mismatch_penalty=2), "ACGT", "ACGTACGT", MappingMode.SM, 0) is False
+
+    def test_mismatching_anchor_base_rejected(self):
+        assert prefilter_rescue("GGTC", "ACGTTGGTA", MappingMode.SM, 5) is False
+        assert prefilter_rescue("TCGT", "ACGTTGGTA", MappingMode.MS, 5) is False
+
+    def test_other_symbols_left_to_the_aligner(self):
+        assert prefilter_rescue("GGTN", "ACGTTGGTA", MappingMode.SM, 5) is None
+        assert prefilter_rescue("GGTA", "ACGTTGGTa", MappingMode.SM, 5) is None
+        assert prefilter_rescue("GGNA", "ACGTTGGNA", MappingMode.SM, 5) is None
+
+    def test_agrees_with_alignment(self):
+        rng = random.Random(8)
+        align_mgr = AlignmentMgr(match_score=2, mismatch_penalty=2)
+        decided = 0
+        for _ in range(3000):
+            unit = "".join(rng.choice("ACGT") for _ in range(rng.randrange(1, 40)))
+            mode = rng.choice([MappingMode.SM, MappingMode.MS])
+            reference_seq = unit * 2
+            query = list(reference_seq[-rng.randrange(1, 45) :] if mode == MappingMode.SM else reference_seq[: rng.randrange(1, 45)])
+            for _ in range(rng.choice([0, 0, 1, 2])):
+                query[rng.randrange(len(query))] = rng.choice("ACGT")
+            query_seq = "".join(query)
+            cutoff = rng.choice([0, 1, 2])
+            verdict = prefilter_rescue(query_seq, reference_seq, mode, cutoff)
+            if verdict is not None:
+                decided += 1
+                assert verdict == alignment_operation(align_mgr, query_seq, reference_seq, mode, cutoff)
+        assert decided > 0
+
+    def test_tiers_are_counted(self):
+        aligner = RescueAligner()
+        aligner.supports("GGTA", "ACGTTGGTA", MappingMode.SM, 1)
+        aligner.supports("GGTC", "ACGTTGGTA", MappingMode.SM, 1)
+        aligner.supports("GCTA", "ACGTTGGTA", MappingMode.SM, 1)
+        aligner.supports("GGTA", "ACGTTGGTA", MappingMode.SM, 1)
+        assert (aligner.prefilter_accepted, aligner.prefilter_rejected, aligner.aligned, aligner.hits) == (1, 1, 1, 1)
+
+
+def _per_base_variants(cigar_pair_list, reference_seq, query_seq, reference_start, reference_end, query_start, query_end):
+    """Base-by-base reference implementation of calculate_variants."""
+    variants = {"insertions": 0, "deletions": 0, "snvs": 0, "mismatches": 0}
+    read_pos, ref_pos = query_start, reference_start
+    for length, op in cigar_pair_list:
+        if op == "M":
+            for i in range(length):
+                if read_pos + i < query_end and ref_pos + i < reference_end and query_seq[read_pos + i] != reference_seq[ref_pos + i]:
+                    variants["snvs"] += 1
+                    variants["mismatches"] += 1
+            read_pos += length
+            ref_pos += length
+        elif op == "I":
+            variants["insertions"] += 1
+            variants["mismatches"] += length
+            read_pos += length
+        elif op == "D":
+            variants["deletions"] += 1
+            variants["mismatches"] += length
+            ref_pos += length
+    return variants
+
+
+def _random_alignments(seed, count):
+    rng = random.Random(seed)
+    align_mgr = AlignmentMgr(match_score=2, mismatch_penalty=2)
+    for _ in range(count):
+        reference_seq = "".join(rng.choice("ACGT") for _ in range(rng.randrange(30, 300)))
+        start = rng.randrange(len(reference_seq) - 20)
+        query = list(reference_seq[start : start + rng.randrange(20, 151)])
+        for _ in range(rng.randrange(8)):
+            position = rng.randrange(len(query))
+            edit = rng.random()
+            if edit < 0.6:
+                query[position] = rng.choice("ACGT")
+            elif edit < 0.8:
+                del query[position]
+            else:
+                query.insert(position, rng.choice("ACGT"))
+        query_seq = "".join(query)
+        align_mgr.set_read(query_seq)
+        align_mgr.set_reference(reference_seq)
+        alignment = align_mgr.align(gap_open=3, gap_extension=1)
+        yield (
+            alignment.cigar_pair_list,
+            reference_seq,
+            query_seq,
+            alignment.reference_start,
+            alignment.reference_end,
+            alignment.read_start,
+            alignment.read_end,
+        )
+
+
+class TestCalculateVariants:
+    def test_matches_per_base_walk(self):
+        for args in _random_alignments(4, 500):
+            assert calculate_variants(*args) == _per_base_variants(*args)
+
+    def test_stops_once_over_the_cutoff(self):
+        for args in _random_alignments(5, 500):
+            full = _per_base_variants(*args)
+            for cutoff in (0, 2, 5):
+                variants = calculate_variants(*args, cutoff)
+                assert set(variants) == set(full)
+                assert (variants["mismatches"] > cutoff) == (full["mismatches"] > cutoff)
+                if full["mismatches"] <= cutoff:
+                    assert variants == full
+
+    def test_long_blocks(self):
+        reference_seq = "ACGT" * 60
+        query_seq = reference_seq[:100] + "T" + reference_seq[101:200]
+        args = ([(200, "M")], reference_seq, query_seq, 0, 199, 0, 199)
+        assert calculate_variants(*args) == {"insertions": 0, "deletions": 0, "snvs": 1, "mismatches": 1}
@@ -0,0 +1,103 @@
+"""Tests for scanitd.inference.state and the ``scanitd refilter`` subcommand."""
+
+import gzip
+import json
+
+import pytest
+from loguru import logger
+from typer.testing import CliRunner
+
+from scanitd.base import Event, MicroRegion
+from scanitd.cli import cli
+from scanitd.cli.cli import app
+from scanitd.inference.state import MANIFEST_NAME, load_scan_state, save_scan_state
+
+from .test_main import _as_records, _run
+
+
+def _body(vcf_path):
+    """VCF lines other than the dated header line."""
+    return [line for line in vcf_path.read_text().splitlines() if not line.startswith("##fileDate")]
+
+
+class TestScanState:
+    def test_round_trip(self, synthetic_sample, tmp_path):
+        events, header = _run(synthetic_sample)
+        save_scan_state(tmp_path, header, events, {"mapq": 15}, logger)
+        state = load_scan_state(tmp_path)
+        assert _as_records(state.events) == _as_records(events)
+        assert state.bam_header == header
+        assert state.parameters == {"mapq": 15}
+
+    def test_one_file_per_contig(self, synthetic_sample, tmp_path):
+        events, header = _run(synthetic_sample)
+        save_scan_state(tmp_path, header, events, {}, logger)
+        regions = json.loads((tmp_path / MANIFEST_NAME).read_text())["regions"]
+        assert [region["contig"] for region in regions] == list(dict.fromkeys(event.chrom for event in events))
+        assert sum(region["events"] for region in regions) == len(events)
+
+    def test_none_fields_and_micro_regions(self, tmp_path):
+        events = [
+            Event.new("TDUP", ("chr1", 100, 12, "ACGTACGTACGT", MicroRegion("+GA")), 3, 5, 20, "A", "AACGTACGTACGT"),
+            Event.new("TDUP", ("chr1", 300, 12, "ACGTACGTACGT", MicroRegion("-TT")), 3, 5, 20),
+            Event.new("INS", ("chr1", 500, 12, "ACGTACGTACGT", None), 4, 4, 9),
+        ]
+        save_scan_state(tmp_path, {"SQ": []}, events, {}, logger)
+        loaded = load_scan_state(tmp_path).events
+        assert _as_records(loaded) == _as_records(events)
+        assert [event.end for event in loaded] == [event.end for event in events]
+
+    def test_missing_state(self, tmp_path):
+        with pytest.raises(ValueError, match="missing"):
+            load_scan_state(tmp_path)
+
+    def test_other_format_version(self, tmp_path):
+        save_scan_state(tmp_path, {"SQ": []}, [], {}, logger)
+        manifest = json.loads((tmp_path / MANIFEST_NAME).read_text())
+        manifest["format_version"] = 0
+        (tmp_path / MANIFEST_NAME).write_text(json.dumps(manifest))
+        with pytest.raises(ValueError, match="format version"):
+            load_scan_state(tmp_path)
+
+
+class TestRefilter:
+    @pytest.fixture(autouse=True)
+    def keep_test_logging(self, monkeypatch):
+        """Keep the commands from replacing the log handlers with one on the runner's stdout."""
+        monkeypatch.setattr(cli, "configure_logger", lambda log_level: None)
+
+    def test_matches_a_scan_with_the_same_thresholds(self, synthetic_sample, tmp_path):
+        runner = CliRunner()
+        scan_args = ["-i", str(synthetic_sample.bam), "-r", str(synthetic_sample.fasta)]
+        state_dir = tmp_path / "state"
+        result = runner.invoke(app, [*scan_args, "-o", str(tmp_path / "sample.vcf"), "--state-dir", str(state_dir)])
+        assert result.exit_code == 0, result.output
+
+        for thresholds in (["--ao", "1", "--depth", "1", "--vaf", "0"], ["--ao", "20", "--vaf", "0.3"]):
+            direct = tmp_path / "direct" / "sample.vcf"
+            direct.parent.mkdir(exist_ok=True)
+            refiltered = tmp_path / "refiltered" / "sample.vcf"
+            refiltered.parent.mkdir(exist_ok=True)
+            result = runner.invoke(app, ["call", *scan_args, "-o", str(direct), *thresholds])
+            assert result.exit_code == 0, result.output
+            result = runner.invoke(app, ["refilter", "--state-dir", str(state_dir), "-o", str(refiltered), *thresholds])
+            assert result.exit_code == 0, result.output
+            assert _body(refiltered) == _body(direct)
+
+    def test_vcf_gz_output(self, synthetic_sample, tmp_path):
+        runner = CliRunner()
+        state_dir = tmp_path / "state"
+        scan_args = ["-i", str(synthetic_sample.bam), "-r", str(synthetic_sample.fasta), "--state-dir", str(state_dir)]
+        result = runner.invoke(app, [*scan_args, "-o", str(tmp_path / "sample.vcf.gz"), "--threads", "2"])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(app, ["refilter", "--state-dir", str(state_dir), "-o", str(tmp_path / "sample.vcf")])
+        assert result.exit_code == 0, result.output
+        with gzip.open(tmp_path / "sample.vcf.gz", "rt") as handle:
+            compressed = [line for line in handle.read().splitlines() if not line.startswith("##fileDate")]
+        assert compressed == _body(tmp_path / "sample.vcf")
+        assert (tmp_path / "sample.vcf.gz.tbi").exists()
+
+    def test_rejects_a_directory_without_state(self, tmp_path):
+        result = CliRunner().invoke(app, ["refilter", "--state-dir", str(tmp_path), "-o", str(tmp_path / "out.vcf")])
+        assert result.exit_code != 0
+        assert not (tmp_path / "out.vcf").exists()
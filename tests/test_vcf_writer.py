@@ -1,5 +1,8 @@
 """Tests for scanitd.writer.vcf_writer — VCFWriter, feature helpers."""
 
+import gzip
+
+import pysam
 import pytest
 
 from scanitd.base import Event, MicroRegion
@@ -209,3 +212,39 @@ class TestVCFWriter:
         with writer.open():
             assert writer.is_opened
         assert not writer.is_opened
+
+    def test_vcf_gz_is_bgzf_with_tabix_index(self, tmp_path):
+        events = [make_event("TDUP", chrom=chrom, ref_start=i * 100) for chrom in ("chr1", "chr2") for i in range(1, 4)]
+        for name in ("sample.vcf", "sample.vcf.gz"):
+            writer = VCFWriter(str(tmp_path / name), MINIMAL_BAM_HEADER, threads=2)
+            assert writer.sample_name == "sample"
+            with writer.open():
+                for idx, ev in enumerate(events, 1):
+                    writer.write_data(ev, str(idx))
+            assert not writer.is_opened
+        with gzip.open(tmp_path / "sample.vcf.gz", "rt") as handle:
+            assert handle.read() == (tmp_path / "sample.vcf").read_text()
+        with pysam.TabixFile(str(tmp_path / "sample.vcf.gz")) as tabix:
+            assert len(list(tabix.fetch("chr2", 160, 350))) == 2
+
+    def test_write_events_identical_to_write_data(self, tmp_path):
+        events = [
+            make_event("TDUP", ref_start=100, micro=""),
+            make_event("TDUP", chrom="chr2", ref_start=5, size=12, micro="+GA"),
+            make_event("TDUP", ref_start=700, dp=3, ao=1, micro="-TTG"),
+            make_event("INS", ref_start=900, seq="ACGTACGTAC", micro=""),
+            Event.new("TDUP", ("chr1", 50, 20, "ACGT" * 5, MicroRegion("")), 1, 2, 7),
+        ]
+        (tmp_path / "data").mkdir()
+        (tmp_path / "events").mkdir()
+        one_by_one = VCFWriter(str(tmp_path / "data" / "out.vcf"), MINIMAL_BAM_HEADER)
+        with one_by_one.open():
+            for idx, ev in enumerate(events, 1):
+                one_by_one.write_data(ev, str(idx))
+        batched = VCFWriter(str(tmp_path / "events" / "out.vcf"), MINIMAL_BAM_HEADER)
+        with batched.open():
+            assert batched.write_events(events[:2]) == 2
+            assert batched.write_events([]) == 0
+            assert batched.write_events(events[2:]) == 3
+        assert batched.event_id == len(events) + 1
+        assert (tmp_path / "events" / "out.vcf").read_bytes() == (tmp_path / "data" / "out.vcf").read_bytes()